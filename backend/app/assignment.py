@@ -0,0 +1,165 @@
+"""
+Distance-aware bot assignment.
+
+Each candidate bot is scored by the marginal cost of adding the new order
+to its tour: the planned tour length with the order minus the length
+without it. For an idle bot that is the trip to the restaurant plus the
+delivery leg. Scoring is one in-memory pass over bots and orders that the
+caller has already loaded.
+
+Only the ASSIGN_CANDIDATES bots nearest to the restaurant are loaded and
+scored (app/bot_index.py), so the cost of an assignment does not grow
+with the fleet.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.bot_index import ACCEPTING_STATUSES, bot_index
+from app.config import ASSIGN_CANDIDATES, BOT_CAPACITY, SECONDS_PER_STEP, PICKUP_SECONDS
+from app.models import Bot, Order, OrderStatus
+from app.routing import UNREACHABLE, get_node_coords, get_node_id, get_router
+from app.tours import PICKUP, Tour, TourOrder, plan_tour
+
+# Statuses of an order that holds a bot slot
+ACTIVE_STATUSES = [
+    OrderStatus.ASSIGNED,
+    OrderStatus.PICKING_UP,
+    OrderStatus.PICKED_UP,
+    OrderStatus.DELIVERING
+]
+
+
+@dataclass
+class BotCandidate:
+    bot_id: int
+    node_id: int                 # Current position
+    orders_count: int
+    orders: List[TourOrder] = field(default_factory=list)  # Orders already on its tour
+    tour_distance: Optional[int] = None  # Length of its current tour, planned here if None
+
+
+@dataclass
+class Assignment:
+    bot_id: int
+    cost: int          # Extra grid steps the new order adds to the bot's tour
+    eta_seconds: int   # Time until the new order is delivered
+    tour: Tour
+
+
+def tour_order_for(order: Order) -> TourOrder:
+    return TourOrder(
+        order_id=order.id,
+        pickup_node_id=order.pickup_node_id,
+        delivery_node_id=order.delivery_node_id,
+        picked_up=order.status in (OrderStatus.PICKED_UP, OrderStatus.DELIVERING)
+    )
+
+
+def build_candidates(bots: Iterable[Bot], active_orders: Iterable[Order]) -> List[BotCandidate]:
+    """Candidates from already loaded bots and their active orders"""
+    orders_by_bot: Dict[int, List[TourOrder]] = {}
+    for order in active_orders:
+        orders_by_bot.setdefault(order.bot_id, []).append(tour_order_for(order))
+
+    return [
+        BotCandidate(
+            bot_id=bot.id,
+            # A simulated bot's stored position lags until its trajectory changes
+            node_id=get_node_id(*(bot_index.position(bot.id) or (bot.current_x, bot.current_y))),
+            orders_count=bot.current_orders_count,
+            orders=orders_by_bot.get(bot.id, [])
+        )
+        for bot in bots
+        if bot.current_orders_count < BOT_CAPACITY
+    ]
+
+
+def nearest_bot_ids(db: Session, node_id: int, k: int = ASSIGN_CANDIDATES) -> List[int]:
+    """The k bots with spare capacity nearest to the node, by grid distance"""
+    bot_index.ensure_loaded(db)
+    x, y = get_node_coords(node_id)
+    return [bot_id for bot_id, _ in bot_index.nearest(x, y, k)]
+
+
+def load_candidates(db: Session, bot_ids: List[int]) -> Tuple[Dict[int, Bot], List[BotCandidate]]:
+    """The bots that still take orders, by id, and their candidates with current tours"""
+    if not bot_ids:
+        return {}, []
+    bots = db.query(Bot).filter(
+        Bot.id.in_(bot_ids),
+        Bot.status.in_(ACCEPTING_STATUSES),
+        Bot.current_orders_count < BOT_CAPACITY
+    ).all()
+    active_orders = db.query(Order).filter(
+        Order.bot_id.in_([bot.id for bot in bots]),
+        Order.status.in_(ACTIVE_STATUSES)
+    ).all() if bots else []
+    return {bot.id: bot for bot in bots}, build_candidates(bots, active_orders)
+
+
+def eta_for(tour: Tour, order_id: int, distance: Optional[Callable[[int, int], int]] = None) -> int:
+    """Seconds until order_id is delivered when the bot follows tour"""
+    distance = distance or get_router().get_distance
+    seconds = 0
+    position = tour.start_node_id
+    for stop in tour.stops:
+        seconds += distance(position, stop.node_id) * SECONDS_PER_STEP
+        position = stop.node_id
+        if stop.action == PICKUP:
+            seconds += PICKUP_SECONDS
+        elif stop.order_id == order_id:
+            break
+    return seconds
+
+
+def score_bot(
+    candidate: BotCandidate,
+    new_order: TourOrder,
+    distance: Optional[Callable[[int, int], int]] = None
+) -> Optional[Assignment]:
+    current_distance = candidate.tour_distance
+    if current_distance is None:
+        current_distance = plan_tour(candidate.node_id, candidate.orders, distance).distance
+    planned = plan_tour(candidate.node_id, candidate.orders + [new_order], distance)
+    if planned.distance == UNREACHABLE:
+        return None
+
+    return Assignment(
+        bot_id=candidate.bot_id,
+        cost=planned.distance - max(current_distance, 0),
+        eta_seconds=eta_for(planned, new_order.order_id, distance),
+        tour=planned
+    )
+
+
+def rank_bots(
+    candidates: Iterable[BotCandidate],
+    new_order: TourOrder,
+    distance: Optional[Callable[[int, int], int]] = None
+) -> List[Assignment]:
+    """
+    Assignments for every candidate that can serve the order, best first:
+    lowest marginal cost, then earliest delivery, then fewest orders.
+    distance defaults to the shared router.
+    """
+    scored = []
+    load = {}
+    for candidate in candidates:
+        assignment = score_bot(candidate, new_order, distance)
+        if assignment:
+            scored.append(assignment)
+            load[candidate.bot_id] = candidate.orders_count
+
+    scored.sort(key=lambda a: (a.cost, a.eta_seconds, load[a.bot_id], a.bot_id))
+    return scored
+
+
+def choose_bot(
+    candidates: Iterable[BotCandidate],
+    new_order: TourOrder,
+    distance: Optional[Callable[[int, int], int]] = None
+) -> Optional[Assignment]:
+    ranked = rank_bots(candidates, new_order, distance)
+    return ranked[0] if ranked else None
@@ -0,0 +1,224 @@
+"""
+Spatial index of the bots that can take an order.
+
+Every bot's position, status and load is kept in memory. Bots with spare
+capacity (available or busy, fewer than BOT_CAPACITY orders) are also
+filed in square buckets of BOT_INDEX_CELL_SIZE grid cells, so nearest()
+only looks at the buckets around a point, ring by ring, instead of
+scanning the bots table. Small or sparse fleets are scanned instead of
+walking mostly empty buckets. Distances are Manhattan steps on the
+grid - a lower bound of the route length, which the assignment scorer
+computes for the few bots returned.
+
+The index is updated in place:
+  - position: every simulated step (app/fleet.py) and PUT /position.
+    Simulated positions are written to the database only when a bot's
+    trajectory changes, so position() is what scoring uses and a
+    reconcile keeps the index's position of a bot the simulator moved
+    until its position is written (settled)
+  - load and status: from the RETURNING values of reserve_bot /
+    release_bot, the fleet's flush, and PUT /status
+Load updates are applied when the statement runs, before the commit, so
+a rolled back transaction (or a change made by another worker) can leave
+a bot off until the index is reconciled with the database, at startup,
+on first use and every BOT_INDEX_RECONCILE_SECONDS. A stale entry only
+costs a failed reservation - reserve_bot is the source of truth.
+"""
+import asyncio
+import heapq
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import BOT_CAPACITY, BOT_INDEX_CELL_SIZE, BOT_INDEX_RECONCILE_SECONDS
+from app.database import SessionLocal
+from app.models import Bot, BotStatus
+
+Cell = Tuple[int, int]
+
+# Statuses of a bot that takes new orders
+ACCEPTING_STATUSES = (BotStatus.AVAILABLE, BotStatus.BUSY)
+
+# Up to this many bots with spare capacity a scan beats walking buckets
+SCAN_BELOW = 256
+
+
+@dataclass(slots=True)
+class IndexedBot:
+    x: int
+    y: int
+    status: Optional[BotStatus]
+    orders: int
+
+    @property
+    def accepting(self) -> bool:
+        return self.status in ACCEPTING_STATUSES and self.orders < BOT_CAPACITY
+
+
+class BotIndex:
+    def __init__(self, cell_size: int = BOT_INDEX_CELL_SIZE, reconcile_seconds: float = BOT_INDEX_RECONCILE_SECONDS):
+        self.cell_size = cell_size
+        self.reconcile_seconds = reconcile_seconds
+        self.loaded = False
+        self._bots: Dict[int, IndexedBot] = {}
+        self._cells: Dict[Cell, Set[int]] = {}     # Accepting bots only
+        self._filed: Dict[int, Cell] = {}          # bot id -> its bucket
+        self._live: Set[int] = set()               # Moved by the simulator, not written yet
+        self._lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        """Bots with spare capacity"""
+        return len(self._filed)
+
+    # ============ Updates ============
+
+    def move(self, bot_id: int, x: int, y: int, live: bool = False):
+        """live: a simulated step, ahead of the database until settled()"""
+        with self._lock:
+            if live:
+                self._live.add(bot_id)
+            else:
+                self._live.discard(bot_id)
+            bot = self._bots.get(bot_id)
+            if bot:
+                bot.x, bot.y = x, y
+                self._file(bot_id, bot)
+
+    def settled(self, bot_id: int):
+        """The bot's position is written - the database is current again"""
+        with self._lock:
+            self._live.discard(bot_id)
+
+    def set_load(self, bot_id: int, orders: int, status: Optional[BotStatus]):
+        with self._lock:
+            bot = self._bots.get(bot_id)
+            if bot:
+                bot.orders, bot.status = orders, status
+                self._file(bot_id, bot)
+
+    def set_status(self, bot_id: int, status: BotStatus):
+        with self._lock:
+            bot = self._bots.get(bot_id)
+            if bot:
+                bot.status = status
+                self._file(bot_id, bot)
+
+    def _file(self, bot_id: int, bot: IndexedBot):
+        """Put the bot in the bucket it belongs to, or none"""
+        cell = (bot.x // self.cell_size, bot.y // self.cell_size) if bot.accepting else None
+        old = self._filed.get(bot_id)
+        if old == cell:
+            return
+        if old is not None:
+            bucket = self._cells[old]
+            bucket.discard(bot_id)
+            if not bucket:
+                del self._cells[old]
+            del self._filed[bot_id]
+        if cell is not None:
+            self._cells.setdefault(cell, set()).add(bot_id)
+            self._filed[bot_id] = cell
+
+    # ============ Queries ============
+
+    def position(self, bot_id: int) -> Optional[Tuple[int, int]]:
+        bot = self._bots.get(bot_id)
+        return (bot.x, bot.y) if bot else None
+
+    def nearest(self, x: int, y: int, k: int) -> List[Tuple[int, int]]:
+        """Up to k (bot id, grid distance) with spare capacity, nearest first"""
+        size = self.cell_size
+        cx, cy = x // size, y // size
+        found: List[Tuple[int, int]] = []
+        with self._lock:
+            remaining = len(self._filed)
+            ring = 0
+            while remaining:
+                # Every bucket in this ring is at least (ring - 1) * size steps away
+                if len(found) >= k and ring and (ring - 1) * size >= found[k - 1][0]:
+                    break
+                if remaining < SCAN_BELOW or 8 * ring > remaining:
+                    # Few bots, or more buckets left to look at than bots
+                    found = heapq.nsmallest(k, (
+                        (abs(self._bots[bot_id].x - x) + abs(self._bots[bot_id].y - y), bot_id)
+                        for bot_id in self._filed
+                    ))
+                    break
+                for cell in self._ring(cx, cy, ring):
+                    for bot_id in self._cells.get(cell, ()):
+                        bot = self._bots[bot_id]
+                        found.append((abs(bot.x - x) + abs(bot.y - y), bot_id))
+                        remaining -= 1
+                found.sort()
+                ring += 1
+        return [(bot_id, distance) for distance, bot_id in found[:k]]
+
+    @staticmethod
+    def _ring(cx: int, cy: int, ring: int):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+    # ============ Reconciling ============
+
+    def reconcile(self, db: Session):
+        """Replace the index with what the database holds"""
+        rows = db.query(Bot.id, Bot.current_x, Bot.current_y, Bot.status, Bot.current_orders_count).all()
+        with self._lock:
+            old = self._bots
+            self._bots = {}
+            self._cells = {}
+            self._filed = {}
+            for bot_id, x, y, status, orders in rows:
+                if bot_id in self._live and bot_id in old:
+                    x, y = old[bot_id].x, old[bot_id].y
+                bot = IndexedBot(x, y, status, orders)
+                self._bots[bot_id] = bot
+                self._file(bot_id, bot)
+            self.loaded = True
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            self.reconcile(db)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.get_running_loop().create_task(self._run())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def _reconcile(self):
+        db = SessionLocal()
+        try:
+            self.reconcile(db)
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_seconds)
+            try:
+                # Queries are synchronous - keep them off the event loop
+                await asyncio.to_thread(self._reconcile)
+            except Exception as e:
+                print(f"Bot index reconcile error: {e}")
+
+
+bot_index = BotIndex()
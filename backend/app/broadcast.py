@@ -0,0 +1,286 @@
+"""
+Fan-out for server-sent events.
+
+One producer task keeps the streamed state - a set of keyed
+collections, e.g. {"bots": {id: {...}}} - and turns changes into delta
+events, serialized once and handed as the same bytes to every
+subscriber's queue.
+
+The producer is driven by the event bus: a published change marks
+entities dirty, the producer reloads just those (a short coalescing
+delay lets one commit's changes share an event) and publishes what
+actually changed. Nothing is queried while nothing changes or nobody
+listens.
+
+A delta lists the entities that are new or changed per collection and
+the keys removed ("removed_bots"). Events carry increasing ids,
+prefixed with a token picked when the broadcaster is created
+("<epoch>-<n>"):
+- a new client gets a full snapshot first, then deltas
+- a client reconnecting with Last-Event-ID gets only the deltas it
+  missed, while they are still in the replay buffer (else a snapshot)
+- an id from another epoch - before a restart, or from another
+  worker - gets a snapshot, its number means nothing here
+
+Queues are bounded so a slow client cannot hold the producer back. A
+client whose queue overflows loses its backlog and gets a fresh
+snapshot instead - skipping deltas would leave it with a wrong view.
+
+Other feeds (the binary WebSocket) register a listener instead of a
+queue: it is called on the event loop with each delta's changes and
+keeps the producer running like a subscriber does.
+"""
+import asyncio
+import json
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.config import STREAM_COALESCE_SECONDS, STREAM_QUEUE_SIZE, STREAM_REPLAY_SIZE
+from app.events import EventBus, event_bus
+
+# collection name -> entity key -> entity (None: gone, in a partial reload)
+State = Dict[str, Dict[Any, Optional[dict]]]
+
+# collection name -> keys to reload
+Dirty = Dict[str, Set[Any]]
+
+# (event id, encoded event); None in a queue means "resend a snapshot"
+Event = Tuple[Optional[int], bytes]
+
+# Called with (event id, changes) for every delta
+ChangeListener = Callable[[int, Dict[str, list]], None]
+
+
+def encode_event(data: str, event_id: Optional[str] = None) -> bytes:
+    """SSE wire format for one event"""
+    if event_id is None:
+        return f"data: {data}\n\n".encode()
+    return f"id: {event_id}\ndata: {data}\n\n".encode()
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        load: Callable[[Optional[Dirty]], State],
+        bus: EventBus = event_bus,
+        coalesce: float = STREAM_COALESCE_SECONDS,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        replay_size: int = STREAM_REPLAY_SIZE,
+        epoch: Optional[str] = None
+    ):
+        # load runs on a worker thread: load(None) returns the full state,
+        # load(dirty) those entities, None for the ones that are gone
+        self.load = load
+        self.bus = bus
+        self.coalesce = coalesce
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.epoch = epoch or uuid.uuid4().hex[:8]
+        self.last_id = 0
+        self.state: Optional[State] = None
+        self._replay: Deque[Event] = deque(maxlen=replay_size)
+        self._snapshot: Optional[Event] = None             # Cached for last_id
+        self._dirty: Dirty = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._listeners: List[ChangeListener] = []
+        self._wakeup = asyncio.Event()
+        self._ready = asyncio.Event()                       # State loaded
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # ============ Subscribers ============
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers or self._listeners)
+
+    async def ready(self):
+        """Wait for the state after the producer was idle"""
+        if self.state is None:
+            await self._ready.wait()
+
+    def add_listener(self, listener: ChangeListener):
+        self._listeners.append(listener)
+        self._wakeup.set()
+
+    def remove_listener(self, listener: ChangeListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+        self._wakeup.set()
+
+    def event_id(self, number: int) -> str:
+        """Wire form of an event id"""
+        return f"{self.epoch}-{number}"
+
+    def parse_event_id(self, value: Optional[str]) -> Optional[int]:
+        """Number of a Last-Event-ID sent by this broadcaster, else None"""
+        epoch, _, number = (value or "").rpartition("-")
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        return int(number)
+
+    def snapshot(self) -> Event:
+        """Full state as of last_id, serialized once per id"""
+        if self._snapshot is None or self._snapshot[0] != self.last_id:
+            data = {"type": "snapshot", "timestamp": datetime.utcnow().isoformat()}
+            data.update({name: list(entities.values()) for name, entities in self.state.items()})
+            self._snapshot = (self.last_id, encode_event(json.dumps(data), self.event_id(self.last_id)))
+        return self._snapshot
+
+    def missed_since(self, last_event_id: Optional[int]) -> Optional[List[Event]]:
+        """Events after last_event_id, None if the replay buffer no longer has them all"""
+        if last_event_id is None or last_event_id > self.last_id:
+            return None
+        if last_event_id == self.last_id:
+            return []
+        if not self._replay or self._replay[0][0] > last_event_id + 1:
+            return None
+        return [event for event in self._replay if event[0] > last_event_id]
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Events for one client, until it disconnects"""
+        resume_from = self.parse_event_id(last_event_id)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        self._wakeup.set()
+        try:
+            await self.ready()
+            # No await between this and the queue filling up, so the
+            # catch-up and the queued events neither overlap nor leave a gap
+            backlog = self.missed_since(resume_from)
+            if backlog is None:
+                backlog = [self.snapshot()]
+            sent = resume_from or 0
+            for event_id, event in backlog:
+                sent = event_id
+                yield event
+            while True:
+                item = await queue.get()
+                if item is None:
+                    item = self.snapshot()
+                event_id, event = item
+                if event_id is not None:
+                    # Already covered by a snapshot sent after a resync
+                    if event_id <= sent:
+                        continue
+                    sent = event_id
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+            self._wakeup.set()
+
+    def publish(self, event: Event):
+        """Hand one encoded event to every subscriber (event loop only)"""
+        for queue in self._subscribers:
+            if queue.full():
+                # Too far behind: drop the backlog, resync with a snapshot
+                self.dropped += queue.qsize()
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                continue
+            queue.put_nowait(event)
+
+    # ============ Producer ============
+
+    def start(self):
+        if not self._tasks:
+            self._loop = asyncio.get_running_loop()
+            self.bus.subscribe(self._on_event)
+            self._tasks = [self._loop.create_task(self._run())]
+
+    async def stop(self):
+        self.bus.unsubscribe(self._on_event)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def _on_event(self, collection: str, ids: Set[Any]):
+        # Any thread - hand over to the event loop
+        self._loop.call_soon_threadsafe(self._mark_dirty, collection, ids)
+
+    def _mark_dirty(self, collection: str, ids: Set[Any]):
+        if not self.active:
+            return
+        self._dirty.setdefault(collection, set()).update(ids)
+        self._wakeup.set()
+
+    def _apply(self, loaded: State) -> Dict[str, list]:
+        """Merge a partial reload into the state, return what changed"""
+        changes: Dict[str, list] = {}
+        for name, entities in loaded.items():
+            current = self.state.setdefault(name, {})
+            changed, removed = [], []
+            for key, entity in entities.items():
+                if entity is None:
+                    if current.pop(key, None) is not None:
+                        removed.append(key)
+                elif current.get(key) != entity:
+                    current[key] = entity
+                    changed.append(entity)
+            if changed:
+                changes[name] = changed
+            if removed:
+                changes[f"removed_{name}"] = removed
+        return changes
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self.active:
+                # Idle: deltas cannot bridge the time nobody was watching
+                self.state = None
+                self._dirty = {}
+                self._replay.clear()
+                self._ready.clear()
+                continue
+            if self.state is not None and not self._dirty:
+                continue
+
+            dirty = None
+            try:
+                if self.state is None:
+                    # Covers everything marked so far
+                    self._dirty = {}
+                    # Queries are synchronous - keep them off the event loop
+                    self.state = await asyncio.to_thread(self.load, None)
+                    # Clients start from a snapshot at this id
+                    self.last_id += 1
+                    self._ready.set()
+                    continue
+                # Let the rest of a burst (one commit, one tick) arrive
+                await asyncio.sleep(self.coalesce)
+                dirty, self._dirty = self._dirty, {}
+                changes = self._apply(await asyncio.to_thread(self.load, dirty))
+                if changes:
+                    self.last_id += 1
+                    data = {"type": "delta", "timestamp": datetime.utcnow().isoformat()}
+                    data.update(changes)
+                    event = (self.last_id, encode_event(json.dumps(data), self.event_id(self.last_id)))
+                    self._replay.append(event)
+                    self.publish(event)
+                    for listener in list(self._listeners):
+                        try:
+                            listener(self.last_id, changes)
+                        except Exception as e:
+                            print(f"Stream listener error: {e}")
+            except Exception as e:
+                print(f"Stream error: {e}")
+                self.publish((None, encode_event(json.dumps({"type": "error", "message": str(e)}))))
+                if dirty and self.state is not None:
+                    for name, keys in dirty.items():
+                        self._dirty.setdefault(name, set()).update(keys)
+                await asyncio.sleep(5)
+                self._wakeup.set()
@@ -0,0 +1,152 @@
+"""
+In-process restaurant catalog.
+
+Every restaurant with its node coordinates, loaded with one joined query
+and kept in memory, so order intake and the /api/restaurants routes do
+not query restaurants at all. Restaurants change rarely; the catalog is
+reloaded:
+  - after a commit that wrote a restaurant (ORM objects or bulk UPDATE /
+    DELETE on any session), announced on the event bus as "restaurants"
+    so other API workers drop their copy too with the postgres backend
+  - when the routing graph is reloaded (node coordinates)
+  - at least every RESTAURANT_CACHE_TTL_SECONDS, for edits made straight
+    in the database
+The static part of /api/map/data lists restaurants as well, so it is
+invalidated along with the catalog.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import RESTAURANT_CACHE_TTL_SECONDS
+from app.events import event_bus
+from app.map_cache import map_data_cache
+from app.models import Node, Restaurant
+from app.routing import get_routing_version
+from app.rows import RestaurantRow, select_rows
+
+
+@dataclass(slots=True)
+class CatalogEntry:
+    restaurant: RestaurantRow
+    x: Optional[int]
+    y: Optional[int]
+
+
+@dataclass
+class Catalog:
+    restaurants: Dict[int, CatalogEntry]
+    active: List[RestaurantRow]      # Active ones, by id
+
+    def get(self, restaurant_id: int) -> Optional[CatalogEntry]:
+        return self.restaurants.get(restaurant_id)
+
+    def of_type(self, restaurant_type: str) -> List[RestaurantRow]:
+        return [r for r in self.active if r.restaurant_type == restaurant_type]
+
+
+def load_catalog(db: Session) -> Catalog:
+    rows = db.execute(
+        select_rows(RestaurantRow)
+        .add_columns(Node.x, Node.y)
+        .outerjoin(Node, Node.id == Restaurant.node_id)
+        .order_by(Restaurant.id)
+    ).all()
+    restaurants = {}
+    for *columns, x, y in rows:
+        restaurant = RestaurantRow(*columns)
+        restaurants[restaurant.id] = CatalogEntry(restaurant, x, y)
+    active = [entry.restaurant for entry in restaurants.values() if entry.restaurant.is_active]
+    return Catalog(restaurants, active)
+
+
+class RestaurantCatalog:
+    def __init__(self, ttl: float = RESTAURANT_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        # Replaced as a whole so readers need no lock
+        self._catalog: Optional[Catalog] = None
+        self._routing_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Reload on the next request"""
+        with self._lock:
+            self._routing_version = None
+        map_data_cache.invalidate()
+
+    def _fresh(self) -> bool:
+        return (
+            self._catalog is not None
+            and self._routing_version == get_routing_version()
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def get(self, db: Session) -> Catalog:
+        catalog = self._catalog
+        if self._fresh():
+            return catalog
+        with self._lock:
+            # One request reloads, the others wait for its result
+            if not self._fresh():
+                routing_version = get_routing_version()
+                self._catalog = load_catalog(db)
+                self._routing_version = routing_version
+                self._loaded_at = time.monotonic()
+            return self._catalog
+
+    def known_ids(self) -> Set[int]:
+        catalog = self._catalog
+        return set(catalog.restaurants) if catalog else set()
+
+    def on_event(self, collection: str, ids: Set[int]):
+        """Event bus listener"""
+        if collection == "restaurants":
+            self.invalidate()
+
+
+restaurant_catalog = RestaurantCatalog()
+event_bus.subscribe(restaurant_catalog.on_event)
+
+
+# ============ Write tracking ============
+
+# Restaurant ids written in a session's current transaction
+WRITTEN_KEY = "restaurants_written"
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context):
+    written = {
+        obj.id for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Restaurant)
+    }
+    if written:
+        session.info.setdefault(WRITTEN_KEY, set()).update(written)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ is Restaurant for mapper in orm_execute_state.all_mappers):
+        # Which rows match is unknown - treat every restaurant as changed
+        # (0 when nothing is cached yet: listeners only need a non-empty event)
+        orm_execute_state.session.info.setdefault(WRITTEN_KEY, set()).update(restaurant_catalog.known_ids() or {0})
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_writes(session: Session):
+    written = session.info.pop(WRITTEN_KEY, None)
+    if written:
+        event_bus.publish("restaurants", written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session: Session):
+    session.info.pop(WRITTEN_KEY, None)
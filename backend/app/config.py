@@ -0,0 +1,110 @@
+import os
+
+
+# ============ Map ============
+
+# Grid dimensions used when seeding an empty database.
+# An existing database keeps the size it was seeded with - the routing
+# engine reads the real dimensions from the nodes table.
+GRID_WIDTH = int(os.getenv("GRID_WIDTH", "9"))
+GRID_HEIGHT = int(os.getenv("GRID_HEIGHT", "9"))
+
+# /api/map/data re-reads nodes, blocked paths and restaurants at most this
+# often (and whenever the routing graph is reloaded)
+MAP_CACHE_TTL_SECONDS = float(os.getenv("MAP_CACHE_TTL_SECONDS", "60"))
+
+# The in-process restaurant catalog is dropped on restaurant writes and
+# re-read at least this often, for edits made straight in the database
+RESTAURANT_CACHE_TTL_SECONDS = float(os.getenv("RESTAURANT_CACHE_TTL_SECONDS", "300"))
+
+
+# ============ Routing ============
+
+# auto | table | astar | hierarchical
+# auto picks the all-pairs table for small grids and plain A* for larger
+# ones. hierarchical (HPA*) is opt-in: on the 1000x1000 benchmark it
+# answers slower than plain A* and takes ~10s to build.
+ROUTING_MODE = os.getenv("ROUTING_MODE", "auto")
+
+# Cluster edge length for hierarchical routing
+ROUTING_CLUSTER_SIZE = int(os.getenv("ROUTING_CLUSTER_SIZE", "32"))
+
+
+# ============ Fleet ============
+
+# Bots in the fleet - missing ones are added at startup, none are removed
+FLEET_SIZE = int(os.getenv("FLEET_SIZE", "5"))
+
+# Max orders a bot carries at once
+BOT_CAPACITY = int(os.getenv("BOT_CAPACITY", "3"))
+
+# Simulated travel time per grid step and time spent at a pickup
+SECONDS_PER_STEP = 1
+PICKUP_SECONDS = 1
+
+# Simulated bot positions are written to the database in batches at most
+# this many seconds apart (status changes are written right away)
+SIMULATION_FLUSH_SECONDS = float(os.getenv("SIMULATION_FLUSH_SECONDS", "0.3"))
+
+# A moving bot's trajectory is published again once the bot is this many
+# seconds ahead of or behind it
+TRAJECTORY_TOLERANCE_SECONDS = float(os.getenv("TRAJECTORY_TOLERANCE_SECONDS", "0.5"))
+
+# Pending orders are assigned as soon as a bot frees capacity; they are
+# also re-read from the database this often, for orders left pending by
+# other workers or before a restart
+DISPATCH_SWEEP_SECONDS = float(os.getenv("DISPATCH_SWEEP_SECONDS", "10"))
+
+# Available bots are indexed in square buckets of this many grid cells;
+# an order is scored against the ASSIGN_CANDIDATES nearest of them
+BOT_INDEX_CELL_SIZE = int(os.getenv("BOT_INDEX_CELL_SIZE", "16"))
+ASSIGN_CANDIDATES = int(os.getenv("ASSIGN_CANDIDATES", "8"))
+
+# The bot index is checked against the database this often
+BOT_INDEX_RECONCILE_SECONDS = float(os.getenv("BOT_INDEX_RECONCILE_SECONDS", "60"))
+
+# Fleet sizing sweeps (POST /api/simulation/sweep) run in the background on
+# one process pool shared by every sweep, with this many worker processes
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", "1"))
+
+
+# ============ Rate limiting ============
+
+# Orders accepted per restaurant in any sliding window
+RESTAURANT_ORDER_LIMIT = 3
+RESTAURANT_ORDER_WINDOW = 30
+
+# memory: per process | sqlite: shared by all workers on the host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "/tmp/fastroute_rate_limit.db")
+
+
+# ============ Streaming ============
+
+# A change is streamed this many seconds after it is published, so the
+# rest of the same commit or simulator tick goes out in the same event
+STREAM_COALESCE_SECONDS = float(os.getenv("STREAM_COALESCE_SECONDS", "0.02"))
+
+# Events buffered per client; a client that falls further behind is
+# resynced with a snapshot
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "8"))
+
+# Delta events kept for clients resuming with Last-Event-ID
+STREAM_REPLAY_SIZE = int(os.getenv("STREAM_REPLAY_SIZE", "256"))
+
+# /api/ws/fleet: order updates are batched this many seconds; messages
+# buffered per client before it is resynced with a snapshot
+WS_ORDER_INTERVAL_SECONDS = float(os.getenv("WS_ORDER_INTERVAL_SECONDS", "2"))
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "32"))
+
+
+# /api/map/stats counters are checked against the database this often
+STATS_RECONCILE_SECONDS = float(os.getenv("STATS_RECONCILE_SECONDS", "60"))
+
+
+# ============ Events ============
+
+# memory: changes reach this worker's streams only
+# postgres: also relayed to other workers with LISTEN/NOTIFY
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "fastroute_events")
@@ -0,0 +1,112 @@
+"""
+Live dashboard counters for /api/map/stats.
+
+Orders per status and bots per status are kept in memory and adjusted
+on every transition (orders and bots routers, fleet simulator), so the
+stats endpoint runs no queries. A GROUP BY over orders and a read of the
+bot statuses reconcile them every STATS_RECONCILE_SECONDS, which also
+picks up changes made outside this process (other API workers, manual
+edits) and any drift from a transition that raced another.
+"""
+import asyncio
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import STATS_RECONCILE_SECONDS
+from app.database import SessionLocal
+from app.models import Bot, BotStatus, Order, OrderStatus
+
+
+class StatusCounters:
+    def __init__(self, reconcile_seconds: float = STATS_RECONCILE_SECONDS):
+        self.reconcile_seconds = reconcile_seconds
+        self._orders: Counter = Counter()              # OrderStatus -> orders
+        self._bot_statuses: Dict[int, BotStatus] = {}  # Per bot: transitions only know the new status
+        self._bots: Counter = Counter()                # BotStatus -> bots
+        self._lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    # ============ Transitions ============
+
+    def order_changed(self, old: Optional[OrderStatus], new: Optional[OrderStatus]):
+        """An order moved from old to new; None for created / deleted"""
+        if old == new:
+            return
+        with self._lock:
+            if old is not None:
+                self._orders[old] -= 1
+            if new is not None:
+                self._orders[new] += 1
+
+    def bot_changed(self, bot_id: int, status: Optional[BotStatus]):
+        """A bot's status is now status (None: the bot is gone)"""
+        with self._lock:
+            old = self._bot_statuses.pop(bot_id, None)
+            if old is not None:
+                self._bots[old] -= 1
+            if status is not None:
+                self._bot_statuses[bot_id] = status
+                self._bots[status] += 1
+
+    # ============ Reading ============
+
+    def orders(self, *statuses: OrderStatus) -> int:
+        """Orders in any of the statuses, or all orders"""
+        if not statuses:
+            return sum(self._orders.values())
+        return sum(self._orders[status] for status in statuses)
+
+    def bots(self, status: BotStatus) -> int:
+        return self._bots[status]
+
+    # ============ Reconciling ============
+
+    def reconcile(self, db: Session):
+        """Replace the counters with what the database holds"""
+        orders = Counter(dict(db.query(Order.status, func.count(Order.id)).group_by(Order.status).all()))
+        bot_statuses = dict(db.query(Bot.id, Bot.status).all())
+        bots = Counter(bot_statuses.values())
+        with self._lock:
+            drift = sum(abs(orders[s] - self._orders[s]) for s in OrderStatus)
+            if drift and self._orders:
+                print(f"Stats counters reconciled, {drift} orders off")
+            self._orders = orders
+            self._bot_statuses = bot_statuses
+            self._bots = bots
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.get_running_loop().create_task(self._run())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def _reconcile(self):
+        db = SessionLocal()
+        try:
+            self.reconcile(db)
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_seconds)
+            try:
+                # Queries are synchronous - keep them off the event loop
+                await asyncio.to_thread(self._reconcile)
+            except Exception as e:
+                print(f"Stats reconcile error: {e}")
+
+
+status_counters = StatusCounters()
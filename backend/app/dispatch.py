@@ -0,0 +1,247 @@
+"""
+Pending-order dispatcher.
+
+create_order leaves an order PENDING when every bot is full. Those
+orders wait in an in-memory priority queue, oldest first, and are
+assigned in bulk whenever capacity comes back: code that releases a bot
+slot (delivery, cancellation, a bot coming back online) calls
+capacity_released(), which wakes the dispatcher task.
+
+One dispatch pops orders in priority order and gives each to the best
+of the bots nearest its restaurant, the same ranking create_order uses,
+until the queue or the capacity runs out. Bots and their tours are
+loaded once per dispatch and kept up to date as orders are added. Each
+order is claimed with a conditional UPDATE (still PENDING, no bot), so
+an order cancelled meanwhile or taken by another worker's dispatcher is
+skipped and its reserved slot given back. The bot's new tour is routed
+and its ETAs stored as with create_order (app/plans.py).
+
+Every DISPATCH_SWEEP_SECONDS the queue is reconciled with the pending
+orders in the database, which picks up orders from other workers and
+from before a restart, and capacity released by other workers.
+"""
+import asyncio
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+
+from app.assignment import BotCandidate, load_candidates, nearest_bot_ids, rank_bots
+from app.bot_index import bot_index
+from app.config import BOT_CAPACITY, DISPATCH_SWEEP_SECONDS
+from app.counters import status_counters
+from app.database import SessionLocal
+from app.events import event_bus
+from app.models import BotStatus, Order, OrderStatus
+from app.plans import route_plans, write_estimates
+from app.reservations import release_bot, reserve_bot
+from app.tours import TourOrder
+
+# (created_at, order id): oldest first, ids break ties
+Priority = Tuple[datetime, int]
+
+
+def pending_priority(order_id: int, created_at: Optional[datetime]) -> Priority:
+    return (created_at or datetime.min, order_id)
+
+
+class PendingDispatcher:
+    def __init__(self, sweep_seconds: float = DISPATCH_SWEEP_SECONDS):
+        self.sweep_seconds = sweep_seconds
+        self.assigned = 0                            # Orders assigned from the queue
+        self._heap: List[Priority] = []
+        # Queued orders; ones missing here are skipped when popped
+        self._orders: Dict[int, TourOrder] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ============ Queue ============
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def enqueue(self, order: Order):
+        """Queue a committed PENDING order"""
+        with self._lock:
+            self._push(pending_priority(order.id, order.created_at), TourOrder(
+                order_id=order.id,
+                pickup_node_id=order.pickup_node_id,
+                delivery_node_id=order.delivery_node_id
+            ))
+
+    def discard(self, order_id: int):
+        """The order is no longer pending (cancelled, deleted, assigned by hand)"""
+        with self._lock:
+            self._orders.pop(order_id, None)
+
+    def _push(self, priority: Priority, order: TourOrder):
+        if order.order_id not in self._orders:
+            heapq.heappush(self._heap, priority)
+        self._orders[order.order_id] = order
+
+    def _pop(self) -> Optional[Tuple[Priority, TourOrder]]:
+        with self._lock:
+            while self._heap:
+                priority = heapq.heappop(self._heap)
+                order = self._orders.pop(priority[1], None)
+                if order:
+                    return priority, order
+            return None
+
+    def _requeue(self, entries: List[Tuple[Priority, TourOrder]]):
+        with self._lock:
+            for priority, order in entries:
+                self._push(priority, order)
+
+    # ============ Waking ============
+
+    def capacity_released(self):
+        """A bot slot was given back - dispatch now. Any thread."""
+        if self._loop and self._orders:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+
+    async def _run(self):
+        sweep = True   # Load what is pending in the database first
+        while True:
+            try:
+                # Queries are synchronous - keep them off the event loop
+                if sweep:
+                    await asyncio.to_thread(self.sweep)
+                if self._orders:
+                    await asyncio.to_thread(self.dispatch)
+            except Exception as e:
+                print(f"Dispatch error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.sweep_seconds)
+                sweep = False
+            except asyncio.TimeoutError:
+                sweep = True
+            self._wakeup.clear()
+
+    # ============ Dispatching ============
+
+    def sweep(self):
+        """Reconcile the queue with the pending orders in the database"""
+        with self._lock:
+            queued = set(self._orders)
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Order.id, Order.created_at, Order.pickup_node_id, Order.delivery_node_id
+            ).filter(Order.status == OrderStatus.PENDING, Order.bot_id.is_(None)).all()
+        finally:
+            db.close()
+
+        pending = {row.id for row in rows}
+        with self._lock:
+            # Only drop what was queued before the query - newer ones may not be visible to it
+            for order_id in queued - pending:
+                self._orders.pop(order_id, None)
+            for order_id, created_at, pickup_node_id, delivery_node_id in rows:
+                if order_id not in self._orders:
+                    self._push(pending_priority(order_id, created_at), TourOrder(order_id, pickup_node_id, delivery_node_id))
+
+    def dispatch(self) -> int:
+        """Assign queued orders to bots with spare capacity, oldest first. Returns how many."""
+        if not self._orders:
+            return 0
+        db = SessionLocal()
+        popped: List[Tuple[Priority, TourOrder]] = []
+        skipped: List[Tuple[Priority, TourOrder]] = []
+        assigned: List[Tuple[int, int]] = []        # (order id, bot id)
+        try:
+            bot_index.ensure_loaded(db)
+            # Loaded bots with room, updated as orders are added; None: full
+            candidates: Dict[int, Optional[BotCandidate]] = {}
+
+            while len(bot_index):
+                entry = self._pop()
+                if entry is None:
+                    break
+                popped.append(entry)
+                order = entry[1]
+
+                nearby = nearest_bot_ids(db, order.pickup_node_id)
+                missing = [bot_id for bot_id in nearby if bot_id not in candidates]
+                if missing:
+                    _, loaded = load_candidates(db, missing)
+                    candidates.update({bot_id: None for bot_id in missing})
+                    candidates.update({c.bot_id: c for c in loaded})
+
+                chosen = None
+                nearby_candidates = [candidates[bot_id] for bot_id in nearby if candidates[bot_id]]
+                for assignment in rank_bots(nearby_candidates, order):
+                    if reserve_bot(db, assignment.bot_id):
+                        chosen = assignment
+                        break
+                    # Filled up by a concurrent request
+                    candidates[assignment.bot_id] = None
+                if chosen is None:
+                    # No bot with room can reach it - keep it for later
+                    skipped.append(entry)
+                    continue
+
+                claimed = db.execute(
+                    update(Order)
+                    .where(Order.id == order.order_id, Order.status == OrderStatus.PENDING, Order.bot_id.is_(None))
+                    .values(bot_id=chosen.bot_id, status=OrderStatus.ASSIGNED, assigned_at=datetime.utcnow())
+                    .returning(Order.id)
+                    .execution_options(synchronize_session=False)
+                ).first()
+                if claimed is None:
+                    # Cancelled, deleted or assigned elsewhere meanwhile
+                    release_bot(db, chosen.bot_id)
+                    continue
+
+                write_estimates(db, route_plans.plan(chosen.bot_id, chosen.tour))
+                assigned.append((order.order_id, chosen.bot_id))
+                candidate = candidates[chosen.bot_id]
+                candidate.orders_count += 1
+                candidate.orders.append(order)
+                candidate.tour_distance = chosen.tour.distance
+                if candidate.orders_count >= BOT_CAPACITY:
+                    candidates[chosen.bot_id] = None
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._requeue(popped)
+            raise
+        finally:
+            db.close()
+        self._requeue(skipped)
+
+        if assigned:
+            bot_ids: Set[int] = {bot_id for _, bot_id in assigned}
+            for _ in assigned:
+                status_counters.order_changed(OrderStatus.PENDING, OrderStatus.ASSIGNED)
+            for bot_id in bot_ids:
+                status_counters.bot_changed(bot_id, BotStatus.BUSY)
+            self.assigned += len(assigned)
+            print(f"📦 Dispatched {len(assigned)} pending orders to {len(bot_ids)} bots, {len(self)} still waiting")
+            event_bus.publish("orders", [order_id for order_id, _ in assigned])
+            event_bus.publish("bots", bot_ids)
+        return len(assigned)
+
+
+order_dispatcher = PendingDispatcher()
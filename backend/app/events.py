@@ -0,0 +1,150 @@
+"""
+In-process event bus: code that changes orders or bots publishes which
+ones changed, listeners (the SSE stream) react right away instead of
+polling the database.
+
+An event is (collection, ids), e.g. ("orders", {12}), meaning "reload
+these". Publish after the change is committed, or once it is visible
+through the fleet simulator's live state.
+
+Listeners are called on the publishing thread and must return quickly.
+
+With EVENT_BUS_BACKEND=postgres every publish is also sent with
+Postgres NOTIFY, and notifications from other API workers are delivered
+to this worker's listeners, so every worker's stream sees every change.
+"""
+import json
+import select
+import threading
+import uuid
+from typing import Callable, Iterable, List, Optional, Set
+
+from app.config import EVENT_BUS_BACKEND, EVENT_BUS_CHANNEL
+
+Listener = Callable[[str, Set[int]], None]
+
+# NOTIFY payloads are limited to 8000 bytes
+NOTIFY_BATCH = 500
+
+
+class EventBus:
+    def __init__(self):
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+        self._bridge: Optional["PostgresNotifyBridge"] = None
+
+    def subscribe(self, listener: Listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish(self, collection: str, ids: Iterable[int]):
+        """Tell every listener (and other workers) these entities changed"""
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return
+        self.deliver(collection, ids)
+        if self._bridge:
+            self._bridge.send(collection, ids)
+
+    def deliver(self, collection: str, ids: Set[int]):
+        """Call the local listeners only"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(collection, ids)
+            except Exception as e:
+                print(f"Event listener error: {e}")
+
+    # ============ Cross-worker bridge ============
+
+    def start(self, backend: str = EVENT_BUS_BACKEND):
+        if backend == "memory" or self._bridge:
+            return
+        if backend != "postgres":
+            raise ValueError(f"Unknown event bus backend: {backend}")
+        self._bridge = PostgresNotifyBridge(self)
+        self._bridge.start()
+
+    def stop(self):
+        if self._bridge:
+            self._bridge.stop()
+            self._bridge = None
+
+
+class PostgresNotifyBridge:
+    """Relays events between API workers over LISTEN/NOTIFY"""
+
+    def __init__(self, bus: EventBus, channel: str = EVENT_BUS_CHANNEL):
+        self.bus = bus
+        self.channel = channel
+        # Skips our own notifications - they were delivered locally already
+        self.origin = uuid.uuid4().hex
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def send(self, collection: str, ids: Set[int]):
+        from sqlalchemy import text
+        from app.database import engine
+
+        ids = sorted(ids)
+        try:
+            with engine.begin() as conn:
+                for i in range(0, len(ids), NOTIFY_BATCH):
+                    payload = json.dumps({
+                        "origin": self.origin,
+                        "collection": collection,
+                        "ids": ids[i:i + NOTIFY_BATCH]
+                    })
+                    conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+        except Exception as e:
+            # Other workers miss this change; local listeners already have it
+            print(f"Event bus notify error: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._listen, name="event-bus-listen", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _listen(self):
+        import psycopg2
+        from app.database import DATABASE_URL
+
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(DATABASE_URL)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f'LISTEN "{self.channel}"')
+                print(f"✅ Event bus listening on {self.channel}")
+                while not self._stopped.is_set():
+                    # Wake up regularly to notice stop()
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._receive(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Event bus listen error: {e}")
+                self._stopped.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _receive(self, payload: str):
+        event = json.loads(payload)
+        if event["origin"] != self.origin:
+            self.bus.deliver(event["collection"], set(event["ids"]))
+
+
+# Shared by the routers, the fleet simulator and the stream
+event_bus = EventBus()
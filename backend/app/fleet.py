@@ -0,0 +1,533 @@
+"""
+Fleet simulator: one asyncio loop drives every simulated bot.
+
+Each tick (SECONDS_PER_STEP) moves every bot with simulated orders one
+grid step along its tour, so the work per tick is one pass over the
+active bots in a single worker thread - no thread or session is held
+per delivery.
+
+A bot drives to the first stop of its planned tour, then re-plans, so
+orders started while it is moving join the tour at the next stop. While
+the bot's orders are those of its stored route plan (app/plans.py) the
+plan is followed without routing again; otherwise the new tour is routed,
+stored and its ETAs written.
+Stopping an order's simulation abandons the leg towards it at the next
+tick.
+
+Moves are not published step by step: a moving bot has a trajectory,
+its planned path with the time it is due at every waypoint
+(app/trajectory.py), published once and interpolated by clients. A bot
+is published again only when it deviates from its trajectory or stops.
+
+Writes are buffered (write-behind): positions live in memory and are
+written when a bot's trajectory is published or cleared, within
+SIMULATION_FLUSH_SECONDS; status changes (picked up, delivered, ...) at
+the end of the tick they happen in. A flush is one UPDATE per new order
+status and one bulk UPDATE of bots. An order that left the simulated
+statuses meanwhile (cancelled through the API) is not written, and only
+the bots of orders whose delivery was actually written get their slot
+back and the delivery credited. Readers overlay live_position / live_trajectory /
+live_order_status on what they load, so they never see a stale position
+between flushes.
+
+Trajectory and status changes are published on the event bus at the end
+of each tick, bot counters once a flush has written them.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Integer, bindparam, func, update
+
+from app.bot_index import bot_index
+from app.config import SECONDS_PER_STEP, PICKUP_SECONDS, SIMULATION_FLUSH_SECONDS, TRAJECTORY_TOLERANCE_SECONDS
+from app.counters import status_counters
+from app.database import SessionLocal
+from app.dispatch import order_dispatcher
+from app.events import event_bus
+from app.models import Bot, Order, OrderStatus
+from app.plans import route_plans, write_estimates
+from app.reservations import released_values
+from app.routing import UNREACHABLE, get_node_coords, get_node_id
+from app.tours import PICKUP, TourOrder, TourStop, plan_tour
+from app.trajectory import Trajectory, build_trajectory, plan_trajectory
+
+
+# Statuses of an order that still needs the bot
+SIMULATED_STATUSES = [
+    OrderStatus.ASSIGNED,
+    OrderStatus.PICKING_UP,
+    OrderStatus.PICKED_UP,
+    OrderStatus.DELIVERING
+]
+
+# Ticks a bot waits at a pickup
+PICKUP_TICKS = max(1, round(PICKUP_SECONDS / SECONDS_PER_STEP))
+
+# A buffered status change: (new status, delivered at, status stored before it)
+PendingStatus = Tuple[OrderStatus, Optional[datetime], OrderStatus]
+
+
+def flush_orders(order_ids: List[int], status: OrderStatus, delivered_at: Optional[datetime]):
+    """
+    Set the status of those orders that are still simulated - not ones
+    cancelled through the API meanwhile. Returns (id, bot id) of each row
+    written.
+    """
+    values = {"status": status}
+    if delivered_at is not None:
+        values["delivered_at"] = delivered_at
+    return (
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status.in_(SIMULATED_STATUSES))
+        .values(**values)
+        .returning(Order.id, Order.bot_id)
+    )
+
+
+# Run with one parameter set per bot (executemany)
+_released = bindparam("released", type_=Integer)
+FLUSH_BOTS = (
+    update(Bot)
+    .where(Bot.id == bindparam("bot_id"))
+    .values(
+        current_x=func.coalesce(bindparam("x", type_=Integer), Bot.current_x),
+        current_y=func.coalesce(bindparam("y", type_=Integer), Bot.current_y),
+        total_deliveries=Bot.total_deliveries + _released,
+        **released_values(_released)
+    )
+)
+
+
+@dataclass
+class BotRun:
+    bot_id: int
+    order_ids: Set[int] = field(default_factory=set)
+    node_id: Optional[int] = None                          # Live position, loaded on the first tick
+    stop: Optional[TourStop] = None                        # Stop the bot is heading to
+    leg: Deque[int] = field(default_factory=deque)         # Nodes left on the way there
+    dwell: int = 0                                         # Ticks left at a pickup
+
+
+class FleetSimulator:
+    def __init__(
+        self,
+        tick_seconds: float = SECONDS_PER_STEP,
+        flush_seconds: float = SIMULATION_FLUSH_SECONDS,
+        tolerance: float = TRAJECTORY_TOLERANCE_SECONDS
+    ):
+        self.tick_seconds = tick_seconds
+        self.flush_seconds = flush_seconds
+        self.tolerance = tolerance
+        self.trajectories_published = 0
+        # order id -> bot id of every simulated order
+        self.active_simulations: Dict[int, int] = {}
+        self._runs: Dict[int, BotRun] = {}
+        self._trajectories: Dict[int, Trajectory] = {}      # Moving bots
+        self._now = 0.0                                    # Start of the current tick (epoch seconds)
+
+        # Write-behind buffers. Positions stay until written and the bot
+        # stops moving; order updates move to _flushing while being written.
+        self._positions: Dict[int, Tuple[int, int]] = {}   # bot id -> (x, y)
+        self._dirty_positions: Set[int] = set()
+        self._order_updates: Dict[int, PendingStatus] = {}
+        self._flushing: Dict[int, PendingStatus] = {}
+        self._changed_bots: Set[int] = set()               # New trajectory, not published yet
+        self._changed_orders: Set[int] = set()
+
+        # Guards everything above: endpoints run on the threadpool
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    # ============ Tracking ============
+
+    def is_active(self, order_id: int) -> bool:
+        return order_id in self.active_simulations
+
+    def track(self, order_id: int, bot_id: int):
+        """Start simulating an order; its bot picks it up at the next stop"""
+        with self._lock:
+            self.active_simulations[order_id] = bot_id
+            self._runs.setdefault(bot_id, BotRun(bot_id)).order_ids.add(order_id)
+
+    def untrack(self, order_id: int) -> bool:
+        """Stop simulating an order. False if it was not simulated."""
+        with self._lock:
+            bot_id = self.active_simulations.pop(order_id, None)
+            if bot_id is None:
+                return False
+            run = self._runs.get(bot_id)
+            if run:
+                run.order_ids.discard(order_id)
+                if not run.order_ids:
+                    del self._runs[bot_id]
+                    self._clear_trajectory(bot_id)
+            return True
+
+    def _drop_run(self, bot_id: int):
+        with self._lock:
+            run = self._runs.pop(bot_id, None)
+            for order_id in run.order_ids if run else ():
+                self.active_simulations.pop(order_id, None)
+            self._clear_trajectory(bot_id)
+        route_plans.drop(bot_id)
+
+    # ============ Live state ============
+
+    def live_position(self, bot_id: int) -> Optional[Tuple[int, int]]:
+        """Current (x, y) of a simulated bot, None if the database is current"""
+        return self._positions.get(bot_id)
+
+    def live_trajectory(self, bot_id: int) -> Optional[Trajectory]:
+        """Where a moving bot is due and when, None if it is not moving"""
+        return self._trajectories.get(bot_id)
+
+    def live_order_status(self, order_id: int) -> Optional[OrderStatus]:
+        """Status of an order not written yet, None if the database is current"""
+        pending = self._order_updates.get(order_id) or self._flushing.get(order_id)
+        return pending[0] if pending else None
+
+    def _move(self, run: BotRun, node_id: int):
+        run.node_id = node_id
+        x, y = get_node_coords(node_id)
+        with self._lock:
+            # Written with the next trajectory change
+            self._positions[run.bot_id] = (x, y)
+        bot_index.move(run.bot_id, x, y, live=True)
+        route_plans.moved(run.bot_id, node_id)
+        trajectory = self._trajectories.get(run.bot_id)
+        if trajectory is None or not trajectory.follow(node_id, self._now, self.tolerance):
+            self._update_trajectory(run, force=True)
+
+    # ============ Trajectories ============
+
+    def _update_trajectory(self, run: BotRun, force: bool = False):
+        """Publish where the bot is heading, unless its trajectory already says so"""
+        dwell = PICKUP_TICKS * self.tick_seconds
+        plan = route_plans.get(run.bot_id)
+        if (
+            plan and plan.current and plan.position == run.node_id
+            and plan.next_stop < len(plan.tour.stops) and plan.tour.stops[plan.next_stop] == run.stop
+        ):
+            trajectory = plan_trajectory(plan, self._now, self.tick_seconds, dwell)
+        else:
+            # Off the plan: just the current leg
+            pickups = {len(run.leg): 1} if run.stop.action == PICKUP else {}
+            trajectory = build_trajectory([run.node_id, *run.leg], self._now, self.tick_seconds, dwell, pickups)
+
+        current = self._trajectories.get(run.bot_id)
+        if not force and current and current.continues_as(trajectory, self.tolerance):
+            return
+        with self._lock:
+            self._trajectories[run.bot_id] = trajectory
+            self._dirty_positions.add(run.bot_id)
+            self._changed_bots.add(run.bot_id)
+        self.trajectories_published += 1
+
+    def _clear_trajectory(self, bot_id: int):
+        """The bot stopped (caller holds the lock)"""
+        if self._trajectories.pop(bot_id, None) is not None:
+            self._dirty_positions.add(bot_id)
+            self._changed_bots.add(bot_id)
+
+    def _set_status(
+        self,
+        order_id: int,
+        status: OrderStatus,
+        previous: OrderStatus,
+        delivered_at: Optional[datetime] = None
+    ):
+        """previous: the stored status, if no newer one is buffered. Counted once written."""
+        with self._lock:
+            pending = self._order_updates.get(order_id)
+            if pending:
+                previous = pending[2]
+            elif order_id in self._flushing:
+                previous = self._flushing[order_id][0]
+            self._order_updates[order_id] = (status, delivered_at, previous)
+            self._changed_orders.add(order_id)
+
+    # ============ Loop ============
+
+    def start(self):
+        """Start the tick and flush loops on the running event loop"""
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._run()), loop.create_task(self._run_flushes())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        # Write whatever is still buffered, moving bots where they are now
+        with self._lock:
+            self._dirty_positions |= self._positions.keys()
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            print(f"Simulation flush error: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            if self._runs:
+                try:
+                    # DB work is synchronous - keep it off the event loop
+                    await asyncio.to_thread(self.tick)
+                except Exception as e:
+                    print(f"Simulation error: {e}")
+            await asyncio.sleep(max(0.0, self.tick_seconds - (loop.time() - started)))
+
+    async def _run_flushes(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            if self._dirty_positions:
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"Simulation flush error: {e}")
+
+    def tick(self):
+        """Advance every simulated bot by one step"""
+        with self._lock:
+            runs = list(self._runs.values())
+        if not runs:
+            return
+        self._now = time.time()
+
+        db = SessionLocal()
+        try:
+            self._load_positions(db, [run for run in runs if run.node_id is None])
+            for run in runs:
+                if run.node_id is None:
+                    # Bot no longer exists
+                    self._drop_run(run.bot_id)
+                    continue
+                try:
+                    self._advance(db, run)
+                except Exception as e:
+                    print(f"Simulation error for bot {run.bot_id}: {e}")
+                    self._drop_run(run.bot_id)
+        finally:
+            db.close()
+
+        with self._lock:
+            changed_bots, changed_orders = self._changed_bots, self._changed_orders
+            self._changed_bots, self._changed_orders = set(), set()
+        event_bus.publish("bots", changed_bots)
+        event_bus.publish("orders", changed_orders)
+
+        # Status changes are written at the end of the tick they happen in
+        if self._order_updates:
+            self.flush()
+
+    def _load_positions(self, db, runs: List[BotRun]):
+        if not runs:
+            return
+        rows = db.query(Bot.id, Bot.current_x, Bot.current_y).filter(
+            Bot.id.in_([run.bot_id for run in runs])
+        ).all()
+        stored = {bot_id: (x, y) for bot_id, x, y in rows}
+        for run in runs:
+            # A position still in the buffer is newer than the stored one
+            position = self._positions.get(run.bot_id) or stored.get(run.bot_id)
+            if position:
+                run.node_id = get_node_id(*position)
+
+    # ============ Flushing ============
+
+    def flush(self):
+        """Write buffered positions and status changes"""
+        with self._flush_lock:
+            with self._lock:
+                positions = {
+                    bot_id: self._positions[bot_id] for bot_id in self._dirty_positions
+                    if bot_id in self._positions
+                }
+                order_updates = self._order_updates
+                self._flushing = order_updates
+                self._dirty_positions, self._order_updates = set(), {}
+            if not (positions or order_updates):
+                return
+
+            db = SessionLocal()
+            written: Dict[int, Optional[int]] = {}          # order id -> bot id, rows updated
+            try:
+                # Core statements on the connection, not ORM bulk update
+                conn = db.connection()
+                by_status: Dict[Tuple[OrderStatus, Optional[datetime]], List[int]] = {}
+                for order_id, (status, delivered_at, _) in order_updates.items():
+                    by_status.setdefault((status, delivered_at), []).append(order_id)
+                for (status, delivered_at), order_ids in by_status.items():
+                    written.update(conn.execute(flush_orders(order_ids, status, delivered_at)).all())
+                # Only deliveries that were written give their slot back
+                released = Counter(
+                    bot_id for order_id, bot_id in written.items()
+                    if bot_id and order_updates[order_id][0] == OrderStatus.DELIVERED
+                )
+                bot_ids = positions.keys() | released.keys()
+                if bot_ids:
+                    conn.execute(FLUSH_BOTS, [
+                        {
+                            "bot_id": bot_id,
+                            "x": positions[bot_id][0] if bot_id in positions else None,
+                            "y": positions[bot_id][1] if bot_id in positions else None,
+                            "released": released.get(bot_id, 0)
+                        }
+                        for bot_id in bot_ids
+                    ])
+                db.commit()
+                for order_id in written:
+                    status, _, previous = order_updates[order_id]
+                    status_counters.order_changed(previous, status)
+                if released:
+                    # Bots whose last order was delivered are available again
+                    for bot_id, status, orders in db.query(
+                        Bot.id, Bot.status, Bot.current_orders_count
+                    ).filter(Bot.id.in_(released.keys())):
+                        status_counters.bot_changed(bot_id, status)
+                        bot_index.set_load(bot_id, orders, status)
+                    order_dispatcher.capacity_released()
+            except Exception:
+                db.rollback()
+                # Put the batch back unless something newer replaced it
+                with self._lock:
+                    self._dirty_positions |= positions.keys()
+                    for order_id, pending in order_updates.items():
+                        self._order_updates.setdefault(order_id, pending)
+                raise
+            finally:
+                db.close()
+                self._flushing = {}
+
+            # Counters changed; completed orders leave the active set
+            event_bus.publish("bots", released.keys())
+            event_bus.publish("orders", order_updates.keys())
+
+            with self._lock:
+                # Written - the database is current for bots that stopped moving
+                for bot_id in positions:
+                    if bot_id not in self._runs and bot_id not in self._dirty_positions:
+                        self._positions.pop(bot_id, None)
+                        bot_index.settled(bot_id)
+
+    # ============ Bot steps ============
+
+    def _advance(self, db, run: BotRun):
+        with self._lock:
+            order_ids = set(run.order_ids)
+
+        if run.stop and run.stop.order_id not in order_ids:
+            # Simulation of that order was stopped - abandon the leg
+            run.stop, run.dwell = None, 0
+            run.leg.clear()
+
+        if run.dwell:
+            run.dwell -= 1
+            if run.dwell:
+                return
+            # Phase 3: Bot delivers to customer (delivering)
+            self._set_status(run.stop.order_id, OrderStatus.DELIVERING, OrderStatus.PICKED_UP)
+            run.stop = None
+        elif run.stop:
+            self._move(run, run.leg.popleft())
+            if run.leg:
+                return
+            self._arrive(run)
+            if run.dwell:
+                return
+
+        # Plan the next stop; one at the bot's position is served right away
+        while run.stop is None:
+            if not self._plan(db, run):
+                return
+            if run.leg:
+                return
+            self._arrive(run)
+            if run.dwell:
+                return
+
+    def _plan(self, db, run: BotRun) -> bool:
+        """Point the bot at the first stop of its best tour. False if idle."""
+        with self._lock:
+            order_ids = set(run.order_ids)
+
+        # Drop orders that were delivered, cancelled or moved to another bot
+        orders = []
+        for order in db.query(Order).filter(Order.id.in_(order_ids)).all():
+            status = self.live_order_status(order.id) or order.status
+            if order.bot_id == run.bot_id and status in SIMULATED_STATUSES:
+                orders.append((order, status))
+        for order_id in order_ids - {order.id for order, _ in orders}:
+            self.untrack(order_id)
+        if not orders:
+            route_plans.drop(run.bot_id)
+            return False
+
+        tour_orders = [
+            TourOrder(
+                order_id=order.id,
+                pickup_node_id=order.pickup_node_id,
+                delivery_node_id=order.delivery_node_id,
+                picked_up=status in (OrderStatus.PICKED_UP, OrderStatus.DELIVERING)
+            )
+            for order, _ in orders
+        ]
+        plan = route_plans.get(run.bot_id)
+        if not (plan and plan.matches(
+            run.node_id,
+            [order.order_id for order in tour_orders],
+            [order.order_id for order in tour_orders if order.picked_up]
+        )):
+            tour = plan_tour(run.node_id, tour_orders)
+            if tour.distance == UNREACHABLE:
+                print(f"Simulation error: no tour for bot {run.bot_id} reaches all stops")
+                for order, _ in orders:
+                    self.untrack(order.id)
+                route_plans.drop(run.bot_id)
+                return False
+            # The tour changed - route it once and store the new ETAs
+            plan = route_plans.plan(run.bot_id, tour)
+            write_estimates(db, plan)
+            db.commit()
+
+        # Phase 1: Bot heads out to the restaurants (picking_up)
+        for order, status in orders:
+            if status == OrderStatus.ASSIGNED:
+                self._set_status(order.id, OrderStatus.PICKING_UP, status)
+
+        run.stop = plan.tour.stops[plan.next_stop]
+        run.leg = deque(plan.leg())
+        self._update_trajectory(run)
+        return True
+
+    def _arrive(self, run: BotRun):
+        order_id = run.stop.order_id
+        route_plans.arrived(run.bot_id, run.stop)
+        if run.stop.action == PICKUP:
+            # Phase 2: Pick up food
+            self._set_status(order_id, OrderStatus.PICKED_UP, OrderStatus.PICKING_UP)
+            run.dwell = PICKUP_TICKS
+            return
+
+        # Phase 4: Delivered!
+        # One timestamp per tick, so the tick's deliveries are one UPDATE;
+        # the slot is given back once the flush has written the delivery
+        delivered_at = datetime.utcfromtimestamp(self._now)
+        self._set_status(order_id, OrderStatus.DELIVERED, OrderStatus.DELIVERING, delivered_at)
+        self.untrack(order_id)
+        run.stop = None
+
+
+fleet_simulator = FleetSimulator()
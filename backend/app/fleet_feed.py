@@ -0,0 +1,312 @@
+"""
+Binary fleet feed for the /api/ws/fleet WebSocket.
+
+Bot positions go out as binary frames of fixed-size records, so a
+position update costs 10 bytes per bot instead of a JSON object:
+
+    frame header   <BI    kind (1 snapshot, 2 delta), record count
+    bot record     <IHHBB bot id, x, y, status code, orders count
+
+Status codes are BOT_STATUS_CODES (position in BotStatus); a bot that
+was removed is sent once with BOT_REMOVED.
+
+A moving bot's record holds where its trajectory starts. The trajectory
+itself (app/trajectory.py) is sent as JSON text with every snapshot and
+whenever it changes, and clients interpolate along it:
+    {"type": "trajectories", "bots": [{"id": 1, "trajectory": [[x, y, time], ...]}]}
+A null trajectory means the bot stopped at the position in its record.
+
+Order changes are collected and sent as JSON text at most every
+WS_ORDER_INTERVAL_SECONDS:
+    {"type": "orders", "orders": [...], "removed_orders": [...]}
+
+Clients pick what they receive with a JSON text message, at any time:
+    {"bots": [1, 2, 3]}                  only these bots
+    {"region": [x0, y0, x1, y1]}         bots inside the box (inclusive)
+    {}                                   the whole fleet (default)
+With both, a bot in either one is sent. Orders follow their bot's
+subscription; unassigned orders go to whole-fleet clients only. Every
+(re)subscription is answered with a snapshot frame.
+
+The feed is fed by the SSE broadcaster's change listener, so the state
+is loaded and diffed once for both. A frame for whole-fleet clients is
+packed once and the same bytes are sent to all of them.
+"""
+import asyncio
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from fastapi import WebSocket
+
+from app.broadcast import Broadcaster
+from app.config import WS_ORDER_INTERVAL_SECONDS, WS_QUEUE_SIZE
+from app.models import BotStatus
+
+FRAME_HEADER = struct.Struct("<BI")
+BOT_RECORD = struct.Struct("<IHHBB")
+
+FRAME_SNAPSHOT = 1
+FRAME_DELTA = 2
+
+BOT_STATUS_CODES = {status.value: code for code, status in enumerate(BotStatus)}
+BOT_REMOVED = 255
+
+
+def pack_bot(bot: dict) -> bytes:
+    return BOT_RECORD.pack(
+        bot["id"],
+        bot["current_x"],
+        bot["current_y"],
+        BOT_STATUS_CODES.get(bot["status"], BOT_REMOVED),
+        min(bot["orders_count"], 255)
+    )
+
+
+def pack_removed(bot_id: int) -> bytes:
+    return BOT_RECORD.pack(bot_id, 0, 0, BOT_REMOVED, 0)
+
+
+def pack_frame(kind: int, records: List[bytes]) -> bytes:
+    return FRAME_HEADER.pack(kind, len(records)) + b"".join(records)
+
+
+def trajectory_message(bots: List[dict], snapshot: bool = False) -> str:
+    data = {"type": "trajectories", "bots": [{"id": b["id"], "trajectory": b.get("trajectory")} for b in bots]}
+    if snapshot:
+        data["snapshot"] = True
+    return json.dumps(data)
+
+
+@dataclass
+class Subscription:
+    bots: Optional[Set[int]] = None
+    region: Optional[Tuple[int, int, int, int]] = None
+
+    @property
+    def everything(self) -> bool:
+        return self.bots is None and self.region is None
+
+    def matches(self, bot: Optional[dict]) -> bool:
+        if bot is None:
+            return False
+        if self.everything:
+            return True
+        if self.bots is not None and bot["id"] in self.bots:
+            return True
+        if self.region is not None:
+            x0, y0, x1, y1 = self.region
+            return x0 <= bot["current_x"] <= x1 and y0 <= bot["current_y"] <= y1
+        return False
+
+
+def parse_subscription(message: dict) -> Subscription:
+    """Subscription from a client message; ValueError if malformed"""
+    if not isinstance(message, dict):
+        raise ValueError("Subscription must be a JSON object")
+    bots = message.get("bots")
+    region = message.get("region")
+    if bots is not None:
+        bots = {int(bot_id) for bot_id in bots}
+    if region is not None:
+        if len(region) != 4:
+            raise ValueError("region must be [x0, y0, x1, y1]")
+        x0, y0, x1, y1 = (int(v) for v in region)
+        region = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+    return Subscription(bots, region)
+
+
+@dataclass(eq=False)
+class FeedClient:
+    websocket: WebSocket
+    subscription: Subscription = field(default_factory=Subscription)
+    # bytes: binary frame, str: text message, None: resend a snapshot
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=WS_QUEUE_SIZE))
+    orders: Set[int] = field(default_factory=set)          # Changed since the last order message
+    removed_orders: Set[int] = field(default_factory=set)
+    sender: Optional[asyncio.Task] = None
+
+
+class FleetFeed:
+    def __init__(self, broadcaster: Broadcaster, order_interval: float = WS_ORDER_INTERVAL_SECONDS):
+        self.broadcaster = broadcaster
+        self.order_interval = order_interval
+        self.clients: Set[FeedClient] = set()
+        self.dropped = 0
+        # Last bot state sent, to notice bots leaving a region
+        self._bots: Dict[int, dict] = {}
+        self._snapshot: Optional[Tuple[int, bytes]] = None   # Whole fleet, per event id
+        self._order_task: Optional[asyncio.Task] = None
+
+    # ============ Clients ============
+
+    async def connect(self, websocket: WebSocket) -> FeedClient:
+        client = FeedClient(websocket)
+        if not self.clients:
+            self.broadcaster.add_listener(self._on_change)
+        self.clients.add(client)
+        try:
+            await self.broadcaster.ready()
+        except BaseException:
+            # Cancelled while the state loads (client gone, shutdown)
+            await self.disconnect(client)
+            raise
+        if not self._bots:
+            self._bots = dict(self.broadcaster.state.get("bots", {}))
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self._resync(client)
+        if self._order_task is None:
+            self._order_task = asyncio.create_task(self._send_orders())
+        return client
+
+    async def disconnect(self, client: FeedClient):
+        self.clients.discard(client)
+        if not self.clients:
+            self.broadcaster.remove_listener(self._on_change)
+            self._bots = {}
+        if client.sender:
+            client.sender.cancel()
+            try:
+                await client.sender
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def subscribe(self, client: FeedClient, subscription: Subscription):
+        client.subscription = subscription
+        self._resync(client)
+
+    def _resync(self, client: FeedClient):
+        """Replace whatever the client has queued with a snapshot"""
+        while not client.queue.empty():
+            client.queue.get_nowait()
+        client.queue.put_nowait(None)
+
+    def send_text(self, client: FeedClient, text: str):
+        """Queue a text message behind the client's frames"""
+        self._send(client, text)
+
+    def _send(self, client: FeedClient, message: Union[bytes, str]):
+        if client.queue.full():
+            # Too far behind: drop the backlog, resync with a snapshot
+            self.dropped += client.queue.qsize()
+            self._resync(client)
+            return
+        client.queue.put_nowait(message)
+
+    async def _send_loop(self, client: FeedClient):
+        websocket = client.websocket
+        while True:
+            message = await client.queue.get()
+            if message is None:
+                await websocket.send_bytes(self._bot_snapshot(client.subscription))
+                await websocket.send_text(self._trajectory_snapshot(client.subscription))
+                await websocket.send_text(self._order_snapshot(client.subscription))
+                client.orders.clear()
+                client.removed_orders.clear()
+            elif isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
+
+    # ============ Frames ============
+
+    def _bot_snapshot(self, subscription: Subscription) -> bytes:
+        bots = self.broadcaster.state.get("bots", {}).values()
+        if not subscription.everything:
+            return pack_frame(FRAME_SNAPSHOT, [pack_bot(b) for b in bots if subscription.matches(b)])
+        last_id = self.broadcaster.last_id
+        if self._snapshot is None or self._snapshot[0] != last_id:
+            self._snapshot = (last_id, pack_frame(FRAME_SNAPSHOT, [pack_bot(b) for b in bots]))
+        return self._snapshot[1]
+
+    def _trajectory_snapshot(self, subscription: Subscription) -> str:
+        bots = self.broadcaster.state.get("bots", {}).values()
+        return trajectory_message([b for b in bots if b.get("trajectory") and subscription.matches(b)], snapshot=True)
+
+    def _order_snapshot(self, subscription: Subscription) -> str:
+        orders = self.broadcaster.state.get("orders", {}).values()
+        return json.dumps({
+            "type": "orders",
+            "snapshot": True,
+            "orders": [o for o in orders if self._wants_order(subscription, o)]
+        })
+
+    def _wants_order(self, subscription: Subscription, order: dict) -> bool:
+        if subscription.everything:
+            return True
+        bots = self.broadcaster.state.get("bots", {})
+        return subscription.matches(bots.get(order["bot_id"]))
+
+    def _on_change(self, event_id: int, changes: Dict[str, list]):
+        """Broadcaster listener, on the event loop"""
+        changed = changes.get("bots", [])
+        removed = changes.get("removed_bots", [])
+        if changed or removed:
+            # (previous, current, record) per bot, packed once
+            updates = []
+            for bot in changed:
+                updates.append((self._bots.get(bot["id"]), bot, pack_bot(bot)))
+                self._bots[bot["id"]] = bot
+            for bot_id in removed:
+                updates.append((self._bots.pop(bot_id, None), None, pack_removed(bot_id)))
+
+            # Bots whose trajectory changed, as (previous, current)
+            rerouted = [
+                (previous, current) for previous, current, _ in updates
+                if current and (previous or {}).get("trajectory") != current.get("trajectory")
+            ]
+
+            shared = shared_trajectories = None
+            for client in self.clients:
+                subscription = client.subscription
+                if subscription.everything:
+                    if shared is None:
+                        shared = pack_frame(FRAME_DELTA, [record for _, _, record in updates])
+                        shared_trajectories = trajectory_message([current for _, current in rerouted])
+                    self._send(client, shared)
+                    if rerouted:
+                        self._send(client, shared_trajectories)
+                    continue
+                # A bot that just left the region is sent once more
+                records = [
+                    record for previous, current, record in updates
+                    if subscription.matches(current) or subscription.matches(previous)
+                ]
+                if records:
+                    self._send(client, pack_frame(FRAME_DELTA, records))
+                trajectories = [
+                    current for previous, current in rerouted
+                    if subscription.matches(current) or subscription.matches(previous)
+                ]
+                if trajectories:
+                    self._send(client, trajectory_message(trajectories))
+
+        changed_orders = [order["id"] for order in changes.get("orders", [])]
+        removed_orders = changes.get("removed_orders", [])
+        if changed_orders or removed_orders:
+            for client in self.clients:
+                client.orders.update(changed_orders)
+                client.removed_orders.update(removed_orders)
+
+    async def _send_orders(self):
+        """Order changes, batched per client every order_interval"""
+        while self.clients:
+            await asyncio.sleep(self.order_interval)
+            state = self.broadcaster.state
+            if state is None:
+                continue
+            orders = state.get("orders", {})
+            for client in list(self.clients):
+                if not (client.orders or client.removed_orders):
+                    continue
+                selected = [
+                    orders[order_id] for order_id in client.orders
+                    if order_id in orders and self._wants_order(client.subscription, orders[order_id])
+                ]
+                removed = sorted(client.removed_orders)
+                client.orders.clear()
+                client.removed_orders.clear()
+                if selected or removed:
+                    self._send(client, json.dumps({"type": "orders", "orders": selected, "removed_orders": removed}))
+        self._order_task = None
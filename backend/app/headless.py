@@ -0,0 +1,354 @@
+"""
+Headless fleet simulation on a virtual clock, for capacity planning.
+
+Runs the live rules without a database or real time:
+- order intake as in routers/orders.py::create_order - reachability check,
+  per-restaurant sliding-window limit, assignment by marginal route cost
+  among the ASSIGN_CANDIDATES bots with room nearest to the restaurant
+- pending orders as in app/dispatch.py - an order no bot has room for
+  waits, and is assigned oldest first as soon as a delivery frees a slot
+- bot movement as in app/fleet.py - drive to the first stop of the
+  planned tour, re-plan at every stop, PICKUP_SECONDS at each pickup
+
+The clock jumps from event to event (order arrivals, bots reaching stops)
+instead of ticking, so a simulated day takes seconds. Fleet and order
+state is kept in NumPy arrays.
+
+Run from the backend directory:
+    python -m app.headless --orders 100000 --bots 5
+"""
+import argparse
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from app.assignment import BotCandidate, rank_bots
+from app.config import (
+    ASSIGN_CANDIDATES, BOT_CAPACITY, FLEET_SIZE, GRID_HEIGHT, GRID_WIDTH, PICKUP_SECONDS, RESTAURANT_ORDER_LIMIT,
+    RESTAURANT_ORDER_WINDOW, ROUTING_MODE, SECONDS_PER_STEP,
+)
+from app.rate_limit import SlidingWindowRateLimiter
+from app.routing import RoutingGraph, build_router
+from app.seed_data import BLOCKED_PATHS, LAYOUT_SIZE, RESTAURANTS, layout_node_id
+from app.tours import PICKUP, TourOrder, TourStop, plan_tour
+
+
+# Order outcomes
+PENDING = 0          # Accepted, waiting for a bot with capacity
+ASSIGNED = 1
+PICKED_UP = 2
+DELIVERED = 3
+RATE_LIMITED = 4
+UNREACHABLE_ORDER = 5
+
+# Bot events
+ARRIVE = 0           # Reached the stop it was heading to
+READY = 1            # Done at a pickup
+
+
+@dataclass
+class HeadlessConfig:
+    orders: int = 100000                  # Orders placed over the whole run
+    duration_seconds: float = 86400       # One simulated day
+    fleet_size: int = FLEET_SIZE
+    bot_capacity: int = BOT_CAPACITY
+    assign_candidates: int = ASSIGN_CANDIDATES
+    restaurant_order_limit: int = RESTAURANT_ORDER_LIMIT
+    restaurant_order_window: float = RESTAURANT_ORDER_WINDOW
+    width: int = GRID_WIDTH
+    height: int = GRID_HEIGHT
+    seed: int = 0
+
+
+@dataclass
+class HeadlessReport:
+    config: HeadlessConfig
+    orders: int
+    rate_limited: int
+    unreachable: int
+    queued: int                     # Waited pending - every bot was full when placed
+    unassigned: int                 # Still pending when the run ended
+    delivered: int
+    in_flight: int                  # Assigned but not delivered when the run ended
+    deliveries_per_hour: float
+    delivery_seconds: Dict[str, float] = field(default_factory=dict)  # Creation to delivery
+    utilization: float = 0.0        # Mean share of time a bot carried orders
+    utilization_per_bot: List[float] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+
+class HeadlessSimulation:
+    def __init__(self, config: HeadlessConfig):
+        if config.width < LAYOUT_SIZE or config.height < LAYOUT_SIZE:
+            raise ValueError(f"Grid must be at least {LAYOUT_SIZE}x{LAYOUT_SIZE}")
+        self.config = config
+        width, height = config.width, config.height
+
+        # Own copy of the seeded map - the shared router is not touched
+        blocked = [(layout_node_id(a, width), layout_node_id(b, width)) for a, b in BLOCKED_PATHS]
+        self.router = build_router(RoutingGraph(width, height, blocked), ROUTING_MODE)
+        self.distance = self.router.get_distance
+        self.restaurant_nodes = np.array([layout_node_id(n, width) for n, _, _ in RESTAURANTS], dtype=np.int32)
+
+        self.now = 0.0
+        self.rate_limiter = SlidingWindowRateLimiter(
+            config.restaurant_order_limit,
+            config.restaurant_order_window,
+            clock=lambda: self.now
+        )
+
+        # Fleet - bots start in the middle of the map, like the seed data
+        bots = config.fleet_size
+        self.bot_node = np.full(bots, (height // 2) * width + width // 2, dtype=np.int32)  # Where the next decision is made
+        self.bot_ready_at = np.zeros(bots)               # When the bot gets there
+        self.bot_orders = np.zeros(bots, dtype=np.int16)
+        self.bot_busy_since = np.zeros(bots)
+        self.bot_busy_seconds = np.zeros(bots)
+        self.bot_tours: List[List[TourOrder]] = [[] for _ in range(bots)]
+        self.bot_stop: List[Optional[TourStop]] = [None] * bots  # None while idle
+        self.bot_tour_distance = np.zeros(bots, dtype=np.int32)  # Tour length from bot_node
+        self._x = np.arange(width * height, dtype=np.int32) % width   # Node id -> grid coordinates
+        self._y = np.arange(width * height, dtype=np.int32) // width
+
+        # Orders
+        orders = config.orders
+        self.order_created = np.zeros(orders)
+        self.order_delivered = np.full(orders, np.nan)
+        self.order_status = np.zeros(orders, dtype=np.int8)
+        self.order_queued = np.zeros(orders, dtype=bool)
+        self._pending: Deque[TourOrder] = deque()  # Oldest first, like the dispatcher
+
+        self._events = []  # (time, seq, bot, event)
+        self._seq = 0
+
+    # ============ Run ============
+
+    def run(self) -> HeadlessReport:
+        config = self.config
+        started = time.perf_counter()
+
+        # Arrivals of a Poisson process with a fixed count are uniform in time
+        rng = np.random.default_rng(config.seed)
+        arrivals = np.sort(rng.uniform(0, config.duration_seconds, config.orders))
+        restaurants = rng.integers(0, len(self.restaurant_nodes), config.orders)
+        deliveries = rng.integers(0, config.width * config.height, config.orders)
+
+        for i in range(config.orders):
+            self._advance_to(arrivals[i])
+            self._create_order(i, int(restaurants[i]), int(deliveries[i]))
+        self._advance_to(config.duration_seconds)
+
+        return self._report(time.perf_counter() - started)
+
+    def _advance_to(self, until: float):
+        events = self._events
+        while events and events[0][0] <= until:
+            self.now, _, bot, event = heapq.heappop(events)
+            if event == ARRIVE:
+                self._arrive(bot)
+            else:
+                self._plan(bot)
+        self.now = until
+
+    def _schedule(self, at: float, bot: int, event: int):
+        self._seq += 1
+        heapq.heappush(self._events, (at, self._seq, bot, event))
+
+    # ============ Order intake (create_order) ============
+
+    def _create_order(self, i: int, restaurant: int, delivery_node_id: int):
+        self.order_created[i] = self.now
+        pickup_node_id = int(self.restaurant_nodes[restaurant])
+
+        if not self.router.is_reachable(pickup_node_id, delivery_node_id):
+            self.order_status[i] = UNREACHABLE_ORDER
+            return
+        if not self.rate_limiter.try_acquire(restaurant):
+            self.order_status[i] = RATE_LIMITED
+            return
+
+        new_order = TourOrder(order_id=i, pickup_node_id=pickup_node_id, delivery_node_id=delivery_node_id)
+        if not self._assign(new_order):
+            # Every bot is full - assigned as soon as one frees a slot
+            self.order_status[i] = PENDING
+            self.order_queued[i] = True
+            self._pending.append(new_order)
+
+    def _nearest_bots(self, node_id: int) -> np.ndarray:
+        """The assign_candidates bots with room nearest to the node by grid distance (bot_index.nearest)"""
+        room = np.flatnonzero(self.bot_orders < self.config.bot_capacity)
+        if room.size == 0:
+            return room
+        nodes = self.bot_node[room]
+        distance = np.abs(self._x[nodes] - self._x[node_id]) + np.abs(self._y[nodes] - self._y[node_id])
+        return room[np.lexsort((room, distance))[:self.config.assign_candidates]]
+
+    def _assign(self, order: TourOrder) -> bool:
+        """Give the order to the nearby bot it costs least. False if no bot has room."""
+        # A busy bot is scored from the stop it is heading to
+        candidates = [
+            BotCandidate(
+                int(b), int(self.bot_node[b]), int(self.bot_orders[b]), self.bot_tours[b],
+                tour_distance=int(self.bot_tour_distance[b])
+            )
+            for b in self._nearest_bots(order.pickup_node_id)
+        ]
+        ranked = rank_bots(candidates, order, self.distance)
+        if not ranked:
+            return False
+
+        bot = ranked[0].bot_id
+        self.bot_tour_distance[bot] = ranked[0].tour.distance
+        self.order_status[order.order_id] = ASSIGNED
+        self.bot_tours[bot].append(order)
+        self.bot_orders[bot] += 1
+        if self.bot_orders[bot] == 1:
+            self.bot_busy_since[bot] = self.now
+        if self.bot_stop[bot] is None:
+            self._plan(bot)
+        return True
+
+    def _dispatch(self):
+        """A slot came free - assign waiting orders, oldest first"""
+        while self._pending and self._assign(self._pending[0]):
+            self._pending.popleft()
+
+    # ============ Bot movement (fleet simulator) ============
+
+    def _plan(self, bot: int):
+        """Send the bot to the first stop of its best tour, or leave it idle"""
+        orders = self.bot_tours[bot]
+        if not orders:
+            self.bot_stop[bot] = None
+            self.bot_tour_distance[bot] = 0
+            return
+
+        node_id = int(self.bot_node[bot])
+        tour = plan_tour(node_id, orders, self.distance)
+        stop = tour.stops[0]
+        leg = self.distance(node_id, stop.node_id)
+        arrival = self.now + leg * SECONDS_PER_STEP
+
+        self.bot_stop[bot] = stop
+        self.bot_node[bot] = stop.node_id
+        # The rest of an optimal tour is optimal from its first stop
+        self.bot_tour_distance[bot] = tour.distance - leg
+        self.bot_ready_at[bot] = arrival
+        self._schedule(arrival, bot, ARRIVE)
+
+    def _arrive(self, bot: int):
+        stop = self.bot_stop[bot]
+        orders = self.bot_tours[bot]
+        order = next(o for o in orders if o.order_id == stop.order_id)
+
+        if stop.action == PICKUP:
+            order.picked_up = True
+            self.order_status[stop.order_id] = PICKED_UP
+            self.bot_ready_at[bot] = self.now + PICKUP_SECONDS
+            self._schedule(self.bot_ready_at[bot], bot, READY)
+            return
+
+        orders.remove(order)
+        self.order_status[stop.order_id] = DELIVERED
+        self.order_delivered[stop.order_id] = self.now
+        self.bot_orders[bot] -= 1
+        if self.bot_orders[bot] == 0:
+            self.bot_busy_seconds[bot] += self.now - self.bot_busy_since[bot]
+        self._dispatch()
+        self._plan(bot)
+
+    # ============ Report ============
+
+    def _report(self, wall_seconds: float) -> HeadlessReport:
+        config = self.config
+        status = self.order_status
+        delivered = status == DELIVERED
+
+        delivery_seconds = {}
+        if delivered.any():
+            times = self.order_delivered[delivered] - self.order_created[delivered]
+            p50, p90, p99 = np.percentile(times, [50, 90, 99])
+            delivery_seconds = {
+                "mean": float(times.mean()), "p50": float(p50), "p90": float(p90),
+                "p99": float(p99), "max": float(times.max())
+            }
+
+        # Bots still carrying orders are busy until the end of the run
+        busy = self.bot_busy_seconds + np.where(
+            self.bot_orders > 0, config.duration_seconds - self.bot_busy_since, 0
+        )
+        utilization = busy / config.duration_seconds
+
+        return HeadlessReport(
+            config=config,
+            orders=config.orders,
+            rate_limited=int((status == RATE_LIMITED).sum()),
+            unreachable=int((status == UNREACHABLE_ORDER).sum()),
+            queued=int(self.order_queued.sum()),
+            unassigned=int((status == PENDING).sum()),
+            delivered=int(delivered.sum()),
+            in_flight=int(((status == ASSIGNED) | (status == PICKED_UP)).sum()),
+            deliveries_per_hour=float(delivered.sum() / (config.duration_seconds / 3600)),
+            delivery_seconds=delivery_seconds,
+            utilization=float(utilization.mean()) if utilization.size else 0.0,
+            utilization_per_bot=[round(float(u), 4) for u in utilization],
+            wall_seconds=wall_seconds
+        )
+
+
+def run_headless(config: HeadlessConfig) -> HeadlessReport:
+    return HeadlessSimulation(config).run()
+
+
+def print_report(report: HeadlessReport):
+    config = report.config
+    print(f"Simulated {config.duration_seconds / 3600:g}h, {config.fleet_size} bots x {config.bot_capacity} orders, "
+          f"{config.width}x{config.height} grid in {report.wall_seconds:.2f}s")
+    print(f"  orders:       {report.orders}")
+    print(f"  rate limited: {report.rate_limited}")
+    print(f"  unreachable:  {report.unreachable}")
+    print(f"  queued:       {report.queued} (still pending at the end: {report.unassigned})")
+    print(f"  delivered:    {report.delivered} ({report.deliveries_per_hour:.1f}/h)")
+    print(f"  in flight:    {report.in_flight}")
+    if report.delivery_seconds:
+        d = report.delivery_seconds
+        print(f"  delivery time: mean {d['mean']:.1f}s  p50 {d['p50']:.0f}s  p90 {d['p90']:.0f}s  "
+              f"p99 {d['p99']:.0f}s  max {d['max']:.0f}s")
+    print(f"  utilization:  {report.utilization:.1%} (per bot: {', '.join(f'{u:.0%}' for u in report.utilization_per_bot)})")
+
+
+def main():
+    defaults = HeadlessConfig()
+    parser = argparse.ArgumentParser(description="Headless fleet simulation on a virtual clock")
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--hours", type=float, default=defaults.duration_seconds / 3600)
+    parser.add_argument("--bots", type=int, default=defaults.fleet_size)
+    parser.add_argument("--capacity", type=int, default=defaults.bot_capacity)
+    parser.add_argument("--candidates", type=int, default=defaults.assign_candidates, help="nearest bots scored per order")
+    parser.add_argument("--limit", type=int, default=defaults.restaurant_order_limit, help="orders per restaurant per window")
+    parser.add_argument("--window", type=float, default=defaults.restaurant_order_window, help="rate limit window in seconds")
+    parser.add_argument("--width", type=int, default=defaults.width)
+    parser.add_argument("--height", type=int, default=defaults.height)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    print_report(run_headless(HeadlessConfig(
+        orders=args.orders,
+        duration_seconds=args.hours * 3600,
+        fleet_size=args.bots,
+        bot_capacity=args.capacity,
+        assign_candidates=args.candidates,
+        restaurant_order_limit=args.limit,
+        restaurant_order_window=args.window,
+        width=args.width,
+        height=args.height,
+        seed=args.seed
+    )))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from app.config import BOT_CAPACITY, FLEET_SIZE, GRID_HEIGHT, GRID_WIDTH, RESTAURANT_ORDER_LIMIT, RESTAURANT_ORDER_WINDOW
 from app.database import init_db, SessionLocal
-from app.seed_data import seed_database
+from app.seed_data import seed_database, seed_fleet
+from app.routing import load_router
+from app.fleet import fleet_simulator
+from app.events import event_bus
+from app.counters import status_counters
+from app.bot_index import bot_index
+from app.dispatch import order_dispatcher
+from app.sweep_jobs import sweep_jobs
 
 # Import routers
-from app.routers import orders, bots, restaurants, map, streaming, simulation
+from app.routers import orders, bots, restaurants, map, streaming, simulation, ws
+from app.routers.streaming import order_broadcaster
 
 
 # === Startup Function ===
@@ -23,32 +32,63 @@ async def lifespan(app: FastAPI):
     db = SessionLocal()
     try:
         seed_database(db)
+        # An existing database gets bots added up to FLEET_SIZE
+        seed_fleet(db)
+        
+        # Load the map into the routing engine
+        router = load_router(db)
+        print(f"✅ Router ready: {router.mode} (version {router.version})")
+        
+        # Dashboard counters start from the database
+        status_counters.reconcile(db)
+        bot_index.reconcile(db)
     finally:
         db.close()
     
+    # One tick loop drives every simulated delivery
+    fleet_simulator.start()
+    
+    # Counters are checked against the database periodically
+    status_counters.start()
+    bot_index.start()
+    
+    # Orders left pending are assigned as bots free up
+    order_dispatcher.start()
+    
+    # Changes are pushed to every SSE client from one producer
+    event_bus.start()
+    order_broadcaster.start()
+    
     yield  # Server runs here
     
     print("👋 Shutting down server...")
+    await order_broadcaster.stop()
+    await fleet_simulator.stop()
+    await status_counters.stop()
+    await bot_index.stop()
+    await order_dispatcher.stop()
+    event_bus.stop()
+    sweep_jobs.shutdown()
 
 
 # === Create FastAPI App ===
 app = FastAPI(
     title="fastroute Delivery Bot System",
-    description="""
+    description=f"""
     ## Route Optimization API for Autonomous Delivery Bots
     
     ### Features:
     - Orders: Create, manage, and track delivery orders
     - Bots: Monitor delivery bot fleet
-    - Restaurants: Manage restaurant partners (rate limited: 3 orders/30sec)
-    - Map: 9x9 grid with route calculation (A* algorithm)
+    - Restaurants: Manage restaurant partners (rate limited: {RESTAURANT_ORDER_LIMIT} orders/{RESTAURANT_ORDER_WINDOW}sec)
+    - Map: grid map with route calculation (A*)
     - Streaming: Real-time updates via Server-Sent Events
     
     ### Business Rules:
-    - Total Bots: 5
-    - Max orders per bot: 3
-    - Restaurant rate limit: 3 orders per 30 seconds
-    - Grid size: 9x9
+    - Total Bots: {FLEET_SIZE} (FLEET_SIZE)
+    - Max orders per bot: {BOT_CAPACITY} (BOT_CAPACITY)
+    - Restaurant rate limit: {RESTAURANT_ORDER_LIMIT} orders per {RESTAURANT_ORDER_WINDOW} seconds
+    - Grid size when seeded: {GRID_WIDTH}x{GRID_HEIGHT} (GRID_WIDTH / GRID_HEIGHT)
     - Address format
     """,
     version="1.0.0",
@@ -65,6 +105,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 
@@ -75,6 +116,7 @@ app.include_router(restaurants.router)
 app.include_router(map.router)
 app.include_router(streaming.router)
 app.include_router(simulation.router)
+app.include_router(ws.router)
 
 
 # === Basic Endpoints ===
@@ -90,7 +132,8 @@ def home():
             "bots": "/api/bots",
             "restaurants": "/api/restaurants",
             "map": "/api/map",
-            "stream": "/api/stream/orders"
+            "stream": "/api/stream/orders",
+            "fleet_ws": "/api/ws/fleet"
         }
     }
 
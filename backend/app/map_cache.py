@@ -0,0 +1,107 @@
+"""
+Pre-serialized static part of /api/map/data.
+
+Nodes, blocked paths, active restaurants and the grid size almost never
+change, so they are serialized to bytes once and reused. The bytes are
+rebuilt when the routing graph is reloaded, on invalidate(), and at most
+MAP_CACHE_TTL_SECONDS apart to pick up edits made straight in the
+database. The version only goes up when the rebuilt bytes differ, so
+clients keep getting 304s while nothing changed.
+"""
+import json
+import threading
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import MAP_CACHE_TTL_SECONDS
+from app.models import BlockedPath, Node, Restaurant
+from app.routing import get_grid_size, get_routing_version
+
+
+def serialize_static(db: Session) -> bytes:
+    """The map data document up to the bots list, open for ', "bots": [...]}'"""
+    nodes = db.query(
+        Node.id, Node.x, Node.y, Node.is_delivery_point, Node.is_restaurant, Node.restaurant_type
+    ).order_by(Node.id).all()
+    blocked_paths = db.query(BlockedPath.from_node_id, BlockedPath.to_node_id).order_by(BlockedPath.id).all()
+    restaurants = db.query(
+        Restaurant.id, Restaurant.name, Restaurant.restaurant_type, Restaurant.node_id, Restaurant.is_active
+    ).filter(Restaurant.is_active == True).order_by(Restaurant.id).all()
+
+    width, height = get_grid_size()
+    data = {
+        "grid_size": width,
+        "grid_width": width,
+        "grid_height": height,
+        "nodes": [
+            {
+                "id": node_id,
+                "x": x,
+                "y": y,
+                "is_delivery_point": is_delivery_point,
+                "is_restaurant": is_restaurant,
+                "restaurant_type": restaurant_type
+            }
+            for node_id, x, y, is_delivery_point, is_restaurant, restaurant_type in nodes
+        ],
+        "blocked_paths": [{"from_id": from_id, "to_id": to_id} for from_id, to_id in blocked_paths],
+        "restaurants": [
+            {
+                "id": r.id,
+                "name": r.name,
+                "restaurant_type": r.restaurant_type.value if r.restaurant_type else None,
+                "node_id": r.node_id,
+                "is_active": r.is_active
+            }
+            for r in restaurants
+        ]
+    }
+    # Drop the closing brace - the bots list is appended per request
+    return json.dumps(data)[:-1].encode() + b', "bots": '
+
+
+class MapDataCache:
+    def __init__(self, ttl: float = MAP_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        # (version, bytes), replaced as a whole so readers need no lock
+        self._entry: Optional[Tuple[int, bytes]] = None
+        self._routing_version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._entry[0] if self._entry else 0
+
+    def invalidate(self):
+        """Rebuild on the next request"""
+        with self._lock:
+            self._routing_version = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._entry is not None
+            and self._routing_version == get_routing_version()
+            and time.monotonic() - self._built_at < self.ttl
+        )
+
+    def get(self, db: Session) -> Tuple[int, bytes]:
+        """(version, serialized static part)"""
+        entry = self._entry
+        if self._fresh():
+            return entry
+        with self._lock:
+            # One request rebuilds, the others wait for its result
+            if not self._fresh():
+                routing_version = get_routing_version()
+                prefix = serialize_static(db)
+                if self._entry is None or prefix != self._entry[1]:
+                    self._entry = (self.version + 1, prefix)
+                self._routing_version = routing_version
+                self._built_at = time.monotonic()
+            return self._entry
+
+
+map_data_cache = MapDataCache()
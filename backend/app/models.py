@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import enum
@@ -39,17 +39,17 @@ class RestaurantType(str, enum.Enum):
 
 class Node(Base):
     """
-    Represents a point on the 9x9 grid map.
-    Total: 81 nodes (0-80)
+    Represents a point on the grid map (9x9 by default).
+    Total: width * height nodes
     
-    id = y * 9 + x
-    Example: position (3,2) has id = 2*9+3 = 21
+    id = y * width + x
+    Example (9x9): position (3,2) has id = 2*9+3 = 21
     """
     __tablename__ = "nodes"
     
     id = Column(Integer, primary_key=True)
-    x = Column(Integer, nullable=False)  # 0-8
-    y = Column(Integer, nullable=False)  # 0-8
+    x = Column(Integer, nullable=False)  # 0 to width-1
+    y = Column(Integer, nullable=False)  # 0 to height-1
     is_delivery_point = Column(Boolean, default=False)
     is_restaurant = Column(Boolean, default=False)
     restaurant_type = Column(String(50), nullable=True)
@@ -74,8 +74,8 @@ class BlockedPath(Base):
 
 class Bot(Base):
     """
-    Delivery robots. We have 5 bots.
-    Each can carry maximum 3 orders.
+    Delivery robots, FLEET_SIZE of them.
+    Each can carry at most BOT_CAPACITY orders.
     """
     __tablename__ = "bots"
     
@@ -84,7 +84,7 @@ class Bot(Base):
     status = Column(Enum(BotStatus), default=BotStatus.AVAILABLE)
     current_x = Column(Integer, default=4)  # Start at center (4,4)
     current_y = Column(Integer, default=4)
-    current_orders_count = Column(Integer, default=0)  # Max 3
+    current_orders_count = Column(Integer, default=0)  # Max BOT_CAPACITY
     total_deliveries = Column(Integer, default=0)
     created_at = Column(DateTime, server_default=func.now())
 
@@ -140,3 +140,11 @@ class Order(Base):
     created_at = Column(DateTime, server_default=func.now())
     assigned_at = Column(DateTime, nullable=True)
     delivered_at = Column(DateTime, nullable=True)
+    
+    # Listings page by id within these filters
+    __table_args__ = (
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_bot_id_id", "bot_id", "id"),
+        Index("ix_orders_restaurant_id_id", "restaurant_id", "id"),
+        Index("ix_orders_created_at", "created_at"),
+    )
@@ -0,0 +1,168 @@
+"""
+Planned routes per bot.
+
+When a bot gets an order (create_order, the pending dispatcher) or the
+simulator re-plans its tour, the whole route - every pickup and delivery
+in tour order - is routed once into a node path and kept here. From it:
+  - each order's ETA and remaining route length are written to
+    orders.estimated_time / orders.route_distance (write_estimates)
+  - the simulator drives the legs of the path instead of routing every
+    leg again, for as long as the plan still matches the bot's orders
+  - GET /api/orders/{id}/route answers with the planned path
+
+The simulator moves a plan's cursor as the bot follows it (moved,
+arrived). A bot that leaves the path, an order added or dropped, or a
+reloaded routing graph make the plan stale, and the next re-plan
+replaces it.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.config import PICKUP_SECONDS, SECONDS_PER_STEP
+from app.models import Order
+from app.routing import find_path, get_routing_version
+from app.tours import PICKUP, Tour, TourStop
+
+# One parameter set per order (executemany)
+WRITE_ESTIMATES = (
+    update(Order)
+    .where(Order.id == bindparam("order_id"))
+    .values(estimated_time=bindparam("eta"), route_distance=bindparam("distance"))
+)
+
+
+@dataclass
+class RoutePlan:
+    bot_id: int
+    tour: Tour
+    path: List[int]                  # Node ids of the whole tour, start included
+    stop_offsets: List[int]          # Index in path of each of tour.stops
+    routing_version: int
+    progress: int = 0                # Index in path of the bot's position
+    next_stop: int = 0               # Index in tour.stops of the stop ahead
+    stale: bool = False
+
+    @property
+    def position(self) -> int:
+        return self.path[self.progress]
+
+    @property
+    def current(self) -> bool:
+        """Still followed, on the routing graph it was planned on"""
+        return not self.stale and self.routing_version == get_routing_version()
+
+    def remaining_stops(self) -> List[TourStop]:
+        return self.tour.stops[self.next_stop:]
+
+    def remaining_orders(self) -> Set[int]:
+        return {stop.order_id for stop in self.remaining_stops()}
+
+    def leg(self) -> List[int]:
+        """Nodes from the bot's position to the next stop, position excluded"""
+        return self.path[self.progress + 1:self.stop_offsets[self.next_stop] + 1]
+
+    def estimates(self) -> Dict[int, Tuple[int, int]]:
+        """order id -> (seconds until delivered, grid steps until delivered)"""
+        estimates = {}
+        pickups = 0
+        for i in range(self.next_stop, len(self.tour.stops)):
+            stop = self.tour.stops[i]
+            if stop.action == PICKUP:
+                pickups += 1
+                continue
+            distance = self.stop_offsets[i] - self.progress
+            estimates[stop.order_id] = (distance * SECONDS_PER_STEP + pickups * PICKUP_SECONDS, distance)
+        return estimates
+
+    def path_to(self, order_id: int) -> List[int]:
+        """Planned nodes from the bot's position to the order's delivery"""
+        for i in range(self.next_stop, len(self.tour.stops)):
+            stop = self.tour.stops[i]
+            if stop.order_id == order_id and stop.action != PICKUP:
+                return self.path[self.progress:self.stop_offsets[i] + 1]
+        return []
+
+    def matches(self, node_id: int, order_ids: Iterable[int], picked_up: Iterable[int]) -> bool:
+        """Still the plan for a bot at node_id with these orders (picked_up: on board)?"""
+        if not self.current or self.next_stop >= len(self.tour.stops):
+            return False
+        if self.position != node_id or self.remaining_orders() != set(order_ids):
+            return False
+        pickups_left = {stop.order_id for stop in self.remaining_stops() if stop.action == PICKUP}
+        return not (pickups_left & set(picked_up))
+
+
+def build_plan(bot_id: int, tour: Tour) -> RoutePlan:
+    """Route every leg of the tour once"""
+    path = [tour.start_node_id]
+    offsets = []
+    for stop in tour.stops:
+        path.extend(find_path(path[-1], stop.node_id)[1:])
+        offsets.append(len(path) - 1)
+    return RoutePlan(bot_id, tour, path, offsets, get_routing_version())
+
+
+class RoutePlans:
+    def __init__(self):
+        self._plans: Dict[int, RoutePlan] = {}
+        self._lock = threading.Lock()
+
+    def get(self, bot_id: int) -> Optional[RoutePlan]:
+        return self._plans.get(bot_id)
+
+    def plan(self, bot_id: int, tour: Tour) -> RoutePlan:
+        """Route the bot's new tour and keep it"""
+        plan = build_plan(bot_id, tour)
+        with self._lock:
+            self._plans[bot_id] = plan
+        return plan
+
+    def drop(self, bot_id: int):
+        with self._lock:
+            self._plans.pop(bot_id, None)
+
+    def moved(self, bot_id: int, node_id: int):
+        """The bot stepped to node_id - follow it along the plan"""
+        with self._lock:
+            plan = self._plans.get(bot_id)
+            if plan is None or plan.stale:
+                return
+            if plan.progress + 1 < len(plan.path) and plan.path[plan.progress + 1] == node_id:
+                plan.progress += 1
+            elif plan.position != node_id:
+                plan.stale = True
+
+    def order_left(self, bot_id: int, order_id: int):
+        """The order was taken off the bot before its delivery"""
+        with self._lock:
+            plan = self._plans.get(bot_id)
+            if plan and order_id in plan.remaining_orders():
+                plan.stale = True
+
+    def arrived(self, bot_id: int, stop: TourStop):
+        """The bot is done with a stop"""
+        with self._lock:
+            plan = self._plans.get(bot_id)
+            if plan is None or plan.stale:
+                return
+            if plan.next_stop < len(plan.tour.stops) and plan.tour.stops[plan.next_stop] == stop:
+                plan.next_stop += 1
+            else:
+                plan.stale = True
+
+
+def write_estimates(db: Session, plan: RoutePlan):
+    """Store the plan's ETA and route length for each of its orders, in db's transaction"""
+    estimates = plan.estimates()
+    if estimates:
+        db.connection().execute(WRITE_ESTIMATES, [
+            {"order_id": order_id, "eta": eta, "distance": distance}
+            for order_id, (eta, distance) in estimates.items()
+        ])
+
+
+route_plans = RoutePlans()
@@ -0,0 +1,123 @@
+"""
+Sliding-window rate limiting (used for the per-restaurant order limit).
+
+The limiter keeps, per key, the timestamps of the requests it let through
+inside the window (a sliding-window log), so "at most N per W seconds"
+holds exactly. Check and record happen in one atomic step, so concurrent
+requests cannot both take the last slot.
+
+Backends:
+- memory: state in this process, guarded by a lock (single worker)
+- sqlite: state in a SQLite file shared by every worker on the host;
+          each acquire is one BEGIN IMMEDIATE transaction
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+import sqlite3
+import threading
+import time
+
+from app.config import RATE_LIMIT_BACKEND, RATE_LIMIT_SQLITE_PATH
+
+
+class RateLimitBackend(ABC):
+    """Storage for sliding-window logs. try_acquire must be atomic."""
+
+    @abstractmethod
+    def try_acquire(self, key: str, limit: int, window: float, now: float) -> bool:
+        ...
+
+    @abstractmethod
+    def reset(self):
+        ...
+
+
+class MemoryBackend(RateLimitBackend):
+    def __init__(self):
+        self._events: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: str, limit: int, window: float, now: float) -> bool:
+        with self._lock:
+            events = self._events.setdefault(key, deque())
+            while events and events[0] <= now - window:
+                events.popleft()
+            if len(events) >= limit:
+                return False
+            events.append(now)
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+
+
+class SQLiteBackend(RateLimitBackend):
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_events (key TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rate_limit_events_key_ts ON rate_limit_events (key, ts)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on their thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self, key: str, limit: int, window: float, now: float) -> bool:
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so the count and the
+        # insert below are one atomic step across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rate_limit_events WHERE key = ? AND ts <= ?", (key, now - window))
+            (count,) = conn.execute("SELECT COUNT(*) FROM rate_limit_events WHERE key = ?", (key,)).fetchone()
+            allowed = count < limit
+            if allowed:
+                conn.execute("INSERT INTO rate_limit_events (key, ts) VALUES (?, ?)", (key, now))
+            conn.execute("COMMIT")
+            return allowed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reset(self):
+        self._connect().execute("DELETE FROM rate_limit_events")
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+class SlidingWindowRateLimiter:
+    """At most `limit` acquisitions per key in any `window` seconds"""
+
+    def __init__(
+        self,
+        limit: int,
+        window: float,
+        backend: Optional[RateLimitBackend] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.limit = limit
+        self.window = window
+        self.backend = backend or MemoryBackend()
+        self.clock = clock
+
+    def try_acquire(self, key) -> bool:
+        """Take a slot for key if one is free; False means rate limited"""
+        return self.backend.try_acquire(str(key), self.limit, self.window, self.clock())
@@ -0,0 +1,83 @@
+"""
+Atomic bot capacity changes.
+
+Reserving a slot is one conditional UPDATE ... RETURNING: the row is only
+changed while the bot is under capacity, and the database serializes
+concurrent updates of the same row, so two orders can never take the last
+slot. Releases are single UPDATEs as well, so they cannot overwrite a
+concurrent reservation. No table or process-wide lock is involved -
+requests only contend when they pick the same bot.
+
+The new load is read back with RETURNING and handed to the bot index.
+"""
+from typing import Optional
+
+from sqlalchemy import and_, case, literal, update
+from sqlalchemy.orm import Session
+
+from app.bot_index import bot_index
+from app.config import BOT_CAPACITY
+from app.models import Bot, BotStatus
+
+
+def reserve_bot(db: Session, bot_id: int) -> bool:
+    """Take one order slot on the bot. False if it is full or offline."""
+    reserved = db.execute(
+        update(Bot)
+        .where(
+            Bot.id == bot_id,
+            Bot.current_orders_count < BOT_CAPACITY,
+            Bot.status.in_([BotStatus.AVAILABLE, BotStatus.BUSY])
+        )
+        .values(
+            current_orders_count=Bot.current_orders_count + 1,
+            status=BotStatus.BUSY
+        )
+        .returning(Bot.current_orders_count)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if reserved is None:
+        return False
+    bot_index.set_load(bot_id, reserved.current_orders_count, BotStatus.BUSY)
+    return True
+
+
+def released_values(count) -> dict:
+    """
+    SET values that give back `count` order slots. count is a number or a
+    bind parameter, so one bulk UPDATE can release different counts per bot.
+    The bot becomes available again when its last order is released.
+    """
+    return {
+        "current_orders_count": case(
+            (Bot.current_orders_count > count, Bot.current_orders_count - count),
+            else_=0
+        ),
+        # literal() with the column type so the enum is stored by name
+        "status": case(
+            (
+                and_(count > 0, Bot.current_orders_count <= count),
+                literal(BotStatus.AVAILABLE, Bot.status.type)
+            ),
+            else_=Bot.status
+        )
+    }
+
+
+def release_bot(db: Session, bot_id: int, delivered: bool = False) -> Optional[BotStatus]:
+    """Give back one order slot (order delivered, cancelled or deleted). Returns the bot's new status."""
+    values = released_values(1)
+    if delivered:
+        values["total_deliveries"] = Bot.total_deliveries + 1
+
+    released = db.execute(
+        update(Bot)
+        .where(Bot.id == bot_id)
+        .values(**values)
+        .returning(Bot.status, Bot.current_orders_count)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if released is None:
+        return None
+    bot_index.set_load(bot_id, released.current_orders_count, released.status)
+    return released.status
@@ -1,35 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
+from typing import List
 
+from app.bot_index import bot_index
+from app.config import ASSIGN_CANDIDATES, BOT_CAPACITY
 from app.database import get_db
+from app.events import event_bus
+from app.counters import status_counters
+from app.dispatch import order_dispatcher
+from app.fleet import fleet_simulator
 from app.models import Bot, BotStatus
+from app.routing import get_grid_size, is_on_grid
+from app.rows import BotRow, fetch_row, fetch_rows, select_rows
 
 router = APIRouter(prefix="/api/bots", tags=["Bots"])
 
+MAX_NEAREST_BOTS = 100
+
+
+def with_live_positions(bots: List[BotRow]) -> List[BotRow]:
+    """Simulated positions may not be written yet"""
+    for bot in bots:
+        position = fleet_simulator.live_position(bot.id)
+        if position:
+            bot.current_x, bot.current_y = position
+    return bots
+
 
 @router.get("/")
 def get_all_bots(db: Session = Depends(get_db)):
-    bots = db.query(Bot).all()
-    return bots
+    bots = fetch_rows(db, BotRow, select_rows(BotRow).order_by(Bot.id))
+    return ORJSONResponse(with_live_positions(bots))
 
 
 @router.get("/available")
 def get_available_bots(db: Session = Depends(get_db)):
-    bots = db.query(Bot).filter(
+    bots = fetch_rows(db, BotRow, select_rows(BotRow).where(
         Bot.status.in_([BotStatus.AVAILABLE, BotStatus.BUSY]),
-        Bot.current_orders_count < 3
-    ).all()
-    return bots
+        Bot.current_orders_count < BOT_CAPACITY
+    ).order_by(Bot.id))
+    return ORJSONResponse(with_live_positions(bots))
+
+
+@router.get("/nearest")
+def get_nearest_bots(
+    x: int,
+    y: int,
+    k: int = Query(ASSIGN_CANDIDATES, ge=1, le=MAX_NEAREST_BOTS),
+    db: Session = Depends(get_db)
+):
+    """The k bots with spare capacity nearest to (x, y), with their grid distance"""
+    if not is_on_grid(x, y):
+        width, height = get_grid_size()
+        raise HTTPException(status_code=400, detail=f"Position must be on the {width}x{height} grid")
+    
+    bot_index.ensure_loaded(db)
+    return ORJSONResponse([
+        {"bot_id": bot_id, "distance": distance}
+        for bot_id, distance in bot_index.nearest(x, y, k)
+    ])
 
 
 @router.get("/{bot_id}")
 def get_bot(bot_id: int, db: Session = Depends(get_db)):
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = fetch_row(db, BotRow, select_rows(BotRow).where(Bot.id == bot_id))
     
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    return bot
+    return ORJSONResponse(with_live_positions([bot])[0])
 
 
 @router.put("/{bot_id}/position")
@@ -44,13 +84,16 @@ def update_bot_position(
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    if not (0 <= x <= 8 and 0 <= y <= 8):
-        raise HTTPException(status_code=400, detail="Position must be 0-8")
+    if not is_on_grid(x, y):
+        width, height = get_grid_size()
+        raise HTTPException(status_code=400, detail=f"Position must be on the {width}x{height} grid")
     
     bot.current_x = x
     bot.current_y = y
     
     db.commit()
+    bot_index.move(bot_id, x, y)
+    event_bus.publish("bots", [bot_id])
     
     return {"message": f"Bot {bot_id} moved to ({x}, {y})"}
 
@@ -73,5 +116,11 @@ def update_bot_status(
     
     bot.status = status_enum
     db.commit()
+    status_counters.bot_changed(bot_id, status_enum)
+    bot_index.set_status(bot_id, status_enum)
+    if status_enum in (BotStatus.AVAILABLE, BotStatus.BUSY):
+        # Back in service - it may take waiting orders
+        order_dispatcher.capacity_released()
+    event_bus.publish("bots", [bot_id])
     
     return {"message": f"Bot {bot_id} status updated to {new_status}"}
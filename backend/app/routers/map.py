@@ -1,105 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import List, Dict, Set, Tuple
-import heapq
+from typing import Dict, List, Set
+import hashlib
+import json
 
 from app.database import get_db
-from app.models import Node, BlockedPath, Bot, Restaurant, Order, OrderStatus, BotStatus
+from app.models import Node, BlockedPath, Bot, OrderStatus, BotStatus
+from app.routing import find_path, find_paths_from, find_distances_from, get_grid_size, get_node_id, get_node_coords, is_on_grid
+from app.fleet import fleet_simulator
+from app.map_cache import map_data_cache
+from app.counters import status_counters
+from app.rows import NodeRow, fetch_rows, select_rows
 
 router = APIRouter(prefix="/api/map", tags=["Map"])
 
+# Batch size limits (pairs / sources x targets per request)
+MAX_BATCH_ROUTES = 1000
+MAX_MATRIX_CELLS = 10000
+
+
+# ============ Request bodies ============
+
+class Point(BaseModel):
+    x: int
+    y: int
+
+
+class RouteRequest(BaseModel):
+    start_x: int
+    start_y: int
+    end_x: int
+    end_y: int
+
+
+class DistanceMatrixRequest(BaseModel):
+    sources: List[Point]
+    targets: List[Point]
+
 
 @router.get("/nodes")
 def get_all_nodes(db: Session = Depends(get_db)):
-    nodes = db.query(Node).all()
-    return nodes
+    nodes = fetch_rows(db, NodeRow, select_rows(NodeRow).order_by(Node.id))
+    return ORJSONResponse(nodes)
 
 
 @router.get("/blocked-paths")
 def get_blocked_paths(db: Session = Depends(get_db)):
-    blocked = db.query(BlockedPath).all()
-    return [
-        {"from_id": b.from_node_id, "to_id": b.to_node_id}
-        for b in blocked
-    ]
+    blocked = db.query(BlockedPath.from_node_id, BlockedPath.to_node_id).all()
+    return ORJSONResponse([
+        {"from_id": from_id, "to_id": to_id}
+        for from_id, to_id in blocked
+    ])
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match holds etag: "*" or a comma-separated list, compared weakly (W/ ignored)"""
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
 
 
 @router.get("/data")
-def get_map_data(db: Session = Depends(get_db)):
-    nodes = db.query(Node).all()
-    blocked_paths = db.query(BlockedPath).all()
-    restaurants = db.query(Restaurant).filter(Restaurant.is_active == True).all()
-    bots = db.query(Bot).all()
+def get_map_data(request: Request, db: Session = Depends(get_db)):
+    """
+    Map, restaurants and bots. The static part is served pre-serialized;
+    send If-None-Match with the last ETag to get a 304 when nothing changed.
+    """
+    version, static_part = map_data_cache.get(db)
+    
+    # All bots in one query
+    bots = db.query(
+        Bot.id, Bot.name, Bot.status, Bot.current_x, Bot.current_y,
+        Bot.current_orders_count, Bot.total_deliveries
+    ).order_by(Bot.id).all()
     
-    # Manually serialize bots to ensure fresh data
     bots_data = []
     for bot in bots:
-        db.refresh(bot)
+        # Simulated positions may not be written yet
+        x, y = fleet_simulator.live_position(bot.id) or (bot.current_x, bot.current_y)
         bots_data.append({
             "id": bot.id,
             "name": bot.name,
             "status": bot.status.value if bot.status else "available",
-            "current_x": bot.current_x,
-            "current_y": bot.current_y,
+            "current_x": x,
+            "current_y": y,
             "current_orders_count": bot.current_orders_count,
             "total_deliveries": bot.total_deliveries
         })
+    bots_part = json.dumps(bots_data).encode()
     
-    # Serialize nodes
-    nodes_data = []
-    for node in nodes:
-        nodes_data.append({
-            "id": node.id,
-            "x": node.x,
-            "y": node.y,
-            "is_delivery_point": node.is_delivery_point,
-            "is_restaurant": node.is_restaurant,
-            "restaurant_type": node.restaurant_type
-        })
+    etag = f'"{version}-{hashlib.blake2b(bots_part, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
     
-    # Serialize restaurants
-    restaurants_data = []
-    for r in restaurants:
-        restaurants_data.append({
-            "id": r.id,
-            "name": r.name,
-            "restaurant_type": r.restaurant_type.value if r.restaurant_type else None,
-            "node_id": r.node_id,
-            "is_active": r.is_active
-        })
-    
-    return {
-        "grid_size": 9,
-        "nodes": nodes_data,
-        "blocked_paths": [
-            {"from_id": b.from_node_id, "to_id": b.to_node_id}
-            for b in blocked_paths
-        ],
-        "restaurants": restaurants_data,
-        "bots": bots_data
-    }
+    return Response(content=static_part + bots_part + b"}", media_type="application/json", headers=headers)
 
 
 @router.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
-    total_orders = db.query(Order).count()
-    pending_orders = db.query(Order).filter(Order.status == OrderStatus.PENDING).count()
-    delivered_orders = db.query(Order).filter(Order.status == OrderStatus.DELIVERED).count()
-    
-    active_statuses = [OrderStatus.ASSIGNED, OrderStatus.PICKING_UP, 
-                       OrderStatus.PICKED_UP, OrderStatus.DELIVERING]
-    active_orders = db.query(Order).filter(Order.status.in_(active_statuses)).count()
-    
-    available_bots = db.query(Bot).filter(Bot.status == BotStatus.AVAILABLE).count()
-    busy_bots = db.query(Bot).filter(Bot.status == BotStatus.BUSY).count()
-    
+def get_stats():
+    """Dashboard counters, kept live in memory - no queries"""
     return {
-        "total_orders": total_orders,
-        "pending_orders": pending_orders,
-        "active_deliveries": active_orders,
-        "completed_deliveries": delivered_orders,
-        "available_bots": available_bots,
-        "busy_bots": busy_bots
+        "total_orders": status_counters.orders(),
+        "pending_orders": status_counters.orders(OrderStatus.PENDING),
+        "active_deliveries": status_counters.orders(
+            OrderStatus.ASSIGNED, OrderStatus.PICKING_UP, OrderStatus.PICKED_UP, OrderStatus.DELIVERING
+        ),
+        "completed_deliveries": status_counters.orders(OrderStatus.DELIVERED),
+        "available_bots": status_counters.bots(BotStatus.AVAILABLE),
+        "busy_bots": status_counters.bots(BotStatus.BUSY)
     }
 
 
@@ -108,77 +125,107 @@ def calculate_route(
     start_x: int,
     start_y: int,
     end_x: int,
-    end_y: int,
-    db: Session = Depends(get_db)
+    end_y: int
 ):
     """
-    Calculate shortest path between two points using A* algorithm.
+    Shortest path between two points, answered by the shared routing engine.
+    """
+    check_on_grid(start_x, start_y)
+    check_on_grid(end_x, end_y)
+    
+    node_path = find_path(get_node_id(start_x, start_y), get_node_id(end_x, end_y))
+    
+    if not node_path:
+        raise HTTPException(status_code=400, detail="No path found")
+    
+    return serialize_route(node_path)
+
+
+@router.post("/routes")
+def calculate_routes(routes: List[RouteRequest]):
     """
-    # Load blocked paths
-    blocked = db.query(BlockedPath).all()
-    blocked_set: Set[Tuple[int, int]] = set()
-    for b in blocked:
-        blocked_set.add((b.from_node_id, b.to_node_id))
-        blocked_set.add((b.to_node_id, b.from_node_id))
-    
-    def get_node_id(x: int, y: int) -> int:
-        return y * 9 + x
-    
-    def get_coords(node_id: int) -> Tuple[int, int]:
-        return (node_id % 9, node_id // 9)
-    
-    def get_neighbors(node_id: int) -> List[int]:
-        x, y = get_coords(node_id)
-        neighbors = []
-        
-        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-            new_x, new_y = x + dx, y + dy
-            
-            if 0 <= new_x < 9 and 0 <= new_y < 9:
-                neighbor_id = get_node_id(new_x, new_y)
-                
-                if (node_id, neighbor_id) not in blocked_set:
-                    neighbors.append(neighbor_id)
-        
-        return neighbors
-    
-    def heuristic(node_id: int, goal_id: int) -> int:
-        x1, y1 = get_coords(node_id)
-        x2, y2 = get_coords(goal_id)
-        return abs(x1 - x2) + abs(y1 - y2)
-    
-    start_id = get_node_id(start_x, start_y)
-    end_id = get_node_id(end_x, end_y)
-    
-    open_set = [(0, start_id)]
-    came_from: Dict[int, int] = {}
-    g_score: Dict[int, float] = {start_id: 0}
-    
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        
-        if current == end_id:
-            path = []
-            while current in came_from:
-                x, y = get_coords(current)
-                path.append({"x": x, "y": y})
-                current = came_from[current]
-            path.append({"x": start_x, "y": start_y})
-            path.reverse()
-            
-            return {
-                "path": path,
-                "distance": len(path) - 1,
-                "estimated_time": len(path) - 1
-            }
-        
-        for neighbor in get_neighbors(current):
-            tentative_g = g_score.get(current, float('inf')) + 1
-            
-            if tentative_g < g_score.get(neighbor, float('inf')):
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g
-                f_score = tentative_g + heuristic(neighbor, end_id)
-                heapq.heappush(open_set, (f_score, neighbor))
-    
-    raise HTTPException(status_code=400, detail="No path found")
\ No newline at end of file
+    Shortest paths for many (start, end) pairs in one request.
+    
+    Pairs are grouped by start point and each start is searched once for
+    all of its ends, so the cost grows with the number of distinct starts.
+    Results keep the request order; pairs without a path get "path": [].
+    """
+    if len(routes) > MAX_BATCH_ROUTES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ROUTES} routes per request")
+    
+    # Group end nodes by start node
+    ends_by_start: Dict[int, Set[int]] = {}
+    for route in routes:
+        check_on_grid(route.start_x, route.start_y)
+        check_on_grid(route.end_x, route.end_y)
+        start_id = get_node_id(route.start_x, route.start_y)
+        ends_by_start.setdefault(start_id, set()).add(get_node_id(route.end_x, route.end_y))
+    
+    paths = {
+        start_id: find_paths_from(start_id, end_ids)
+        for start_id, end_ids in ends_by_start.items()
+    }
+    
+    results = []
+    for route in routes:
+        start_id = get_node_id(route.start_x, route.start_y)
+        node_path = paths[start_id].get(get_node_id(route.end_x, route.end_y))
+        if node_path:
+            results.append(serialize_route(node_path))
+        else:
+            results.append({"path": [], "distance": None, "estimated_time": None, "error": "No path found"})
+    
+    return {"routes": results}
+
+
+@router.post("/distance-matrix")
+def calculate_distance_matrix(request: DistanceMatrixRequest):
+    """
+    Many-to-many shortest distances (grid steps).
+    
+    distances[i][j] is the distance from sources[i] to targets[j],
+    or null if there is no path. One search per distinct source.
+    """
+    if len(request.sources) * len(request.targets) > MAX_MATRIX_CELLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MATRIX_CELLS} matrix cells per request")
+    
+    for point in request.sources + request.targets:
+        check_on_grid(point.x, point.y)
+    
+    source_ids = [get_node_id(p.x, p.y) for p in request.sources]
+    target_ids = [get_node_id(p.x, p.y) for p in request.targets]
+    
+    distances_by_source: Dict[int, Dict[int, int]] = {}
+    for source_id in source_ids:
+        if source_id not in distances_by_source:
+            distances_by_source[source_id] = find_distances_from(source_id, target_ids)
+    
+    return {
+        "sources": [p.model_dump() for p in request.sources],
+        "targets": [p.model_dump() for p in request.targets],
+        "distances": [
+            [distances_by_source[source_id].get(target_id) for target_id in target_ids]
+            for source_id in source_ids
+        ]
+    }
+
+
+# ============ Helpers ============
+
+def check_on_grid(x: int, y: int):
+    if not is_on_grid(x, y):
+        width, height = get_grid_size()
+        raise HTTPException(status_code=400, detail=f"Invalid location ({x}, {y}) - grid is {width}x{height}")
+
+
+def serialize_route(node_path: List[int]) -> dict:
+    path = []
+    for node_id in node_path:
+        x, y = get_node_coords(node_id)
+        path.append({"x": x, "y": y})
+    
+    return {
+        "path": path,
+        "distance": len(path) - 1,
+        "estimated_time": len(path) - 1
+    }
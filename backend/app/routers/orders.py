@@ -1,73 +1,271 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import Integer, Select, bindparam, delete, update
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List
-from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+from datetime import datetime
+import orjson
 
-from app.database import get_db
-from app.models import Order, Bot, Restaurant, Node, OrderStatus, BotStatus
+from app.database import get_db, SessionLocal
+from app.models import Bot, Order, OrderStatus
+from app.routing import UNREACHABLE, find_path, get_router, get_grid_size, get_node_coords, get_node_id, is_on_grid
+from app.catalog import restaurant_catalog
+from app.assignment import load_candidates, nearest_bot_ids, rank_bots, tour_order_for
+from app.plans import route_plans, write_estimates
+from app.tours import TourOrder, plan_tour
+from app.reservations import reserve_bot, release_bot
+from app.config import BOT_CAPACITY, RESTAURANT_ORDER_LIMIT, RESTAURANT_ORDER_WINDOW
+from app.rate_limit import SlidingWindowRateLimiter, create_backend
+from app.events import event_bus
+from app.counters import status_counters
+from app.fleet import fleet_simulator
+from app.dispatch import order_dispatcher
+from app.rows import OrderRow, fetch_row, fetch_rows, select_rows
 
 # Create router
 router = APIRouter(prefix="/api/orders", tags=["Orders"])
 
-# Rate limit settings
-RESTAURANT_ORDER_LIMIT = 3
-RESTAURANT_ORDER_WINDOW = 30
+# Rate limit per restaurant
+restaurant_rate_limiter = SlidingWindowRateLimiter(
+    RESTAURANT_ORDER_LIMIT,
+    RESTAURANT_ORDER_WINDOW,
+    backend=create_backend()
+)
+
+# Orders a bot is working on
+ACTIVE_STATUSES = [
+    OrderStatus.ASSIGNED,
+    OrderStatus.PICKING_UP,
+    OrderStatus.PICKED_UP,
+    OrderStatus.DELIVERING
+]
+
+
+# Listing page sizes and export batch (rows per fetch from the server-side cursor)
+ORDERS_PAGE_SIZE = 100
+ORDERS_MAX_PAGE_SIZE = 1000
+ORDERS_EXPORT_BATCH = 1000
+
+
+# ============ Listing ============
+
+def parse_statuses(statuses: Optional[List[str]]) -> Optional[List[OrderStatus]]:
+    if not statuses:
+        return None
+    try:
+        return [OrderStatus(s) for value in statuses for s in value.split(",") if s]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {e}")
+
+
+def order_listing(
+    statuses: Optional[List[OrderStatus]] = None,
+    bot_id: Optional[int] = None,
+    restaurant_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+) -> Select:
+    """Column-only SELECT of the orders matching every given filter"""
+    statement = select_rows(OrderRow)
+    if statuses:
+        statement = statement.where(Order.status.in_(statuses) if len(statuses) > 1 else Order.status == statuses[0])
+    if bot_id is not None:
+        statement = statement.where(Order.bot_id == bot_id)
+    if restaurant_id is not None:
+        statement = statement.where(Order.restaurant_id == restaurant_id)
+    if created_after is not None:
+        statement = statement.where(Order.created_at >= created_after)
+    if created_before is not None:
+        statement = statement.where(Order.created_at < created_before)
+    return statement
+
+
+def keyset_pages(statement: Select) -> Tuple[Select, Select]:
+    """
+    A listing's first page and the page below a cursor, newest first.
+    Page size and cursor are bound parameters, so statements built once
+    are executed as they are.
+    """
+    first = statement.order_by(Order.id.desc()).limit(bindparam("limit", type_=Integer))
+    return first, first.where(Order.id < bindparam("cursor", type_=Integer))
+
+
+def order_page(db: Session, pages: Tuple[Select, Select], cursor: Optional[int], limit: int) -> ORJSONResponse:
+    """
+    One page, newest first. Keyset pagination: the next page starts below
+    the last id of this one, so every page is an index range scan however
+    deep it is. The next cursor is sent in the X-Next-Cursor header.
+    """
+    first, after_cursor = pages
+    if cursor is None:
+        rows = fetch_rows(db, OrderRow, first, {"limit": limit + 1})
+    else:
+        rows = fetch_rows(db, OrderRow, after_cursor, {"limit": limit + 1, "cursor": cursor})
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1].id)
+    return ORJSONResponse(rows, headers=headers)
+
+
+def export_rows(statement: Select) -> Iterator[bytes]:
+    """NDJSON lines from a server-side cursor, one batch in memory at a time"""
+    # Own session: the request's session is closed before the body is streamed
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            statement.order_by(Order.id).execution_options(stream_results=True, yield_per=ORDERS_EXPORT_BATCH)
+        )
+        for batch in result.partitions():
+            yield b"".join(orjson.dumps(OrderRow(*row)) + b"\n" for row in batch)
+    finally:
+        db.close()
+
+
+# The fixed listings are built once: running the same statement object
+# skips rebuilding it and its SQL cache key on every request
+PENDING_PAGES = keyset_pages(order_listing([OrderStatus.PENDING]))
+ACTIVE_PAGES = keyset_pages(order_listing(ACTIVE_STATUSES))
+ORDER_BY_ID = select_rows(OrderRow).where(Order.id == bindparam("order_id", type_=Integer))
 
 
 # ============ GET ENDPOINTS ============
 
 @router.get("/")
-def get_all_orders(db: Session = Depends(get_db)):
-    """Get all orders"""
-    orders = db.query(Order).order_by(Order.id.desc()).all()
-    
-    # Serialize orders
-    result = []
-    for order in orders:
-        result.append({
-            "id": order.id,
-            "customer_name": order.customer_name,
-            "customer_address": order.customer_address,
-            "pickup_node_id": order.pickup_node_id,
-            "delivery_node_id": order.delivery_node_id,
-            "restaurant_id": order.restaurant_id,
-            "bot_id": order.bot_id,
-            "status": order.status.value if order.status else "pending",
-            "estimated_time": order.estimated_time,
-            "created_at": order.created_at.isoformat() if order.created_at else None
-        })
-    
-    return result
+def get_all_orders(
+    cursor: Optional[int] = None,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_MAX_PAGE_SIZE),
+    status: Optional[List[str]] = Query(None),
+    bot_id: Optional[int] = None,
+    restaurant_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Orders, newest first, one page at a time. Pass the X-Next-Cursor
+    response header as ?cursor= for the next page. status can be repeated
+    or comma separated.
+    """
+    statement = order_listing(parse_statuses(status), bot_id, restaurant_id, created_after, created_before)
+    return order_page(db, keyset_pages(statement), cursor, limit)
+
+
+@router.get("/export")
+def export_orders(
+    cursor: Optional[int] = None,
+    status: Optional[List[str]] = Query(None),
+    bot_id: Optional[int] = None,
+    restaurant_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """
+    Every matching order as NDJSON (one JSON object per line), oldest
+    first, streamed in constant memory. cursor resumes after that id.
+    """
+    statement = order_listing(parse_statuses(status), bot_id, restaurant_id, created_after, created_before)
+    if cursor is not None:
+        statement = statement.where(Order.id > cursor)
+    return StreamingResponse(export_rows(statement), media_type="application/x-ndjson")
 
 
 @router.get("/pending")
-def get_pending_orders(db: Session = Depends(get_db)):
-    """Get all pending orders"""
-    orders = db.query(Order).filter(Order.status == OrderStatus.PENDING).all()
-    return orders
+def get_pending_orders(
+    cursor: Optional[int] = None,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """Get pending orders, newest first"""
+    return order_page(db, PENDING_PAGES, cursor, limit)
 
 
 @router.get("/active")
-def get_active_orders(db: Session = Depends(get_db)):
-    """Get all active orders"""
-    active_statuses = [
-        OrderStatus.ASSIGNED,
-        OrderStatus.PICKING_UP,
-        OrderStatus.PICKED_UP,
-        OrderStatus.DELIVERING
-    ]
-    orders = db.query(Order).filter(Order.status.in_(active_statuses)).all()
-    return orders
+def get_active_orders(
+    cursor: Optional[int] = None,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """Get active orders, newest first"""
+    return order_page(db, ACTIVE_PAGES, cursor, limit)
 
 
 @router.get("/{order_id}")
 def get_order(order_id: int, db: Session = Depends(get_db)):
     """Get a specific order"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = fetch_row(db, OrderRow, ORDER_BY_ID, {"order_id": order_id})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return ORJSONResponse(order)
+
+
+@router.get("/{order_id}/route")
+def get_order_route(order_id: int, db: Session = Depends(get_db)):
+    """
+    Route of an order: from its bot, along the bot's planned tour, to the
+    delivery. Served from the plan stored at assignment; a pending order
+    gets the pickup to delivery leg and no ETA.
+    """
+    order = db.query(
+        Order.bot_id, Order.status, Order.pickup_node_id, Order.delivery_node_id
+    ).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    
+    # Simulated changes may not be written yet
+    status = fleet_simulator.live_order_status(order_id) or order.status
+    if status == OrderStatus.PENDING or not order.bot_id:
+        node_path = find_path(order.pickup_node_id, order.delivery_node_id)
+        estimated_time = None
+    elif status in ACTIVE_STATUSES:
+        plan = route_plans.get(order.bot_id)
+        if plan is None or not plan.current or order_id not in plan.remaining_orders():
+            plan = replan_bot(db, order.bot_id)
+        node_path = plan.path_to(order_id) if plan else []
+        estimated_time = plan.estimates()[order_id][0] if node_path else None
+    else:
+        raise HTTPException(status_code=400, detail=f"Order is {status.value}")
+    
+    if not node_path:
+        raise HTTPException(status_code=400, detail="No path found")
+    
+    path = []
+    for node_id in node_path:
+        x, y = get_node_coords(node_id)
+        path.append({"x": x, "y": y})
+    return {
+        "order_id": order_id,
+        "bot_id": order.bot_id,
+        "path": path,
+        "distance": len(path) - 1,
+        "estimated_time": estimated_time
+    }
+
+
+def replan_bot(db: Session, bot_id: int):
+    """Plan the bot's tour from where it is now and store its estimates"""
+    bot = db.query(Bot.current_x, Bot.current_y).filter(Bot.id == bot_id).first()
+    if not bot:
+        return None
+    x, y = fleet_simulator.live_position(bot_id) or (bot.current_x, bot.current_y)
+    orders = []
+    for order in db.query(Order).filter(Order.bot_id == bot_id, Order.status.in_(ACTIVE_STATUSES)):
+        status = fleet_simulator.live_order_status(order.id) or order.status
+        if status in ACTIVE_STATUSES:
+            orders.append(TourOrder(
+                order_id=order.id,
+                pickup_node_id=order.pickup_node_id,
+                delivery_node_id=order.delivery_node_id,
+                picked_up=status in (OrderStatus.PICKED_UP, OrderStatus.DELIVERING)
+            ))
+    
+    tour = plan_tour(get_node_id(x, y), orders)
+    if tour.distance == UNREACHABLE:
+        return None
+    plan = route_plans.plan(bot_id, tour)
+    write_estimates(db, plan)
+    db.commit()
+    return plan
 
 
 # ============ POST ENDPOINTS ============
@@ -83,35 +281,34 @@ def create_order(
 ):
     """Create a new order with rate limiting"""
     
-    # 1. Check restaurant exists
-    restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
-    if not restaurant:
+    # 1. Check restaurant exists (in-process catalog, no query)
+    entry = restaurant_catalog.get(db).get(restaurant_id)
+    if not entry:
         raise HTTPException(status_code=404, detail="Restaurant not found")
     
-    # 2. Rate limit check
-    thirty_seconds_ago = datetime.utcnow() - timedelta(seconds=RESTAURANT_ORDER_WINDOW)
-    recent_orders_count = db.query(Order).filter(
-        and_(
-            Order.restaurant_id == restaurant_id,
-            Order.created_at >= thirty_seconds_ago
-        )
-    ).count()
+    # 2. Validate delivery location
+    if not is_on_grid(delivery_x, delivery_y):
+        width, height = get_grid_size()
+        raise HTTPException(status_code=400, detail=f"Invalid delivery location (grid is {width}x{height})")
     
-    if recent_orders_count >= RESTAURANT_ORDER_LIMIT:
+    pickup_node_id = entry.restaurant.node_id
+    delivery_node_id = get_node_id(delivery_x, delivery_y)
+    
+    if not get_router().is_reachable(pickup_node_id, delivery_node_id):
+        raise HTTPException(status_code=400, detail="Delivery location is not reachable from the restaurant")
+    
+    # 3. Rate limit check - takes a slot only for orders that will be created
+    if not restaurant_rate_limiter.try_acquire(restaurant_id):
         raise HTTPException(
             status_code=429,
             detail=f"Restaurant busy! Max {RESTAURANT_ORDER_LIMIT} orders per {RESTAURANT_ORDER_WINDOW}s. Try again later."
         )
     
-    # 3. Validate delivery location
-    if not (0 <= delivery_x <= 8 and 0 <= delivery_y <= 8):
-        raise HTTPException(status_code=400, detail="Invalid delivery location (must be 0-8)")
-    
-    pickup_node_id = restaurant.node_id
-    delivery_node_id = delivery_y * 9 + delivery_x
-    
     # 4. Format address
-    formatted_address = f"L{delivery_y}{delivery_x}"
+    if delivery_x < 10 and delivery_y < 10:
+        formatted_address = f"L{delivery_y}{delivery_x}"
+    else:
+        formatted_address = f"L{delivery_y}-{delivery_x}"
     if customer_address:
         formatted_address = f"{formatted_address} - {customer_address}"
     
@@ -125,36 +322,87 @@ def create_order(
         status=OrderStatus.PENDING
     )
     
+    # Flushed for its id, committed only once assigned or left pending: the
+    # dispatcher's sweep never sees it pending while a bot is being reserved
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    db.flush()
+    
+    # 6. Auto-assign the nearby bot with the lowest marginal route cost
+    bots_by_id, candidates = load_candidates(db, nearest_bot_ids(db, pickup_node_id))
     
-    # 6. Auto-assign bot
-    bot = db.query(Bot).filter(
-        Bot.current_orders_count < 3
-    ).order_by(Bot.current_orders_count.asc()).first()
+    # Reserve atomically, best candidate first - a bot filled up by a
+    # concurrent request since the query above is skipped
+    bot = None
+    assignment = None
+    for candidate in rank_bots(candidates, tour_order_for(new_order)):
+        if reserve_bot(db, candidate.bot_id):
+            bot = bots_by_id[candidate.bot_id]
+            assignment = candidate
+            break
     
+    estimated_time = route_distance = None
     if bot:
         new_order.bot_id = bot.id
         new_order.status = OrderStatus.ASSIGNED
         new_order.assigned_at = datetime.utcnow()
         
-        bot.current_orders_count = bot.current_orders_count + 1
-        bot.status = BotStatus.BUSY
+        # Route the bot's new tour once: ETAs of all its orders are stored,
+        # and the simulator and /route follow the same path
+        plan = route_plans.plan(bot.id, assignment.tour)
+        write_estimates(db, plan)
+        estimated_time, route_distance = plan.estimates().get(new_order.id, (assignment.eta_seconds, None))
         
         db.commit()
         db.refresh(bot)
+        status_counters.order_changed(None, OrderStatus.ASSIGNED)
+        status_counters.bot_changed(bot.id, bot.status)
         
-        print(f"✅ Assigned Order #{new_order.id} to {bot.name}, orders: {bot.current_orders_count}/3")
+        print(f"✅ Assigned Order #{new_order.id} to {bot.name}, orders: {bot.current_orders_count}/{BOT_CAPACITY}, cost: {assignment.cost}")
+        event_bus.publish("bots", [bot.id])
+    else:
+        db.commit()
+        status_counters.order_changed(None, OrderStatus.PENDING)
+        # Every bot is full - assigned as soon as one frees a slot
+        order_dispatcher.enqueue(new_order)
+    
+    event_bus.publish("orders", [new_order.id])
     
     return {
         "message": "Order created!",
         "order_id": new_order.id,
         "address": formatted_address,
-        "bot_assigned": bot.name if bot else None
+        "bot_assigned": bot.name if bot else None,
+        "assignment_cost": assignment.cost if assignment else None,
+        "estimated_time": estimated_time,
+        "route_distance": route_distance
     }
 
 
+# ============ Transitions ============
+
+def move_order(db: Session, order: Order, **values) -> Tuple[bool, Optional[int]]:
+    """
+    Write the order's new status only if nobody moved it on since it was
+    read: an active order may only have advanced between active statuses
+    (the simulator), any other order must be unchanged. One conditional
+    UPDATE, so of two requests closing the same order only one matches and
+    gives back the bot slot.
+    Returns (written, bot the order held a slot on).
+    """
+    active = order.status in ACTIVE_STATUSES
+    moved = db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.status.in_(ACTIVE_STATUSES if active else [order.status]))
+        .values(**values)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if moved is None:
+        return False, None
+    # bot_id is only set on assignment, which needs PENDING
+    return True, order.bot_id if active else None
+
+
 # ============ PUT ENDPOINTS ============
 
 @router.put("/{order_id}/status/{new_status}")
@@ -169,32 +417,41 @@ def update_order_status(order_id: int, new_status: str, db: Session = Depends(ge
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid status: {new_status}")
     
+    # As stored: simulated changes not written yet are the simulator's to count
     old_status = order.status
-    order.status = status_enum
-    
-    # Handle delivered
+    values = {"status": status_enum}
     if status_enum == OrderStatus.DELIVERED:
-        order.delivered_at = datetime.utcnow()
-        if order.bot_id:
-            bot = db.query(Bot).filter(Bot.id == order.bot_id).first()
-            if bot:
-                bot.current_orders_count = max(0, bot.current_orders_count - 1)
-                bot.total_deliveries = bot.total_deliveries + 1
-                if bot.current_orders_count == 0:
-                    bot.status = BotStatus.AVAILABLE
-                db.commit()
-    
-    # Handle cancelled
+        values["delivered_at"] = datetime.utcnow()
     elif status_enum == OrderStatus.CANCELLED:
-        if order.bot_id:
-            bot = db.query(Bot).filter(Bot.id == order.bot_id).first()
-            if bot:
-                bot.current_orders_count = max(0, bot.current_orders_count - 1)
-                if bot.current_orders_count == 0:
-                    bot.status = BotStatus.AVAILABLE
-            order.bot_id = None
+        values["bot_id"] = None
+    
+    moved, bot_id = move_order(db, order, **values)
+    if not moved:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order changed meanwhile, try again")
+    
+    # Only the request that took the order out of its active status gives the slot back
+    holds_slot = bot_id is not None
+    bot_status = None
+    if holds_slot and status_enum in (OrderStatus.DELIVERED, OrderStatus.CANCELLED):
+        bot_status = release_bot(db, bot_id, delivered=status_enum == OrderStatus.DELIVERED)
     
     db.commit()
+    if status_enum not in ACTIVE_STATUSES:
+        # Taken out of the simulated flow by hand - the bot stops driving it
+        fleet_simulator.untrack(order_id)
+        if holds_slot:
+            route_plans.order_left(bot_id, order_id)
+    
+    status_counters.order_changed(old_status, status_enum)
+    if status_enum != OrderStatus.PENDING:
+        order_dispatcher.discard(order_id)
+    if bot_status:
+        status_counters.bot_changed(bot_id, bot_status)
+        order_dispatcher.capacity_released()
+    event_bus.publish("orders", [order_id])
+    if holds_slot:
+        event_bus.publish("bots", [bot_id])
     return {"message": f"Order {order_id} status updated to {new_status}"}
 
 
@@ -210,16 +467,30 @@ def delete_order(order_id: int, db: Session = Depends(get_db)):
     if order.status != OrderStatus.PENDING:
         raise HTTPException(status_code=400, detail="Can only delete pending orders")
     
+    # Only while still pending - a concurrent assignment wins
+    deleted = db.execute(
+        delete(Order)
+        .where(Order.id == order_id, Order.status == OrderStatus.PENDING)
+        .returning(Order.bot_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order changed meanwhile, try again")
+    
     # Free bot if assigned
-    if order.bot_id:
-        bot = db.query(Bot).filter(Bot.id == order.bot_id).first()
-        if bot:
-            bot.current_orders_count = max(0, bot.current_orders_count - 1)
-            if bot.current_orders_count == 0:
-                bot.status = BotStatus.AVAILABLE
-    
-    db.delete(order)
+    bot_id = deleted.bot_id
+    bot_status = release_bot(db, bot_id) if bot_id else None
     db.commit()
+    
+    status_counters.order_changed(OrderStatus.PENDING, None)
+    order_dispatcher.discard(order_id)
+    if bot_status:
+        status_counters.bot_changed(bot_id, bot_status)
+        order_dispatcher.capacity_released()
+    event_bus.publish("orders", [order_id])
+    if bot_id is not None:
+        event_bus.publish("bots", [bot_id])
     return {"message": f"Order {order_id} deleted"}
 
 
@@ -236,16 +507,25 @@ def cancel_order(order_id: int, db: Session = Depends(get_db)):
     if order.status == OrderStatus.CANCELLED:
         raise HTTPException(status_code=400, detail="Already cancelled")
     
+    old_status = order.status
+    moved, bot_id = move_order(db, order, status=OrderStatus.CANCELLED, bot_id=None)
+    if not moved:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order changed meanwhile, try again")
+    
     # Free bot
-    if order.bot_id:
-        bot = db.query(Bot).filter(Bot.id == order.bot_id).first()
-        if bot:
-            bot.current_orders_count = max(0, bot.current_orders_count - 1)
-            if bot.current_orders_count == 0:
-                bot.status = BotStatus.AVAILABLE
-    
-    order.status = OrderStatus.CANCELLED
-    order.bot_id = None
+    bot_status = release_bot(db, bot_id) if bot_id else None
     db.commit()
+    fleet_simulator.untrack(order_id)
+    if bot_id:
+        route_plans.order_left(bot_id, order_id)
     
+    status_counters.order_changed(old_status, OrderStatus.CANCELLED)
+    order_dispatcher.discard(order_id)
+    if bot_status:
+        status_counters.bot_changed(bot_id, bot_status)
+        order_dispatcher.capacity_released()
+    event_bus.publish("orders", [order_id])
+    if bot_id is not None:
+        event_bus.publish("bots", [bot_id])
     return {"message": f"Order {order_id} cancelled"}
\ No newline at end of file
@@ -1,174 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from dataclasses import replace
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import List, Dict, Set, Tuple
-import heapq
-import time
-import asyncio
-from datetime import datetime
 
-from app.database import get_db, SessionLocal
-from app.models import Order, Bot, Node, BlockedPath, OrderStatus, BotStatus
+from app.database import get_db
+from app.dispatch import order_dispatcher
+from app.fleet import fleet_simulator
+from app.headless import HeadlessConfig
+from app.models import Order, OrderStatus
+from app.sweep import build_scenarios
+from app.sweep_jobs import MAX_ACTIVE_JOBS, sweep_jobs
 
 # Create router
 router = APIRouter(prefix="/api/simulation", tags=["Simulation"])
 
-# Store active simulations
-active_simulations: Dict[int, bool] = {}
-
-
-def get_node_coords(node_id: int) -> Tuple[int, int]:
-    """Convert node ID to (x, y) coordinates"""
-    return (node_id % 9, node_id // 9)
-
-
-def get_node_id(x: int, y: int) -> int:
-    """Convert (x, y) to node ID"""
-    return y * 9 + x
-
-
-def calculate_path(start_x: int, start_y: int, end_x: int, end_y: int, blocked_set: Set[Tuple[int, int]]) -> List[Tuple[int, int]]:
-    """A* pathfinding algorithm"""
-    
-    def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> int:
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
-    
-    def get_neighbors(pos: Tuple[int, int]) -> List[Tuple[int, int]]:
-        x, y = pos
-        neighbors = []
-        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-            new_x, new_y = x + dx, y + dy
-            if 0 <= new_x < 9 and 0 <= new_y < 9:
-                current_id = get_node_id(x, y)
-                neighbor_id = get_node_id(new_x, new_y)
-                if (current_id, neighbor_id) not in blocked_set:
-                    neighbors.append((new_x, new_y))
-        return neighbors
-    
-    start = (start_x, start_y)
-    end = (end_x, end_y)
-    
-    open_set = [(0, start)]
-    came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
-    g_score: Dict[Tuple[int, int], float] = {start: 0}
-    
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        
-        if current == end:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            path.reverse()
-            return path
-        
-        for neighbor in get_neighbors(current):
-            tentative_g = g_score.get(current, float('inf')) + 1
-            if tentative_g < g_score.get(neighbor, float('inf')):
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g
-                f_score = tentative_g + heuristic(neighbor, end)
-                heapq.heappush(open_set, (f_score, neighbor))
-    
-    return []
+# Sweep size limits - each scenario is a full headless run
+MAX_SWEEP_SCENARIOS = 32
+MAX_SWEEP_ORDERS = 200000
 
 
-def run_simulation_sync(order_id: int):
-    """Run simulation for a single order (synchronous)"""
-    db = SessionLocal()
-    
-    try:
-        # Get order
-        order = db.query(Order).filter(Order.id == order_id).first()
-        if not order or not order.bot_id:
-            return
-        
-        # Get bot
-        bot = db.query(Bot).filter(Bot.id == order.bot_id).first()
-        if not bot:
-            return
-        
-        # Get blocked paths
-        blocked = db.query(BlockedPath).all()
-        blocked_set: Set[Tuple[int, int]] = set()
-        for b in blocked:
-            blocked_set.add((b.from_node_id, b.to_node_id))
-            blocked_set.add((b.to_node_id, b.from_node_id))
-        
-        # Get pickup and delivery coordinates
-        pickup_node = db.query(Node).filter(Node.id == order.pickup_node_id).first()
-        delivery_node = db.query(Node).filter(Node.id == order.delivery_node_id).first()
-        
-        if not pickup_node or not delivery_node:
-            return
-        
-        # Phase 1: Bot goes to restaurant (picking_up)
-        order.status = OrderStatus.PICKING_UP
-        db.commit()
-        
-        path_to_pickup = calculate_path(
-            bot.current_x, bot.current_y,
-            pickup_node.x, pickup_node.y,
-            blocked_set
-        )
-        
-        for x, y in path_to_pickup[1:]:  # Skip first position (current)
-            if order_id not in active_simulations or not active_simulations[order_id]:
-                return
-            time.sleep(1)  # 1 second per step
-            bot.current_x = x
-            bot.current_y = y
-            db.commit()
-        
-        # Phase 2: Pick up food
-        order.status = OrderStatus.PICKED_UP
-        db.commit()
-        time.sleep(1)
-        
-        # Phase 3: Bot delivers to customer (delivering)
-        order.status = OrderStatus.DELIVERING
-        db.commit()
-        
-        path_to_delivery = calculate_path(
-            bot.current_x, bot.current_y,
-            delivery_node.x, delivery_node.y,
-            blocked_set
-        )
-        
-        for x, y in path_to_delivery[1:]:
-            if order_id not in active_simulations or not active_simulations[order_id]:
-                return
-            time.sleep(1)
-            bot.current_x = x
-            bot.current_y = y
-            db.commit()
-        
-        # Phase 4: Delivered!
-        order.status = OrderStatus.DELIVERED
-        order.delivered_at = datetime.utcnow()
-        bot.current_orders_count -= 1
-        bot.total_deliveries += 1
-        if bot.current_orders_count == 0:
-            bot.status = BotStatus.AVAILABLE
-        db.commit()
-        
-        # Remove from active simulations
-        if order_id in active_simulations:
-            del active_simulations[order_id]
-            
-    except Exception as e:
-        print(f"Simulation error: {e}")
-    finally:
-        db.close()
+class SweepRequest(BaseModel):
+    fleet_sizes: List[int]
+    bot_capacities: List[int]
+    orders: List[int]
+    hours: float = 24
+    restaurant_order_limit: Optional[int] = None
+    restaurant_order_window: Optional[float] = None
+    seed: int = 0
 
 
 @router.post("/start/{order_id}")
-def start_simulation(
-    order_id: int,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+def start_simulation(order_id: int, db: Session = Depends(get_db)):
     """Start automatic delivery simulation for an order"""
     
     # Check if order exists and is in valid state
@@ -182,14 +46,11 @@ def start_simulation(
     if not order.bot_id:
         raise HTTPException(status_code=400, detail="No bot assigned to order")
     
-    if order_id in active_simulations and active_simulations[order_id]:
+    if fleet_simulator.is_active(order_id):
         raise HTTPException(status_code=400, detail="Simulation already running")
     
-    # Mark simulation as active
-    active_simulations[order_id] = True
-    
-    # Start background simulation
-    background_tasks.add_task(run_simulation_sync, order_id)
+    # The fleet simulator's tick loop picks it up with the bot's tour
+    fleet_simulator.track(order_id, order.bot_id)
     
     return {
         "message": f"Simulation started for order {order_id}",
@@ -200,9 +61,7 @@ def start_simulation(
 @router.post("/stop/{order_id}")
 def stop_simulation(order_id: int):
     """Stop simulation for an order"""
-    if order_id in active_simulations:
-        active_simulations[order_id] = False
-        del active_simulations[order_id]
+    if fleet_simulator.untrack(order_id):
         return {"message": f"Simulation stopped for order {order_id}"}
     return {"message": "No active simulation found"}
 
@@ -210,17 +69,18 @@ def stop_simulation(order_id: int):
 @router.get("/status")
 def get_simulation_status():
     """Get status of all active simulations"""
+    active = list(fleet_simulator.active_simulations.keys())
     return {
-        "active_simulations": list(active_simulations.keys()),
-        "count": len(active_simulations)
+        "active_simulations": active,
+        "count": len(active),
+        "pending_queue": len(order_dispatcher),
+        "dispatched": order_dispatcher.assigned,
+        "trajectories_published": fleet_simulator.trajectories_published
     }
 
 
 @router.post("/auto-start")
-def auto_start_simulations(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+def auto_start_simulations(db: Session = Depends(get_db)):
     """Automatically start simulations for all assigned orders"""
     
     # Find all orders that are assigned but not yet simulating
@@ -231,12 +91,49 @@ def auto_start_simulations(
     
     started = []
     for order in orders:
-        if order.id not in active_simulations:
-            active_simulations[order.id] = True
-            background_tasks.add_task(run_simulation_sync, order.id)
+        if not fleet_simulator.is_active(order.id):
+            fleet_simulator.track(order.id, order.bot_id)
             started.append(order.id)
     
     return {
         "message": f"Started {len(started)} simulations",
         "order_ids": started
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/sweep", status_code=202)
+def run_fleet_sweep(request: SweepRequest):
+    """Queue a grid of headless what-if scenarios; poll GET /sweep/{job_id} for the comparison"""
+    scenario_count = len(request.fleet_sizes) * len(request.bot_capacities) * len(request.orders)
+    if scenario_count == 0:
+        raise HTTPException(status_code=400, detail="Give at least one fleet size, capacity and order count")
+    if scenario_count > MAX_SWEEP_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SWEEP_SCENARIOS} scenarios per sweep")
+    if min(request.fleet_sizes + request.bot_capacities + request.orders) < 1 or request.hours <= 0:
+        raise HTTPException(status_code=400, detail="Fleet sizes, capacities, orders and hours must be positive")
+    if max(request.orders) > MAX_SWEEP_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SWEEP_ORDERS} orders per scenario")
+    
+    base = HeadlessConfig()
+    base = replace(
+        base,
+        duration_seconds=request.hours * 3600,
+        restaurant_order_limit=request.restaurant_order_limit or base.restaurant_order_limit,
+        restaurant_order_window=request.restaurant_order_window or base.restaurant_order_window,
+        seed=request.seed
+    )
+    scenarios = build_scenarios(request.fleet_sizes, request.bot_capacities, request.orders, base)
+    
+    job = sweep_jobs.submit(scenarios)
+    if job is None:
+        raise HTTPException(status_code=429, detail=f"{MAX_ACTIVE_JOBS} sweeps are already queued, try again later")
+    return job.as_dict()
+
+
+@router.get("/sweep/{job_id}")
+def get_fleet_sweep(job_id: int):
+    """Progress of a sweep, with the comparison table once it is done"""
+    job = sweep_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    return job.as_dict()
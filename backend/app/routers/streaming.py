@@ -1,104 +1,112 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Header
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-import asyncio
-import json
-from datetime import datetime
+from typing import Optional
 
-from app.database import get_db, SessionLocal
+from app.broadcast import Broadcaster, Dirty, State
+from app.database import SessionLocal
 from app.models import Order, Bot, OrderStatus
+from app.fleet import fleet_simulator
 
 # Create router
 router = APIRouter(prefix="/api/stream", tags=["Real-time Streaming"])
 
 
-async def order_event_generator():
-    last_states = {}
+def load_stream_state(dirty: Optional[Dirty] = None) -> State:
+    """Active orders and all bots keyed by id - all of them, or just the dirty ones"""
+    db = SessionLocal()
+    try:
+        # Get non-completed orders
+        orders_query = db.query(Order).filter(
+            Order.status.notin_([OrderStatus.DELIVERED, OrderStatus.CANCELLED])
+        )
+        bots_query = db.query(Bot)
+        
+        if dirty is None:
+            orders = orders_query.all()
+            bots = bots_query.all()
+        else:
+            order_ids = dirty.get("orders", set())
+            bot_ids = dirty.get("bots", set())
+            orders = orders_query.filter(Order.id.in_(order_ids)).all() if order_ids else []
+            bots = bots_query.filter(Bot.id.in_(bot_ids)).all() if bot_ids else []
+    finally:
+        db.close()
     
-    while True:
-        try:
-            # Create new database session
-            db = SessionLocal()
-            
-            try:
-                # Get all non-completed orders
-                orders = db.query(Order).filter(
-                    Order.status.notin_([OrderStatus.DELIVERED, OrderStatus.CANCELLED])
-                ).all()
-                
-                # Get all bots
-                bots = db.query(Bot).all()
-                
-                # Build current state
-                orders_data = []
-                for order in orders:
-                    order_state = {
-                        "id": order.id,
-                        "customer_name": order.customer_name,
-                        "status": order.status.value,
-                        "bot_id": order.bot_id,
-                        "pickup_node_id": order.pickup_node_id,
-                        "delivery_node_id": order.delivery_node_id,
-                        "restaurant_id": order.restaurant_id
-                    }
-                    orders_data.append(order_state)
-                
-                bots_data = []
-                for bot in bots:
-                    bot_state = {
-                        "id": bot.id,
-                        "name": bot.name,
-                        "status": bot.status.value,
-                        "current_x": bot.current_x,
-                        "current_y": bot.current_y,
-                        "orders_count": bot.current_orders_count
-                    }
-                    bots_data.append(bot_state)
-                
-                # Create event data
-                event_data = {
-                    "type": "update",
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "orders": orders_data,
-                    "bots": bots_data
-                }
-                
-                # Send SSE format
-                yield f"data: {json.dumps(event_data)}\n\n"
-                
-            finally:
-                db.close()
-            
-            # Wait 2 seconds before next update
-            await asyncio.sleep(2)
-            
-        except Exception as e:
-            error_data = {"type": "error", "message": str(e)}
-            yield f"data: {json.dumps(error_data)}\n\n"
-            await asyncio.sleep(5)
+    # Dirty ids not found anymore (completed, deleted) are removed
+    orders_data = {order_id: None for order_id in dirty.get("orders", ())} if dirty else {}
+    bots_data = {bot_id: None for bot_id in dirty.get("bots", ())} if dirty else {}
+    
+    # Build current state
+    for order in orders:
+        # Simulated changes may not be written yet
+        status = fleet_simulator.live_order_status(order.id) or order.status
+        orders_data[order.id] = {
+            "id": order.id,
+            "customer_name": order.customer_name,
+            "status": status.value,
+            "bot_id": order.bot_id,
+            "pickup_node_id": order.pickup_node_id,
+            "delivery_node_id": order.delivery_node_id,
+            "restaurant_id": order.restaurant_id
+        }
+    
+    for bot in bots:
+        # A moving bot is sent where its trajectory starts - it only
+        # changes when the trajectory does, clients interpolate the rest
+        trajectory = fleet_simulator.live_trajectory(bot.id)
+        if trajectory:
+            x, y = trajectory.origin
+        else:
+            x, y = fleet_simulator.live_position(bot.id) or (bot.current_x, bot.current_y)
+        bots_data[bot.id] = {
+            "id": bot.id,
+            "name": bot.name,
+            "status": bot.status.value,
+            "current_x": x,
+            "current_y": y,
+            "orders_count": bot.current_orders_count,
+            "trajectory": trajectory.points() if trajectory else None
+        }
+    
+    return {"orders": orders_data, "bots": bots_data}
+
+
+# One producer for every connected client
+order_broadcaster = Broadcaster(load_stream_state)
 
 
 @router.get("/orders")
-async def stream_orders():
+async def stream_orders(last_event_id: Optional[str] = Header(None)):
     """
     Stream real-time order updates via Server-Sent Events.
     
-    Connect to this endpoint to receive live updates about:
-    - Order status changes
-    - Bot positions
-    - New orders
+    The first event is a full "snapshot" of active orders and bots. After
+    that only "delta" events are sent, with the orders and bots that are
+    new or changed and the ids in removed_orders / removed_bots.
+    
+    A moving bot has a "trajectory": [[x, y, time], ...], the waypoints
+    of its planned path with the epoch seconds it is due at each. Its
+    current_x / current_y is where the trajectory starts, and it is sent
+    again only when the trajectory changes (re-route, delay, stop), so
+    interpolate between waypoints to show where it is now. null: the bot
+    is not moving.
+    
+    Every event has an id. A client reconnecting with Last-Event-ID
+    (EventSource does this on its own) gets just the deltas it missed,
+    or a new snapshot if they are too old or the id is from before a
+    restart or from another worker.
     
     Usage in JavaScript:
 ```
     const eventSource = new EventSource('/api/stream/orders');
     eventSource.onmessage = (event) => {
         const data = JSON.parse(event.data);
-        console.log('Update:', data);
+        console.log(data.type, data);
     };
 ```
     """
     return StreamingResponse(
-        order_event_generator(),
+        order_broadcaster.stream(last_event_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -111,4 +119,10 @@ async def stream_orders():
 @router.get("/health")
 def stream_health():
     """Check if streaming endpoint is available"""
-    return {"status": "streaming available", "endpoint": "/api/stream/orders"}
\ No newline at end of file
+    return {
+        "status": "streaming available",
+        "endpoint": "/api/stream/orders",
+        "subscribers": order_broadcaster.subscriber_count,
+        "last_event_id": order_broadcaster.event_id(order_broadcaster.last_id),
+        "dropped_events": order_broadcaster.dropped
+    }
\ No newline at end of file
@@ -0,0 +1,47 @@
+import json
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.fleet_feed import FleetFeed, parse_subscription
+from app.routers.streaming import order_broadcaster
+
+# Create router
+router = APIRouter(prefix="/api/ws", tags=["Real-time Streaming"])
+
+# Shares the stream's state and change detection
+fleet_feed = FleetFeed(order_broadcaster)
+
+
+@router.websocket("/fleet")
+async def fleet_socket(websocket: WebSocket):
+    """
+    Live fleet over a WebSocket: binary bot-position frames plus
+    periodic JSON order updates. See app/fleet_feed.py for the frame
+    layout and the subscription messages.
+    """
+    await websocket.accept()
+    client = None
+    try:
+        client = await fleet_feed.connect(websocket)
+        while True:
+            message = await websocket.receive_text()
+            try:
+                fleet_feed.subscribe(client, parse_subscription(json.loads(message)))
+            except (TypeError, ValueError) as e:
+                fleet_feed.send_text(client, json.dumps({"type": "error", "message": str(e)}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if client:
+            await fleet_feed.disconnect(client)
+
+
+@router.get("/health")
+def ws_health():
+    """Check if the fleet WebSocket is available"""
+    return {
+        "status": "websocket available",
+        "endpoint": "/api/ws/fleet",
+        "clients": len(fleet_feed.clients),
+        "dropped_messages": fleet_feed.dropped
+    }
@@ -0,0 +1,94 @@
+"""
+Routing engine shared by the map, order and simulation routers.
+
+The map is loaded once (grid size from the nodes table, edges from
+blocked_paths) into the router ROUTING_MODE names (auto: picked by grid size):
+
+- table:        all-pairs next-hop table, O(path length) lookups
+- astar:        plain A* on the flat-array graph, every grid above the table size
+- hierarchical: cluster-based HPA*, only when ROUTING_MODE asks for it
+"""
+from typing import Dict, Iterable, List, Optional, Union
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import ROUTING_MODE, ROUTING_CLUSTER_SIZE
+from app.models import BlockedPath, Node
+from app.routing.grid import (
+    UNREACHABLE, NORTH, SOUTH, WEST, EAST,
+    set_grid_size, get_grid_size, get_node_id, get_node_coords, is_on_grid,
+)
+from app.routing.graph import RoutingGraph, AStarRouter
+from app.routing.table import RoutingTable
+from app.routing.hierarchical import HierarchicalRouter
+
+
+# Grid size thresholds for ROUTING_MODE=auto
+TABLE_MAX_NODES = 1024            # up to 32x32: all-pairs table, plain A* above
+
+Router = Union[RoutingTable, AStarRouter, HierarchicalRouter]
+
+_router: Optional[Router] = None
+_version = 0
+_lock = threading.Lock()
+
+
+def build_router(graph: RoutingGraph, mode: str = "auto", version: int = 0) -> Router:
+    if mode == "auto":
+        mode = "table" if graph.node_count <= TABLE_MAX_NODES else "astar"
+
+    if mode == "table":
+        return RoutingTable(graph, version=version)
+    if mode == "hierarchical":
+        return HierarchicalRouter(graph, version=version, cluster_size=ROUTING_CLUSTER_SIZE)
+    if mode == "astar":
+        return AStarRouter(graph, version=version)
+    raise ValueError(f"Unknown routing mode: {mode}")
+
+
+def load_router(db: Session) -> Router:
+    """
+    (Re)build the routing graph from the nodes and blocked_paths tables.
+    Call at startup and whenever blocked paths change - bumps the version.
+    """
+    global _router, _version
+
+    max_x, max_y = db.query(func.max(Node.x), func.max(Node.y)).one()
+    if max_x is not None:
+        set_grid_size(max_x + 1, max_y + 1)
+    width, height = get_grid_size()
+
+    blocked = db.query(BlockedPath.from_node_id, BlockedPath.to_node_id).all()
+    graph = RoutingGraph(width, height, blocked)
+
+    with _lock:
+        _version += 1
+        _router = build_router(graph, ROUTING_MODE, version=_version)
+        return _router
+
+
+def get_router() -> Router:
+    if _router is None:
+        raise RuntimeError("Router not loaded - call load_router() first")
+    return _router
+
+
+def get_routing_version() -> int:
+    return _version
+
+
+def find_path(start_id: int, end_id: int) -> List[int]:
+    """Shortest path as node ids (inclusive), or [] if unreachable"""
+    return get_router().get_path(start_id, end_id)
+
+
+def find_paths_from(start_id: int, end_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """Shortest paths from one start to many ends; unreachable ends are left out"""
+    return get_router().get_paths_from(start_id, end_ids)
+
+
+def find_distances_from(start_id: int, end_ids: Iterable[int]) -> Dict[int, int]:
+    """Shortest distances from one start to many ends; unreachable ends are left out"""
+    return get_router().get_distances_from(start_id, end_ids)
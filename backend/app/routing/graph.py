@@ -0,0 +1,407 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+import heapq
+import threading
+
+from app.routing.grid import UNREACHABLE, NORTH, SOUTH, WEST, EAST
+
+
+class RoutingGraph:
+    """
+    Grid graph held as flat arrays, indexed by node id (y * width + x).
+
+    open_dirs[node] is a bitmask of the directions a bot may move in
+    (NORTH / SOUTH / WEST / EAST), with grid edges and blocked paths
+    already masked out. Searches reuse the same scratch buffers; a
+    per-search stamp marks which g-scores are valid, so nothing is
+    cleared between searches.
+
+    Not thread-safe: guard concurrent searches with a lock.
+    """
+
+    def __init__(self, width: int, height: int, blocked_pairs: Iterable[Tuple[int, int]]):
+        self.width = width
+        self.height = height
+        self.node_count = width * height
+
+        # Every interior row has the same masks, so build three rows and repeat
+        def row_masks(vertical: int) -> bytearray:
+            row = bytearray([vertical | WEST | EAST]) * width
+            row[0] &= ~WEST
+            row[-1] &= ~EAST
+            return row
+
+        if height == 1:
+            open_dirs = row_masks(0)
+        else:
+            open_dirs = row_masks(SOUTH) + row_masks(NORTH | SOUTH) * (height - 2) + row_masks(NORTH)
+
+        for from_id, to_id in blocked_pairs:
+            self._block(open_dirs, from_id, to_id)
+            self._block(open_dirs, to_id, from_id)
+        self.open_dirs = open_dirs
+
+        # Scratch buffers shared by all searches
+        self._g_score = array("i", [0]) * self.node_count
+        self._came_from = array("i", [0]) * self.node_count
+        self._stamp = array("I", [0]) * self.node_count
+        self._search_id = 0
+
+        # Total A* expansions (for benchmarks)
+        self.expansions = 0
+
+    def _block(self, open_dirs: bytearray, from_id: int, to_id: int):
+        width = self.width
+        if not (0 <= from_id < self.node_count and 0 <= to_id < self.node_count):
+            return
+        if to_id == from_id - width:
+            open_dirs[from_id] &= ~NORTH
+        elif to_id == from_id + width:
+            open_dirs[from_id] &= ~SOUTH
+        elif to_id == from_id - 1 and from_id % width != 0:
+            open_dirs[from_id] &= ~WEST
+        elif to_id == from_id + 1 and to_id % width != 0:
+            open_dirs[from_id] &= ~EAST
+        # Anything else is not a grid edge - nothing to block
+
+    def neighbors(self, node_id: int) -> List[int]:
+        mask = self.open_dirs[node_id]
+        result = []
+        if mask & NORTH:
+            result.append(node_id - self.width)
+        if mask & SOUTH:
+            result.append(node_id + self.width)
+        if mask & WEST:
+            result.append(node_id - 1)
+        if mask & EAST:
+            result.append(node_id + 1)
+        return result
+
+    def _next_search_id(self) -> int:
+        self._search_id += 1
+        if self._search_id > 0xFFFFFFFF:
+            # Stamp counter wrapped - reset the buffer once
+            self._stamp = array("I", [0]) * self.node_count
+            self._search_id = 1
+        return self._search_id
+
+    def astar(self, start_id: int, end_id: int, fence: Iterable[int] = ()) -> List[int]:
+        """
+        A* with Manhattan heuristic. Returns node ids from start to end
+        (inclusive), or [] if there is no path. The search never enters
+        the nodes in fence (marked as already reached at g = -1, so the
+        loop below needs no extra test).
+
+        Heap entries are plain ints encoding (f, -g, node) so no tuples
+        are allocated per push. Preferring the larger g among equal f keeps
+        the search heading straight for the goal on open stretches of grid.
+        """
+        width = self.width
+        node_count = self.node_count
+        open_dirs = self.open_dirs
+        g_score = self._g_score
+        came_from = self._came_from
+        stamp = self._stamp
+        search_id = self._next_search_id()
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        goal_x, goal_y = end_id % width, end_id // width
+        last = node_count - 1
+
+        for node_id in fence:
+            stamp[node_id] = search_id
+            g_score[node_id] = -1
+
+        stamp[start_id] = search_id
+        g_score[start_id] = 0
+        came_from[start_id] = start_id
+        h = abs(start_id % width - goal_x) + abs(start_id // width - goal_y)
+        open_set = [(h * node_count + last) * node_count + start_id]
+        expansions = 0
+
+        while open_set:
+            key, current = divmod(heappop(open_set), node_count)
+            f_score = key // node_count
+            cur_x, cur_y = current % width, current // width
+            g = g_score[current]
+
+            # Stale heap entry - node already reached cheaper
+            if f_score > g + abs(cur_x - goal_x) + abs(cur_y - goal_y):
+                continue
+            expansions += 1
+
+            if current == end_id:
+                self.expansions += expansions
+                path = [current]
+                while current != start_id:
+                    current = came_from[current]
+                    path.append(current)
+                path.reverse()
+                return path
+
+            mask = open_dirs[current]
+            g += 1
+
+            if mask & NORTH:
+                neighbor = current - width
+                if stamp[neighbor] != search_id or g < g_score[neighbor]:
+                    stamp[neighbor] = search_id
+                    g_score[neighbor] = g
+                    came_from[neighbor] = current
+                    h = abs(cur_x - goal_x) + abs(cur_y - 1 - goal_y)
+                    heappush(open_set, ((g + h) * node_count + last - g) * node_count + neighbor)
+            if mask & SOUTH:
+                neighbor = current + width
+                if stamp[neighbor] != search_id or g < g_score[neighbor]:
+                    stamp[neighbor] = search_id
+                    g_score[neighbor] = g
+                    came_from[neighbor] = current
+                    h = abs(cur_x - goal_x) + abs(cur_y + 1 - goal_y)
+                    heappush(open_set, ((g + h) * node_count + last - g) * node_count + neighbor)
+            if mask & WEST:
+                neighbor = current - 1
+                if stamp[neighbor] != search_id or g < g_score[neighbor]:
+                    stamp[neighbor] = search_id
+                    g_score[neighbor] = g
+                    came_from[neighbor] = current
+                    h = abs(cur_x - 1 - goal_x) + abs(cur_y - goal_y)
+                    heappush(open_set, ((g + h) * node_count + last - g) * node_count + neighbor)
+            if mask & EAST:
+                neighbor = current + 1
+                if stamp[neighbor] != search_id or g < g_score[neighbor]:
+                    stamp[neighbor] = search_id
+                    g_score[neighbor] = g
+                    came_from[neighbor] = current
+                    h = abs(cur_x + 1 - goal_x) + abs(cur_y - goal_y)
+                    heappush(open_set, ((g + h) * node_count + last - g) * node_count + neighbor)
+
+        self.expansions += expansions
+        return []
+
+    def bfs(self, source: int, distance: array, first_hop: array):
+        """
+        One-to-all BFS from source (all edges cost 1).
+        Fills distance[node] and first_hop[node] (the node after source on
+        the way to node); unreached nodes keep UNREACHABLE.
+        """
+        width = self.width
+        open_dirs = self.open_dirs
+
+        distance[source] = 0
+        first_hop[source] = source
+
+        # Seed with the direct neighbors so each reached node inherits its first hop
+        queue = self.neighbors(source)
+        for neighbor in queue:
+            distance[neighbor] = 1
+            first_hop[neighbor] = neighbor
+
+        # The queue list is only appended to; head walks forward
+        head = 0
+        while head < len(queue):
+            current = queue[head]
+            head += 1
+            step = distance[current] + 1
+            hop = first_hop[current]
+            mask = open_dirs[current]
+
+            if mask & NORTH and distance[current - width] == UNREACHABLE:
+                distance[current - width] = step
+                first_hop[current - width] = hop
+                queue.append(current - width)
+            if mask & SOUTH and distance[current + width] == UNREACHABLE:
+                distance[current + width] = step
+                first_hop[current + width] = hop
+                queue.append(current + width)
+            if mask & WEST and distance[current - 1] == UNREACHABLE:
+                distance[current - 1] = step
+                first_hop[current - 1] = hop
+                queue.append(current - 1)
+            if mask & EAST and distance[current + 1] == UNREACHABLE:
+                distance[current + 1] = step
+                first_hop[current + 1] = hop
+                queue.append(current + 1)
+
+    def paths_from(self, source: int, targets: Iterable[int]) -> Dict[int, List[int]]:
+        """
+        One-to-many BFS: shortest path from source to each target, as node
+        ids (inclusive). Unreachable targets are left out. Stops as soon as
+        every target has been reached, and uses the shared scratch buffers
+        (parent in _came_from, visited via _stamp) instead of allocating.
+        """
+        width = self.width
+        open_dirs = self.open_dirs
+        came_from = self._came_from
+        stamp = self._stamp
+        search_id = self._next_search_id()
+
+        targets = set(targets)
+        remaining = targets - {source}
+        stamp[source] = search_id
+        came_from[source] = source
+
+        queue = [source]
+        head = 0
+        while remaining and head < len(queue):
+            current = queue[head]
+            head += 1
+            mask = open_dirs[current]
+
+            if mask & NORTH and stamp[current - width] != search_id:
+                stamp[current - width] = search_id
+                came_from[current - width] = current
+                queue.append(current - width)
+                remaining.discard(current - width)
+            if mask & SOUTH and stamp[current + width] != search_id:
+                stamp[current + width] = search_id
+                came_from[current + width] = current
+                queue.append(current + width)
+                remaining.discard(current + width)
+            if mask & WEST and stamp[current - 1] != search_id:
+                stamp[current - 1] = search_id
+                came_from[current - 1] = current
+                queue.append(current - 1)
+                remaining.discard(current - 1)
+            if mask & EAST and stamp[current + 1] != search_id:
+                stamp[current + 1] = search_id
+                came_from[current + 1] = current
+                queue.append(current + 1)
+                remaining.discard(current + 1)
+
+        paths = {}
+        for target in targets:
+            if stamp[target] != search_id:
+                continue
+            path = [target]
+            node_id = target
+            while node_id != source:
+                node_id = came_from[node_id]
+                path.append(node_id)
+            path.reverse()
+            paths[target] = path
+        return paths
+
+    def distances_from(self, source: int, targets: Iterable[int]) -> Dict[int, int]:
+        """
+        One-to-many BFS like paths_from, but only the distances: kept in
+        _g_score, so no parents are followed and no paths are built.
+        """
+        width = self.width
+        open_dirs = self.open_dirs
+        g_score = self._g_score
+        stamp = self._stamp
+        search_id = self._next_search_id()
+
+        targets = set(targets)
+        remaining = targets - {source}
+        stamp[source] = search_id
+        g_score[source] = 0
+
+        queue = [source]
+        head = 0
+        while remaining and head < len(queue):
+            current = queue[head]
+            head += 1
+            step = g_score[current] + 1
+            mask = open_dirs[current]
+
+            if mask & NORTH and stamp[current - width] != search_id:
+                stamp[current - width] = search_id
+                g_score[current - width] = step
+                queue.append(current - width)
+                remaining.discard(current - width)
+            if mask & SOUTH and stamp[current + width] != search_id:
+                stamp[current + width] = search_id
+                g_score[current + width] = step
+                queue.append(current + width)
+                remaining.discard(current + width)
+            if mask & WEST and stamp[current - 1] != search_id:
+                stamp[current - 1] = search_id
+                g_score[current - 1] = step
+                queue.append(current - 1)
+                remaining.discard(current - 1)
+            if mask & EAST and stamp[current + 1] != search_id:
+                stamp[current + 1] = search_id
+                g_score[current + 1] = step
+                queue.append(current + 1)
+                remaining.discard(current + 1)
+
+        return {target: g_score[target] for target in targets if stamp[target] == search_id}
+
+    def components(self) -> array:
+        """Connected component label per node (same label = reachable)"""
+        width = self.width
+        open_dirs = self.open_dirs
+        label = array("i", [UNREACHABLE]) * self.node_count
+        next_label = 0
+
+        for root in range(self.node_count):
+            if label[root] != UNREACHABLE:
+                continue
+            label[root] = next_label
+            stack = [root]
+            while stack:
+                current = stack.pop()
+                mask = open_dirs[current]
+                if mask & NORTH and label[current - width] == UNREACHABLE:
+                    label[current - width] = next_label
+                    stack.append(current - width)
+                if mask & SOUTH and label[current + width] == UNREACHABLE:
+                    label[current + width] = next_label
+                    stack.append(current + width)
+                if mask & WEST and label[current - 1] == UNREACHABLE:
+                    label[current - 1] = next_label
+                    stack.append(current - 1)
+                if mask & EAST and label[current + 1] == UNREACHABLE:
+                    label[current + 1] = next_label
+                    stack.append(current + 1)
+            next_label += 1
+
+        return label
+
+
+class AStarRouter:
+    """
+    Plain A* on the routing graph, for grids too large for the all-pairs
+    table. Reachability is answered in O(1) from connected components.
+    """
+
+    mode = "astar"
+
+    def __init__(self, graph: RoutingGraph, version: int = 0):
+        self.graph = graph
+        self.version = version
+        self.component = graph.components()
+        # The graph's scratch buffers are shared by all searches
+        self._search_lock = threading.Lock()
+
+    def is_reachable(self, start_id: int, end_id: int) -> bool:
+        return self.component[start_id] == self.component[end_id]
+
+    def get_path(self, start_id: int, end_id: int) -> List[int]:
+        """Node ids from start to end (inclusive), or [] if unreachable"""
+        if not self.is_reachable(start_id, end_id):
+            return []
+        with self._search_lock:
+            return self.graph.astar(start_id, end_id)
+
+    def get_distance(self, start_id: int, end_id: int) -> int:
+        path = self.get_path(start_id, end_id)
+        return len(path) - 1 if path else UNREACHABLE
+
+    def get_paths_from(self, start_id: int, end_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Paths from one start to many ends in a single search; unreachable ends are left out"""
+        reachable = [end_id for end_id in end_ids if self.is_reachable(start_id, end_id)]
+        if not reachable:
+            return {}
+        with self._search_lock:
+            return self.graph.paths_from(start_id, reachable)
+
+    def get_distances_from(self, start_id: int, end_ids: Iterable[int]) -> Dict[int, int]:
+        """Distances from one start to many ends in a single search; unreachable ends are left out"""
+        reachable = [end_id for end_id in end_ids if self.is_reachable(start_id, end_id)]
+        if not reachable:
+            return {}
+        with self._search_lock:
+            return self.graph.distances_from(start_id, reachable)
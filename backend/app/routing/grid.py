@@ -0,0 +1,43 @@
+from typing import Tuple
+
+from app.config import GRID_WIDTH, GRID_HEIGHT
+
+
+# Marker for "no path" in distance tables
+UNREACHABLE = -1
+
+# Neighbor bitmask: one bit per open direction
+NORTH = 1  # y - 1
+SOUTH = 2  # y + 1
+WEST = 4   # x - 1
+EAST = 8   # x + 1
+
+# Current grid dimensions (node id = y * width + x).
+# Replaced by set_grid_size() with the size stored in the nodes table.
+_width = GRID_WIDTH
+_height = GRID_HEIGHT
+
+
+def set_grid_size(width: int, height: int):
+    global _width, _height
+    _width = width
+    _height = height
+
+
+def get_grid_size() -> Tuple[int, int]:
+    """(width, height) of the loaded map"""
+    return (_width, _height)
+
+
+def get_node_id(x: int, y: int) -> int:
+    """Convert (x, y) to node ID"""
+    return y * _width + x
+
+
+def get_node_coords(node_id: int) -> Tuple[int, int]:
+    """Convert node ID to (x, y) coordinates"""
+    return (node_id % _width, node_id // _width)
+
+
+def is_on_grid(x: int, y: int) -> bool:
+    return 0 <= x < _width and 0 <= y < _height
@@ -0,0 +1,71 @@
+from array import array
+from typing import Dict, Iterable, List
+
+from app.routing.graph import RoutingGraph
+from app.routing.grid import UNREACHABLE
+
+
+class RoutingTable:
+    """
+    All-pairs shortest paths for the grid.
+
+    Built once from the routing graph with a BFS from every node.
+    For an 81-node grid both tables hold 6561 entries.
+
+    distance[src * N + dst]  -> number of steps, or UNREACHABLE
+    next_hop[src * N + dst]  -> first node after src on the way to dst
+    """
+
+    mode = "table"
+
+    def __init__(self, graph: RoutingGraph, version: int = 0):
+        self.graph = graph
+        self.version = version
+        self.node_count = graph.node_count
+
+        node_count = self.node_count
+        self.distance = array("i", [UNREACHABLE]) * (node_count * node_count)
+        self.next_hop = array("i", [UNREACHABLE]) * (node_count * node_count)
+
+        for source in range(node_count):
+            distance = array("i", [UNREACHABLE]) * node_count
+            first_hop = array("i", [UNREACHABLE]) * node_count
+            graph.bfs(source, distance, first_hop)
+            base = source * node_count
+            self.distance[base:base + node_count] = distance
+            self.next_hop[base:base + node_count] = first_hop
+
+    def is_reachable(self, start_id: int, end_id: int) -> bool:
+        return self.distance[start_id * self.node_count + end_id] != UNREACHABLE
+
+    def get_distance(self, start_id: int, end_id: int) -> int:
+        return self.distance[start_id * self.node_count + end_id]
+
+    def get_path(self, start_id: int, end_id: int) -> List[int]:
+        """Node ids from start to end (inclusive), or [] if unreachable"""
+        if not self.is_reachable(start_id, end_id):
+            return []
+
+        path = [start_id]
+        current = start_id
+        while current != end_id:
+            current = self.next_hop[current * self.node_count + end_id]
+            path.append(current)
+        return path
+
+    def get_paths_from(self, start_id: int, end_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Paths from one start to many ends; unreachable ends are left out"""
+        return {
+            end_id: self.get_path(start_id, end_id)
+            for end_id in end_ids
+            if self.is_reachable(start_id, end_id)
+        }
+
+    def get_distances_from(self, start_id: int, end_ids: Iterable[int]) -> Dict[int, int]:
+        """Distances from one start to many ends; unreachable ends are left out"""
+        base = start_id * self.node_count
+        return {
+            end_id: self.distance[base + end_id]
+            for end_id in end_ids
+            if self.distance[base + end_id] != UNREACHABLE
+        }
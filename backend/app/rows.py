@@ -0,0 +1,107 @@
+"""
+Lightweight row types for the read endpoints.
+
+Each is a slotted dataclass filled straight from a column-only SELECT
+(COLUMNS, in field order), so no ORM instances, identity map entries or
+attribute instrumentation are involved - the SELECT runs on the
+session's connection, past the ORM's execution layer. Endpoints return them through
+ORJSONResponse, which serializes dataclasses, enums and datetimes
+natively instead of walking them with jsonable_encoder.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, ClassVar, Dict, List, Optional, Type, TypeVar
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from app.models import Bot, BotStatus, Node, Order, OrderStatus, Restaurant, RestaurantType
+
+RowType = TypeVar("RowType")
+
+
+@dataclass(slots=True)
+class BotRow:
+    id: int
+    name: str
+    status: Optional[BotStatus]
+    current_x: int
+    current_y: int
+    current_orders_count: int
+    total_deliveries: int
+    created_at: Optional[datetime]
+
+    COLUMNS: ClassVar[tuple] = (
+        Bot.id, Bot.name, Bot.status, Bot.current_x, Bot.current_y,
+        Bot.current_orders_count, Bot.total_deliveries, Bot.created_at
+    )
+
+
+@dataclass(slots=True)
+class OrderRow:
+    id: int
+    customer_name: str
+    customer_address: str
+    pickup_node_id: int
+    delivery_node_id: int
+    restaurant_id: int
+    bot_id: Optional[int]
+    status: Optional[OrderStatus]
+    estimated_time: Optional[int]
+    route_distance: Optional[float]
+    created_at: Optional[datetime]
+    assigned_at: Optional[datetime]
+    delivered_at: Optional[datetime]
+
+    COLUMNS: ClassVar[tuple] = (
+        Order.id, Order.customer_name, Order.customer_address, Order.pickup_node_id,
+        Order.delivery_node_id, Order.restaurant_id, Order.bot_id, Order.status,
+        Order.estimated_time, Order.route_distance, Order.created_at, Order.assigned_at,
+        Order.delivered_at
+    )
+
+
+@dataclass(slots=True)
+class RestaurantRow:
+    id: int
+    name: str
+    restaurant_type: RestaurantType
+    node_id: int
+    is_active: Optional[bool]
+    created_at: Optional[datetime]
+
+    COLUMNS: ClassVar[tuple] = (
+        Restaurant.id, Restaurant.name, Restaurant.restaurant_type, Restaurant.node_id,
+        Restaurant.is_active, Restaurant.created_at
+    )
+
+
+@dataclass(slots=True)
+class NodeRow:
+    id: int
+    x: int
+    y: int
+    is_delivery_point: Optional[bool]
+    is_restaurant: Optional[bool]
+    restaurant_type: Optional[str]
+
+    COLUMNS: ClassVar[tuple] = (
+        Node.id, Node.x, Node.y, Node.is_delivery_point, Node.is_restaurant, Node.restaurant_type
+    )
+
+
+def select_rows(row_type: Type[RowType]) -> Select:
+    return select(*row_type.COLUMNS)
+
+
+def fetch_rows(
+    db: Session, row_type: Type[RowType], statement: Select, params: Optional[Dict[str, Any]] = None
+) -> List[RowType]:
+    return [row_type(*row) for row in db.connection().execute(statement, params)]
+
+
+def fetch_row(
+    db: Session, row_type: Type[RowType], statement: Select, params: Optional[Dict[str, Any]] = None
+) -> Optional[RowType]:
+    row = db.connection().execute(statement, params).first()
+    return row_type(*row) if row else None
@@ -1,7 +1,13 @@
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
+from app.config import FLEET_SIZE, GRID_WIDTH, GRID_HEIGHT
 from app.models import Node, BlockedPath, Bot, Restaurant, BotStatus, RestaurantType
 
 
+# The sample layout below is drawn on a 9x9 grid (node id = y * 9 + x).
+# On a larger map it keeps its coordinates, in the top-left corner.
+LAYOUT_SIZE = 9
+
 # blocked paths from BlockedPaths.csv
 BLOCKED_PATHS = [
     (4, 12), (6, 14), (8, 16), (9, 17), (10, 18),
@@ -23,53 +29,58 @@ RESTAURANTS = [
 # delivery points (houses) - node IDs
 DELIVERY_POINTS = [0, 1, 5, 8, 18, 25, 57, 63, 71]
 
-# bot names
-BOT_NAMES = ["Bot 1", "Bot 2", "Bot 3", "Bot 4", "Bot 5"]
+# bots are named "Bot 1" ... "Bot {FLEET_SIZE}"
+def bot_name(number: int) -> str:
+    return f"Bot {number}"
+
 
+def layout_node_id(layout_id: int, width: int) -> int:
+    """Map a node id of the 9x9 sample layout onto a grid of the given width"""
+    return (layout_id // LAYOUT_SIZE) * width + layout_id % LAYOUT_SIZE
 
-def seed_database(db: Session):
+
+def seed_database(db: Session, width: int = GRID_WIDTH, height: int = GRID_HEIGHT):
 
     # check if already seeded
     if db.query(Node).count() > 0:
         print("Database already has data. Skipping seed.")
         return
     
+    if width < LAYOUT_SIZE or height < LAYOUT_SIZE:
+        raise ValueError(f"Grid must be at least {LAYOUT_SIZE}x{LAYOUT_SIZE}")
+    
     print("Seeding database...")
     
-    # === 1: create 81 nodes (9x9 grid) ===
-    print("Creating nodes...")
-    for y in range(9):
-        for x in range(9):
-            node_id = y * 9 + x  # Calculate ID from position
-            
-            # Check if this node is a delivery point
-            is_delivery = node_id in DELIVERY_POINTS
-            
-            # Check if this node has a restaurant
-            restaurant_info = next(
-                (r for r in RESTAURANTS if r[0] == node_id), 
-                None
-            )
-            is_restaurant = restaurant_info is not None
-            restaurant_type = restaurant_info[1].value if restaurant_info else None
-            
-            node = Node(
-                id=node_id,
-                x=x,
-                y=y,
-                is_delivery_point=is_delivery,
-                is_restaurant=is_restaurant,
-                restaurant_type=restaurant_type
-            )
-            db.add(node)
+    delivery_points = {layout_node_id(n, width) for n in DELIVERY_POINTS}
+    restaurant_types = {layout_node_id(n, width): rtype.value for n, rtype, _ in RESTAURANTS}
+    
+    # === 1: create nodes (width x height grid) ===
+    # Inserted one row of the grid at a time - city-scale maps have millions of nodes
+    print(f"Creating {width}x{height} nodes...")
+    for y in range(height):
+        rows = []
+        for x in range(width):
+            node_id = y * width + x  # Calculate ID from position
+            rows.append({
+                "id": node_id,
+                "x": x,
+                "y": y,
+                "is_delivery_point": node_id in delivery_points,
+                "is_restaurant": node_id in restaurant_types,
+                "restaurant_type": restaurant_types.get(node_id)
+            })
+        db.execute(insert(Node), rows)
     
     db.commit()
-    print(f"Created 81 nodes!")
+    print(f"Created {width * height} nodes!")
     
     # === 2: create blocked paths ===
     print("Creating blocked paths...")
     for from_id, to_id in BLOCKED_PATHS:
-        blocked = BlockedPath(from_node_id=from_id, to_node_id=to_id)
+        blocked = BlockedPath(
+            from_node_id=layout_node_id(from_id, width),
+            to_node_id=layout_node_id(to_id, width)
+        )
         db.add(blocked)
     
     db.commit()
@@ -81,7 +92,7 @@ def seed_database(db: Session):
         restaurant = Restaurant(
             name=name,
             restaurant_type=rtype,
-            node_id=node_id,
+            node_id=layout_node_id(node_id, width),
             is_active=True
         )
         db.add(restaurant)
@@ -89,20 +100,32 @@ def seed_database(db: Session):
     db.commit()
     print(f"Created {len(RESTAURANTS)} restaurants!")
     
-    # === 4: create 5 bots ===
-    print("Creating bots...")
-    for name in BOT_NAMES:
-        bot = Bot(
-            name=name,
-            status=BotStatus.AVAILABLE,
-            current_x=4,  # Start at center
-            current_y=4,
-            current_orders_count=0,
-            total_deliveries=0
-        )
-        db.add(bot)
-    
-    db.commit()
-    print(f"Created {len(BOT_NAMES)} bots!")
+    # === 4: create the fleet ===
+    seed_fleet(db)
     
     print("Database seeding complete!")
+
+
+def seed_fleet(db: Session, size: int = FLEET_SIZE):
+    """Add bots until the fleet has `size` of them, at the center of the map"""
+    count = db.query(func.count(Bot.id)).scalar()
+    if count >= size:
+        return
+    
+    print(f"Creating {size - count} bots...")
+    node = db.query(func.max(Node.x), func.max(Node.y)).one()
+    width, height = (node[0] or 0) + 1, (node[1] or 0) + 1
+    db.execute(insert(Bot), [
+        {
+            "name": bot_name(number),
+            "status": BotStatus.AVAILABLE,
+            "current_x": width // 2,  # Start at center
+            "current_y": height // 2,
+            "current_orders_count": 0,
+            "total_deliveries": 0
+        }
+        for number in range(count + 1, size + 1)
+    ])
+    
+    db.commit()
+    print(f"Fleet has {size} bots!")
@@ -0,0 +1,128 @@
+"""
+Fleet sizing sweeps: run the headless simulation over a grid of
+scenarios (fleet size x bot capacity x order volume) on a process pool
+and compare the results in one table.
+
+Every worker process builds its own copy of the seeded map, so runs
+share nothing and use every core.
+
+Run from the backend directory:
+    python -m app.sweep --bots 3,5,8 --capacity 2,3,4 --orders 50000,100000
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional
+
+from app.headless import HeadlessConfig, HeadlessReport, run_headless
+
+
+def build_scenarios(
+    fleet_sizes: Iterable[int],
+    bot_capacities: Iterable[int],
+    order_counts: Iterable[int],
+    base: Optional[HeadlessConfig] = None
+) -> List[HeadlessConfig]:
+    """Every combination of the given values on top of base"""
+    base = base or HeadlessConfig()
+    return [
+        replace(base, fleet_size=bots, bot_capacity=capacity, orders=orders)
+        for bots, capacity, orders in itertools.product(fleet_sizes, bot_capacities, order_counts)
+    ]
+
+
+def run_sweep(scenarios: List[HeadlessConfig], workers: Optional[int] = None) -> List[HeadlessReport]:
+    """Run every scenario on a process pool; reports come back in scenario order"""
+    if not scenarios:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(scenarios))
+    # spawn, not fork: the API process has threads (threadpool, simulator)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(run_headless, scenarios))
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def summarize(report: HeadlessReport) -> Dict:
+    """One comparison-table row"""
+    config = report.config
+    delivery = report.delivery_seconds
+    return {
+        "bots": config.fleet_size,
+        "capacity": config.bot_capacity,
+        "orders": config.orders,
+        "orders_per_hour": round(config.orders / (config.duration_seconds / 3600), 1),
+        "rate_limited": report.rate_limited,
+        "queued": report.queued,
+        "unassigned": report.unassigned,
+        "delivered": report.delivered,
+        "deliveries_per_hour": round(report.deliveries_per_hour, 1),
+        "p50_seconds": _rounded(delivery.get("p50")),
+        "p90_seconds": _rounded(delivery.get("p90")),
+        "p99_seconds": _rounded(delivery.get("p99")),
+        "utilization": round(report.utilization, 4)
+    }
+
+
+def format_table(rows: List[Dict]) -> str:
+    if not rows:
+        return "(no scenarios)"
+    columns = list(rows[0].keys())
+
+    def cell(value) -> str:
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.1f}" if value >= 1 else f"{value:.3f}"
+        return str(value)
+
+    cells = [[cell(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for r in cells:
+        lines.append("  ".join(v.rjust(w) for v, w in zip(r, widths)))
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    defaults = HeadlessConfig()
+    parser = argparse.ArgumentParser(description="Fleet sizing sweep over the headless simulation")
+    parser.add_argument("--bots", type=_int_list, default=[defaults.fleet_size], help="comma separated fleet sizes")
+    parser.add_argument("--capacity", type=_int_list, default=[defaults.bot_capacity], help="comma separated bot capacities")
+    parser.add_argument("--orders", type=_int_list, default=[defaults.orders], help="comma separated order counts per run")
+    parser.add_argument("--hours", type=float, default=defaults.duration_seconds / 3600)
+    parser.add_argument("--limit", type=int, default=defaults.restaurant_order_limit, help="orders per restaurant per window")
+    parser.add_argument("--window", type=float, default=defaults.restaurant_order_window, help="rate limit window in seconds")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    args = parser.parse_args()
+
+    base = replace(
+        defaults,
+        duration_seconds=args.hours * 3600,
+        restaurant_order_limit=args.limit,
+        restaurant_order_window=args.window,
+        seed=args.seed
+    )
+    scenarios = build_scenarios(args.bots, args.capacity, args.orders, base)
+
+    started = time.perf_counter()
+    reports = run_sweep(scenarios, args.workers)
+    print(format_table([summarize(r) for r in reports]))
+    print(f"\n{len(scenarios)} scenarios in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Fleet sizing sweeps requested over the API, run in the background.
+
+POST /api/simulation/sweep only queues the sweep and answers with a job
+id; its scenarios run on one process pool of SWEEP_WORKERS processes
+shared by every sweep, so concurrent sweeps queue behind each other
+instead of each taking every core from the API. GET
+/api/simulation/sweep/{job_id} reports progress, and the comparison
+table once every scenario is done.
+
+Jobs live in memory; the newest MAX_FINISHED_JOBS finished ones are kept.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Dict, List, Optional
+
+from app.config import SWEEP_WORKERS
+from app.headless import HeadlessConfig, HeadlessReport, run_headless
+from app.sweep import summarize
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Sweeps queued or running at once; more are refused
+MAX_ACTIVE_JOBS = 4
+MAX_FINISHED_JOBS = 20
+
+
+@dataclass
+class SweepJob:
+    id: int
+    scenarios: List[HeadlessConfig]
+    finished_as: Optional[str] = None  # DONE or FAILED
+    submitted: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    futures: List[Future] = field(default_factory=list)
+    reports: Dict[int, HeadlessReport] = field(default_factory=dict)  # Scenario index -> report
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished_as:
+            return self.finished_as
+        return RUNNING if any(f.running() or f.done() for f in self.futures) else QUEUED
+
+    def as_dict(self) -> Dict:
+        job = {
+            "job_id": self.id,
+            "status": self.status,
+            "count": len(self.scenarios),
+            "completed": len(self.reports)
+        }
+        if self.status == DONE:
+            job["scenarios"] = [summarize(self.reports[i]) for i in range(len(self.scenarios))]
+            # Time in the queue included
+            job["wall_seconds"] = round(self.finished - self.submitted, 2)
+        if self.error:
+            job["error"] = self.error
+        return job
+
+
+class SweepJobs:
+    def __init__(self, workers: int = SWEEP_WORKERS):
+        self.workers = max(1, workers)
+        self._jobs: Dict[int, SweepJob] = {}
+        self._ids = count(1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.RLock()  # Callbacks of already finished futures run inline
+
+    def active(self) -> int:
+        return sum(not job.finished_as for job in self._jobs.values())
+
+    def submit(self, scenarios: List[HeadlessConfig]) -> Optional[SweepJob]:
+        """Queue the scenarios on the shared pool. None if MAX_ACTIVE_JOBS sweeps are already waiting."""
+        with self._lock:
+            if self.active() >= MAX_ACTIVE_JOBS:
+                return None
+            if self._pool is None:
+                # spawn, not fork: the API process has threads (threadpool, simulator)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            job = SweepJob(next(self._ids), scenarios)
+            self._jobs[job.id] = job
+            self._forget_finished()
+            for i, scenario in enumerate(scenarios):
+                job.futures.append(self._pool.submit(run_headless, scenario))
+            for i, future in enumerate(job.futures):
+                future.add_done_callback(lambda f, i=i: self._scenario_done(job, i, f))
+        return job
+
+    def get(self, job_id: int) -> Optional[SweepJob]:
+        return self._jobs.get(job_id)
+
+    def _scenario_done(self, job: SweepJob, i: int, future: Future):
+        with self._lock:
+            if job.finished_as:
+                return
+            if future.cancelled():
+                job.finished_as, job.error = FAILED, "cancelled"
+            elif future.exception() is not None:
+                job.finished_as, job.error = FAILED, repr(future.exception())
+            else:
+                job.reports[i] = future.result()
+                if len(job.reports) == len(job.scenarios):
+                    job.finished_as = DONE
+            if job.finished_as:
+                job.finished = time.time()
+                print(f"📊 Sweep #{job.id} {job.status}: {len(job.reports)}/{len(job.scenarios)} scenarios")
+
+    def _forget_finished(self):
+        finished = [job.id for job in self._jobs.values() if job.finished_as]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        """Stop the pool; queued scenarios are dropped"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+sweep_jobs = SweepJobs()
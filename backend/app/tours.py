@@ -0,0 +1,189 @@
+"""
+Multi-stop tour planning for a bot carrying several orders.
+
+A tour visits every pickup and delivery of the bot's orders, each
+pickup before its delivery. Up to EXACT_MAX_ORDERS orders the best
+sequence is found exactly (branch and bound over the valid orderings,
+90 of them for 3 orders); beyond that, cheapest insertion is used.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.routing import UNREACHABLE, find_path, get_router
+
+
+# Largest number of orders searched exactly (4 orders: 2520 orderings)
+EXACT_MAX_ORDERS = 4
+
+PICKUP = "pickup"
+DELIVERY = "delivery"
+
+
+@dataclass
+class TourOrder:
+    order_id: int
+    pickup_node_id: int
+    delivery_node_id: int
+    picked_up: bool = False  # Already on board - only the delivery is left
+
+
+@dataclass
+class TourStop:
+    order_id: int
+    node_id: int
+    action: str  # PICKUP or DELIVERY
+
+
+@dataclass
+class Tour:
+    start_node_id: int
+    stops: List[TourStop] = field(default_factory=list)
+    distance: int = 0  # Total grid steps, or UNREACHABLE
+
+    def path(self) -> List[int]:
+        """Node ids of the whole tour, start included"""
+        nodes = [self.start_node_id]
+        for stop in self.stops:
+            nodes.extend(find_path(nodes[-1], stop.node_id)[1:])
+        return nodes
+
+
+class _DistanceCache:
+    """Memoized router distances for one planning call"""
+
+    def __init__(self, distance: Optional[Callable[[int, int], int]] = None):
+        self._distance = distance or get_router().get_distance
+        self._cache: Dict[Tuple[int, int], float] = {}
+
+    def __call__(self, start_id: int, end_id: int) -> float:
+        key = (start_id, end_id)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._distance(start_id, end_id)
+            if result == UNREACHABLE:
+                result = float("inf")
+            self._cache[key] = result
+        return result
+
+
+def _stops_for(orders: List[TourOrder]) -> List[TourStop]:
+    stops = []
+    for order in orders:
+        if not order.picked_up:
+            stops.append(TourStop(order.order_id, order.pickup_node_id, PICKUP))
+        stops.append(TourStop(order.order_id, order.delivery_node_id, DELIVERY))
+    return stops
+
+
+def tour_distance(start_node_id: int, stops: List[TourStop], distance: Callable[[int, int], float]) -> float:
+    total = 0
+    position = start_node_id
+    for stop in stops:
+        total += distance(position, stop.node_id)
+        position = stop.node_id
+    return total
+
+
+def _plan_exact(start_node_id: int, stops: List[TourStop], distance: Callable[[int, int], float]) -> Tuple[List[TourStop], float]:
+    # Stops are searched by index, the ones left to visit as a bit mask
+    count = len(stops)
+    nodes = [stop.node_id for stop in stops]
+    origins = nodes + [start_node_id]          # Index count: the start
+    # The pickup stop a delivery has to follow, -1 if the order is on board
+    pickups = {stop.order_id: i for i, stop in enumerate(stops) if stop.action == PICKUP}
+    needs = [pickups.get(stop.order_id, -1) if stop.action == DELIVERY else -1 for stop in stops]
+    # Leg lengths from each origin to each stop, filled in on first use
+    legs: List[List[Optional[float]]] = [[None] * count for _ in origins]
+
+    best_order: List[int] = []
+    best_cost = float("inf")
+    sequence: List[int] = []
+
+    def search(at: int, cost: float, remaining: int):
+        nonlocal best_order, best_cost
+        if cost >= best_cost:
+            return
+        if not remaining:
+            best_order, best_cost = list(sequence), cost
+            return
+
+        # Every remaining stop is still to be visited, so the farthest one
+        # bounds the rest of the tour from below
+        row = legs[at]
+        farthest = 0
+        for i in range(count):
+            if remaining >> i & 1:
+                leg = row[i]
+                if leg is None:
+                    leg = row[i] = distance(origins[at], nodes[i])
+                if leg > farthest:
+                    farthest = leg
+        if cost + farthest >= best_cost:
+            return
+
+        for i in range(count):
+            # A delivery can only follow its pickup
+            if not remaining >> i & 1 or (needs[i] >= 0 and remaining >> needs[i] & 1):
+                continue
+            sequence.append(i)
+            search(i, cost + row[i], remaining & ~(1 << i))
+            sequence.pop()
+
+    search(count, 0, (1 << count) - 1)
+
+    if not best_order:
+        # Every ordering hits an unreachable leg
+        return stops, float("inf")
+    return [stops[i] for i in best_order], best_cost
+
+
+def _plan_insertion(start_node_id: int, orders: List[TourOrder], distance: Callable[[int, int], float]) -> Tuple[List[TourStop], float]:
+    """Cheapest insertion: add orders one by one at their cheapest positions"""
+    sequence: List[TourStop] = []
+
+    for order in orders:
+        delivery = TourStop(order.order_id, order.delivery_node_id, DELIVERY)
+        best = None
+        if order.picked_up:
+            for j in range(len(sequence) + 1):
+                candidate = sequence[:j] + [delivery] + sequence[j:]
+                cost = tour_distance(start_node_id, candidate, distance)
+                if best is None or cost < best[0]:
+                    best = (cost, candidate)
+        else:
+            pickup = TourStop(order.order_id, order.pickup_node_id, PICKUP)
+            for i in range(len(sequence) + 1):
+                with_pickup = sequence[:i] + [pickup] + sequence[i:]
+                for j in range(i + 1, len(with_pickup) + 1):
+                    candidate = with_pickup[:j] + [delivery] + with_pickup[j:]
+                    cost = tour_distance(start_node_id, candidate, distance)
+                    if best is None or cost < best[0]:
+                        best = (cost, candidate)
+        sequence = best[1]
+
+    return sequence, tour_distance(start_node_id, sequence, distance)
+
+
+def plan_tour(
+    start_node_id: int,
+    orders: List[TourOrder],
+    distance: Optional[Callable[[int, int], int]] = None
+) -> Tour:
+    """
+    Shortest visit sequence for all pickups and deliveries of orders,
+    starting at start_node_id. distance defaults to the shared router.
+    """
+    if not orders:
+        return Tour(start_node_id=start_node_id)
+
+    cached_distance = _DistanceCache(distance)
+    if len(orders) <= EXACT_MAX_ORDERS:
+        stops, cost = _plan_exact(start_node_id, _stops_for(orders), cached_distance)
+    else:
+        stops, cost = _plan_insertion(start_node_id, orders, cached_distance)
+
+    return Tour(
+        start_node_id=start_node_id,
+        stops=stops,
+        distance=UNREACHABLE if cost == float("inf") else int(cost)
+    )
@@ -0,0 +1,97 @@
+"""
+Bot trajectories: where a simulated bot is going to be, and when.
+
+Instead of one position per bot per tick, the fleet simulator publishes a
+bot's planned path once, every waypoint with the time (epoch seconds) the
+bot is due there, and clients interpolate between waypoints. A pickup is
+the same waypoint twice: on arrival and on departure.
+
+A bot gets a new trajectory only when it deviates from the one it has:
+  - it re-plans onto a different route (new order, cancelled order)
+  - it steps somewhere the trajectory does not go
+  - it is more than TRAJECTORY_TOLERANCE_SECONDS early or late
+  - it stops (no trajectory: idle at its position)
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from app.plans import RoutePlan
+from app.routing import get_node_coords
+from app.tours import PICKUP
+
+
+@dataclass
+class Trajectory:
+    nodes: List[int]
+    times: List[float]      # Epoch seconds the bot is due at each node
+    index: int = 0          # Waypoint the bot is at
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        return get_node_coords(self.nodes[0])
+
+    def points(self) -> List[List[float]]:
+        """[x, y, time] per waypoint"""
+        points = []
+        for node_id, due in zip(self.nodes, self.times):
+            x, y = get_node_coords(node_id)
+            points.append([x, y, round(due, 3)])
+        return points
+
+    def follow(self, node_id: int, now: float, tolerance: float) -> bool:
+        """The bot stepped to node_id. False if the trajectory did not say so."""
+        i = self.index + 1
+        # Leaving a pickup: past its departure waypoint
+        while i < len(self.nodes) and self.nodes[i] == self.nodes[self.index]:
+            i += 1
+        if i >= len(self.nodes) or self.nodes[i] != node_id or abs(self.times[i] - now) > tolerance:
+            return False
+        self.index = i
+        return True
+
+    def continues_as(self, other: "Trajectory", tolerance: float) -> bool:
+        """other, planned from the bot's position, is what is left of this one"""
+        i = self.index
+        while True:
+            rest = len(self.nodes) - i
+            if rest == len(other.nodes) and self.nodes[i:] == other.nodes and all(
+                abs(due - other_due) <= tolerance for due, other_due in zip(self.times[i:], other.times)
+            ):
+                return True
+            # Waiting at a pickup: the plan may start from its departure
+            if i + 1 < len(self.nodes) and self.nodes[i + 1] == self.nodes[i]:
+                i += 1
+                continue
+            return False
+
+
+def build_trajectory(
+    nodes: Sequence[int],
+    start: float,
+    step: float,
+    dwell: float,
+    pickups: Dict[int, int]
+) -> Trajectory:
+    """nodes from the bot's position on; pickups: index in nodes -> pickups made there"""
+    trajectory = Trajectory([], [])
+    due = start
+    for i, node_id in enumerate(nodes):
+        if i:
+            due += step
+        trajectory.nodes.append(node_id)
+        trajectory.times.append(due)
+        for _ in range(pickups.get(i, 0)):
+            due += dwell
+            trajectory.nodes.append(node_id)
+            trajectory.times.append(due)
+    return trajectory
+
+
+def plan_trajectory(plan: RoutePlan, start: float, step: float, dwell: float) -> Trajectory:
+    """The rest of a route plan, from the bot's position at start"""
+    pickups: Dict[int, int] = {}
+    for i in range(plan.next_stop, len(plan.tour.stops)):
+        if plan.tour.stops[i].action == PICKUP:
+            offset = plan.stop_offsets[i] - plan.progress
+            pickups[offset] = pickups.get(offset, 0) + 1
+    return build_trajectory(plan.path[plan.progress:], start, step, dwell, pickups)
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark: k nearest bots with spare capacity, bot index vs full scan.
+
+The scan is what finding a bot used to cost: look at every bot and keep
+the k closest. Bots are spread at random over the map, a share of them
+full or offline; every query is from a random point.
+
+Run from the backend directory:
+    python -m benchmarks.bench_bot_index
+    python -m benchmarks.bench_bot_index --bots 1000,10000,100000 --size 2000
+"""
+import argparse
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.bot_index import BotIndex, IndexedBot  # noqa: E402
+from app.config import ASSIGN_CANDIDATES, BOT_CAPACITY  # noqa: E402
+from app.models import BotStatus  # noqa: E402
+
+
+def build(bots: int, size: int, rng: random.Random) -> BotIndex:
+    index = BotIndex()
+    for bot_id in range(1, bots + 1):
+        status = BotStatus.OFFLINE if rng.random() < 0.1 else BotStatus.BUSY
+        bot = IndexedBot(rng.randrange(size), rng.randrange(size), status, rng.randrange(BOT_CAPACITY + 1))
+        index._bots[bot_id] = bot
+        index._file(bot_id, bot)
+    index.loaded = True
+    return index
+
+
+def scan(index: BotIndex, x: int, y: int, k: int) -> List[Tuple[int, int]]:
+    nearest = heapq.nsmallest(k, (
+        (abs(bot.x - x) + abs(bot.y - y), bot_id)
+        for bot_id, bot in index._bots.items()
+        if bot.accepting
+    ))
+    return [(bot_id, distance) for distance, bot_id in nearest]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", default="100,1000,10000", help="comma separated fleet sizes")
+    parser.add_argument("--size", type=int, default=1000, help="map width and height")
+    parser.add_argument("-k", type=int, default=ASSIGN_CANDIDATES)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.size}x{args.size} map, k={args.k}, {args.queries} queries per fleet size")
+    print(f"{'bots':>8}{'accepting':>11}{'index us':>10}{'scan us':>10}{'speedup':>9}{'move us':>9}")
+    for bots in (int(n) for n in args.bots.split(",")):
+        rng = random.Random(bots)
+        index = build(bots, args.size, rng)
+        points = [(rng.randrange(args.size), rng.randrange(args.size)) for _ in range(args.queries)]
+
+        # Same answers, up to ties in distance
+        for x, y in points[:50]:
+            assert [d for _, d in index.nearest(x, y, args.k)] == [d for _, d in scan(index, x, y, args.k)]
+
+        start = time.perf_counter()
+        for x, y in points:
+            index.nearest(x, y, args.k)
+        index_us = (time.perf_counter() - start) * 1e6 / args.queries
+
+        start = time.perf_counter()
+        for x, y in points:
+            scan(index, x, y, args.k)
+        scan_us = (time.perf_counter() - start) * 1e6 / args.queries
+
+        moves = [(rng.randrange(1, bots + 1), x, y) for x, y in points]
+        start = time.perf_counter()
+        for bot_id, x, y in moves:
+            index.move(bot_id, x, y)
+        move_us = (time.perf_counter() - start) * 1e6 / len(moves)
+
+        print(f"{bots:>8}{len(index):>11}{index_us:>10.1f}{scan_us:>10.1f}{scan_us / index_us:>8.1f}x{move_us:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
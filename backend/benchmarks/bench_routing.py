@@ -0,0 +1,220 @@
+"""
+Micro-benchmark: A* expansions per second, old router code vs app.routing.
+
+Run from the backend directory:
+    python -m benchmarks.bench_routing            # seeded + 100x100 maps
+    python -m benchmarks.bench_routing --large    # also A* vs hierarchical on 1000x1000
+
+The "legacy" functions below are the A* implementations that used to live
+in routers/map.py (node-id based) and routers/simulation.py (tuple based),
+with the grid size made a parameter and an expansion counter added.
+"""
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.routing import RoutingGraph, HierarchicalRouter  # noqa: E402
+from app.seed_data import BLOCKED_PATHS  # noqa: E402
+
+
+# ============ Legacy implementations ============
+
+def legacy_astar_nodes(size: int, blocked_set: Set[Tuple[int, int]], start_id: int, end_id: int, stats: Dict[str, int]) -> List[int]:
+    """Copy of the old routers/map.py::calculate_route search"""
+
+    def get_node_id(x: int, y: int) -> int:
+        return y * size + x
+
+    def get_coords(node_id: int) -> Tuple[int, int]:
+        return (node_id % size, node_id // size)
+
+    def get_neighbors(node_id: int) -> List[int]:
+        x, y = get_coords(node_id)
+        neighbors = []
+        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+            new_x, new_y = x + dx, y + dy
+            if 0 <= new_x < size and 0 <= new_y < size:
+                neighbor_id = get_node_id(new_x, new_y)
+                if (node_id, neighbor_id) not in blocked_set:
+                    neighbors.append(neighbor_id)
+        return neighbors
+
+    def heuristic(node_id: int, goal_id: int) -> int:
+        x1, y1 = get_coords(node_id)
+        x2, y2 = get_coords(goal_id)
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    open_set = [(0, start_id)]
+    came_from: Dict[int, int] = {}
+    g_score: Dict[int, float] = {start_id: 0}
+
+    while open_set:
+        _, current = heapq.heappop(open_set)
+        stats["expansions"] += 1
+
+        if current == end_id:
+            path = [current]
+            while current in came_from:
+                current = came_from[current]
+                path.append(current)
+            path.reverse()
+            return path
+
+        for neighbor in get_neighbors(current):
+            tentative_g = g_score.get(current, float('inf')) + 1
+            if tentative_g < g_score.get(neighbor, float('inf')):
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                f_score = tentative_g + heuristic(neighbor, end_id)
+                heapq.heappush(open_set, (f_score, neighbor))
+
+    return []
+
+
+def legacy_astar_tuples(size: int, blocked_set: Set[Tuple[int, int]], start_id: int, end_id: int, stats: Dict[str, int]) -> List[Tuple[int, int]]:
+    """Copy of the old routers/simulation.py::calculate_path search"""
+
+    def get_node_id(x: int, y: int) -> int:
+        return y * size + x
+
+    def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> int:
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def get_neighbors(pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+        x, y = pos
+        neighbors = []
+        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+            new_x, new_y = x + dx, y + dy
+            if 0 <= new_x < size and 0 <= new_y < size:
+                current_id = get_node_id(x, y)
+                neighbor_id = get_node_id(new_x, new_y)
+                if (current_id, neighbor_id) not in blocked_set:
+                    neighbors.append((new_x, new_y))
+        return neighbors
+
+    start = (start_id % size, start_id // size)
+    end = (end_id % size, end_id // size)
+
+    open_set = [(0, start)]
+    came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    g_score: Dict[Tuple[int, int], float] = {start: 0}
+
+    while open_set:
+        _, current = heapq.heappop(open_set)
+        stats["expansions"] += 1
+
+        if current == end:
+            path = []
+            while current in came_from:
+                path.append(current)
+                current = came_from[current]
+            path.append(start)
+            path.reverse()
+            return path
+
+        for neighbor in get_neighbors(current):
+            tentative_g = g_score.get(current, float('inf')) + 1
+            if tentative_g < g_score.get(neighbor, float('inf')):
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                f_score = tentative_g + heuristic(neighbor, end)
+                heapq.heappush(open_set, (f_score, neighbor))
+
+    return []
+
+
+# ============ Benchmark ============
+
+def random_blocked_paths(size: int, count: int, rng: random.Random) -> List[Tuple[int, int]]:
+    blocked = set()
+    while len(blocked) < count:
+        x, y = rng.randrange(size - 1), rng.randrange(size - 1)
+        node_id = y * size + x
+        neighbor_id = node_id + 1 if rng.random() < 0.5 else node_id + size
+        blocked.add((node_id, neighbor_id))
+    return list(blocked)
+
+
+def run_case(name: str, size: int, blocked_pairs: List[Tuple[int, int]], queries: int, rng: random.Random):
+    node_count = size * size
+    pairs = [(rng.randrange(node_count), rng.randrange(node_count)) for _ in range(queries)]
+
+    blocked_set: Set[Tuple[int, int]] = set()
+    for from_id, to_id in blocked_pairs:
+        blocked_set.add((from_id, to_id))
+        blocked_set.add((to_id, from_id))
+
+    graph = RoutingGraph(size, size, blocked_pairs)
+
+    print(f"\n{name}: {size}x{size} grid, {len(blocked_pairs)} blocked paths, {queries} queries")
+    print(f"  {'implementation':<28}{'expansions':>12}{'seconds':>10}{'exp/sec':>14}{'us/query':>11}")
+
+    results = {}
+    for label, search in [
+        ("legacy map.py (node ids)", lambda s, e, st: legacy_astar_nodes(size, blocked_set, s, e, st)),
+        ("legacy simulation.py", lambda s, e, st: legacy_astar_tuples(size, blocked_set, s, e, st)),
+        ("app.routing RoutingGraph", None),
+    ]:
+        stats = {"expansions": 0}
+        lengths = []
+        began = time.perf_counter()
+        if search is None:
+            graph.expansions = 0
+            for start_id, end_id in pairs:
+                lengths.append(len(graph.astar(start_id, end_id)))
+            stats["expansions"] = graph.expansions
+        else:
+            for start_id, end_id in pairs:
+                lengths.append(len(search(start_id, end_id, stats)))
+        elapsed = time.perf_counter() - began
+
+        results[label] = lengths
+        rate = stats["expansions"] / elapsed if elapsed else 0.0
+        print(f"  {label:<28}{stats['expansions']:>12}{elapsed:>10.3f}{rate:>14,.0f}{elapsed / queries * 1e6:>11.1f}")
+
+    # All implementations must agree on path lengths
+    reference = results["legacy map.py (node ids)"]
+    for label, lengths in results.items():
+        assert lengths == reference, f"{label} disagrees with legacy path lengths"
+
+
+def run_large_case(size: int, queries: int, rng: random.Random):
+    node_count = size * size
+    blocked_pairs = random_blocked_paths(size, node_count // 20, rng)
+    pairs = [(rng.randrange(node_count), rng.randrange(node_count)) for _ in range(queries)]
+
+    print(f"\nLarge map: {size}x{size} grid, {len(blocked_pairs)} blocked paths, {queries} queries")
+    graph = RoutingGraph(size, size, blocked_pairs)
+
+    began = time.perf_counter()
+    router = HierarchicalRouter(graph)
+    print(f"  hierarchical build: {time.perf_counter() - began:.1f}s, {len(router.entrance_nodes)} entrances")
+
+    began = time.perf_counter()
+    exact = [len(graph.astar(start_id, end_id)) for start_id, end_id in pairs]
+    astar_ms = (time.perf_counter() - began) / queries * 1000
+
+    began = time.perf_counter()
+    approx = [len(router.get_path(start_id, end_id)) for start_id, end_id in pairs]
+    hierarchical_ms = (time.perf_counter() - began) / queries * 1000
+
+    worst = max((a - e) / max(1, e - 1) for a, e in zip(approx, exact))
+    print(f"  plain A*:     {astar_ms:8.2f} ms/query")
+    print(f"  hierarchical: {hierarchical_ms:8.2f} ms/query (worst path {worst:.1%} longer)")
+
+
+def main():
+    rng = random.Random(42)
+    run_case("Seeded map", 9, BLOCKED_PATHS, 20000, rng)
+    run_case("Random map", 100, random_blocked_paths(100, 1500, rng), 300, rng)
+    if "--large" in sys.argv:
+        run_large_case(1000, 100, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Micro-benchmark: hot read endpoints, ORM + jsonable_encoder vs row types + orjson.
+
+"before" is what the endpoints used to do: query ORM instances and return
+them, which FastAPI runs through jsonable_encoder and JSONResponse. "after"
+calls the endpoint functions as they are now (column SELECT into slotted
+rows, ORJSONResponse). Both produce the response body bytes; per endpoint
+it reports milliseconds per request and the peak memory allocated while
+serving one request (tracemalloc, measured in a separate pass so it does
+not skew the timings).
+
+Run from the backend directory against a seeded database:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --requests 200 --seed-orders 5000
+
+--seed-orders inserts that many synthetic pending orders first, so the
+order listings have full pages. It changes data and is off by default.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app.database import DATABASE_URL  # noqa: E402
+from app.models import Bot, Node, Order, OrderStatus, Restaurant  # noqa: E402
+from app.routers import bots, map as map_router, orders, restaurants  # noqa: E402
+
+Endpoint = Callable[[Session], bytes]
+
+
+# ============ Before: ORM instances + jsonable_encoder ============
+
+def legacy(query: Callable[[Session], object]) -> Endpoint:
+    def endpoint(db: Session) -> bytes:
+        result = query(db)
+        body = JSONResponse(jsonable_encoder(result)).body
+        # Each request used its own session, so the identity map started empty
+        db.expunge_all()
+        return body
+    return endpoint
+
+
+def legacy_endpoints(order_id: int, bot_id: int, restaurant_id: int) -> Dict[str, Endpoint]:
+    page = orders.ORDERS_PAGE_SIZE
+    return {
+        "bots": legacy(lambda db: db.query(Bot).order_by(Bot.id).all()),
+        "bot": legacy(lambda db: db.query(Bot).filter(Bot.id == bot_id).first()),
+        "orders/pending": legacy(lambda db: db.query(Order).filter(
+            Order.status == OrderStatus.PENDING
+        ).order_by(Order.id.desc()).limit(page).all()),
+        "orders/active": legacy(lambda db: db.query(Order).filter(
+            Order.status.in_(orders.ACTIVE_STATUSES)
+        ).order_by(Order.id.desc()).limit(page).all()),
+        "order": legacy(lambda db: db.query(Order).filter(Order.id == order_id).first()),
+        "restaurants": legacy(lambda db: db.query(Restaurant).filter(Restaurant.is_active == True).all()),
+        "restaurant": legacy(lambda db: db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()),
+        "nodes": legacy(lambda db: db.query(Node).all()),
+    }
+
+
+# ============ After: the current endpoint functions ============
+
+def current_endpoints(order_id: int, bot_id: int, restaurant_id: int) -> Dict[str, Endpoint]:
+    page = orders.ORDERS_PAGE_SIZE
+    return {
+        "bots": lambda db: bots.get_all_bots(db=db).body,
+        "bot": lambda db: bots.get_bot(bot_id, db=db).body,
+        "orders/pending": lambda db: orders.get_pending_orders(cursor=None, limit=page, db=db).body,
+        "orders/active": lambda db: orders.get_active_orders(cursor=None, limit=page, db=db).body,
+        "order": lambda db: orders.get_order(order_id, db=db).body,
+        "restaurants": lambda db: restaurants.get_all_restaurants(db=db).body,
+        "restaurant": lambda db: restaurants.get_restaurant(restaurant_id, db=db).body,
+        "nodes": lambda db: map_router.get_all_nodes(db=db).body,
+    }
+
+
+# ============ Measuring ============
+
+def time_endpoint(Session, endpoint: Endpoint, requests: int) -> float:
+    """Milliseconds per request"""
+    with Session() as db:
+        endpoint(db)   # Warm up statement caches
+        start = time.perf_counter()
+        for _ in range(requests):
+            endpoint(db)
+        return (time.perf_counter() - start) * 1000 / requests
+
+
+def peak_allocation(Session, endpoint: Endpoint, requests: int) -> float:
+    """Mean peak bytes allocated during one request"""
+    with Session() as db:
+        endpoint(db)
+        tracemalloc.start()
+        total = 0
+        for _ in range(requests):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            endpoint(db)
+            total += tracemalloc.get_traced_memory()[1] - start
+        tracemalloc.stop()
+        return total / requests
+
+
+def seed_orders(Session, count: int):
+    with Session() as db:
+        restaurant_nodes = db.query(Restaurant.id, Restaurant.node_id).all()
+        node_ids = [node_id for node_id, in db.query(Node.id).filter(Node.is_delivery_point == True).all()]
+        if not restaurant_nodes or not node_ids:
+            sys.exit("No restaurants or delivery points - seed the database first")
+        db.bulk_insert_mappings(Order, [
+            {
+                "customer_name": f"bench-{i}",
+                "customer_address": "",
+                "restaurant_id": restaurant_nodes[i % len(restaurant_nodes)][0],
+                "pickup_node_id": restaurant_nodes[i % len(restaurant_nodes)][1],
+                "delivery_node_id": node_ids[i % len(node_ids)],
+                "status": OrderStatus.PENDING
+            }
+            for i in range(count)
+        ])
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--alloc-requests", type=int, default=10, help="requests per endpoint in the tracemalloc pass")
+    parser.add_argument("--seed-orders", type=int, default=0, help="insert this many pending orders first")
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    if args.seed_orders:
+        seed_orders(Session, args.seed_orders)
+
+    with Session() as db:
+        order_id = db.query(Order.id).order_by(Order.id.desc()).limit(1).scalar()
+        bot_id = db.query(Bot.id).order_by(Bot.id).limit(1).scalar()
+        restaurant_id = db.query(Restaurant.id).order_by(Restaurant.id).limit(1).scalar()
+    if order_id is None or bot_id is None or restaurant_id is None:
+        sys.exit("Need at least one bot, restaurant and order - seed the database first")
+
+    before = legacy_endpoints(order_id, bot_id, restaurant_id)
+    after = current_endpoints(order_id, bot_id, restaurant_id)
+
+    print(f"{args.requests} requests per endpoint ({DATABASE_URL.split('@')[-1]})")
+    print(f"{'endpoint':<16}{'before ms':>11}{'after ms':>10}{'speedup':>9}{'before KiB':>12}{'after KiB':>11}")
+    for name in before:
+        before_ms = time_endpoint(Session, before[name], args.requests)
+        after_ms = time_endpoint(Session, after[name], args.requests)
+        before_bytes = peak_allocation(Session, before[name], args.alloc_requests)
+        after_bytes = peak_allocation(Session, after[name], args.alloc_requests)
+        print(
+            f"{name:<16}{before_ms:>11.3f}{after_ms:>10.3f}{before_ms / after_ms:>8.1f}x"
+            f"{before_bytes / 1024:>12.1f}{after_bytes / 1024:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Load test: many concurrent POST /api/orders/ against one database.
+
+Runs create_order directly on worker threads, each with its own session,
+so concurrent requests race for the same bots exactly like API workers
+would. Afterwards it checks the capacity invariant for every bot:
+    active orders == current_orders_count <= BOT_CAPACITY
+
+Run from the backend directory against a seeded database:
+    DATABASE_URL=postgresql://... python -m benchmarks.load_create_orders --reset
+    python -m benchmarks.load_create_orders --reset --orders 2000 --workers 200
+
+--reset cancels every active order and zeroes the bot counters first, so
+the check starts from a known state. It is required because it changes data.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import create_engine, func, update  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.config import BOT_CAPACITY  # noqa: E402
+from app.database import DATABASE_URL  # noqa: E402
+from app.models import Bot, BotStatus, Order, OrderStatus, Restaurant  # noqa: E402
+from app.rate_limit import SlidingWindowRateLimiter  # noqa: E402
+from app.routers import orders  # noqa: E402
+from app.routing import get_grid_size, load_router  # noqa: E402
+
+
+def reset(Session):
+    with Session() as db:
+        db.execute(
+            update(Order)
+            .where(Order.status.in_(orders.ACTIVE_STATUSES + [OrderStatus.PENDING]))
+            .values(status=OrderStatus.CANCELLED, bot_id=None)
+        )
+        db.execute(update(Bot).values(current_orders_count=0, status=BotStatus.AVAILABLE))
+        db.commit()
+
+
+def check_invariant(Session) -> bool:
+    with Session() as db:
+        active = dict(
+            db.query(Order.bot_id, func.count(Order.id))
+            .filter(Order.status.in_(orders.ACTIVE_STATUSES), Order.bot_id.isnot(None))
+            .group_by(Order.bot_id)
+            .all()
+        )
+        ok = True
+        for bot in db.query(Bot).order_by(Bot.id).all():
+            count = active.get(bot.id, 0)
+            status = "ok"
+            if count > BOT_CAPACITY or count != bot.current_orders_count:
+                status = "VIOLATION"
+                ok = False
+            print(f"  {bot.name:<10} active={count} counter={bot.current_orders_count} {status}")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=100)
+    parser.add_argument("--reset", action="store_true", help="cancel active orders and zero bot counters first")
+    args = parser.parse_args()
+
+    if not args.reset:
+        parser.error("--reset is required (the test cancels active orders in the target database)")
+
+    engine = create_engine(DATABASE_URL, pool_size=args.workers, max_overflow=0)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        load_router(db)
+        restaurant_ids = [r.id for r in db.query(Restaurant).order_by(Restaurant.id).all()]
+    if not restaurant_ids:
+        sys.exit("No restaurants - seed the database first")
+
+    # The per-restaurant limit would reject almost everything
+    orders.restaurant_rate_limiter = SlidingWindowRateLimiter(args.orders, 60)
+    reset(Session)
+
+    width, height = get_grid_size()
+
+    def create(i: int):
+        with Session() as db:
+            try:
+                result = orders.create_order(
+                    customer_name=f"load-{i}",
+                    customer_address="",
+                    restaurant_id=restaurant_ids[i % len(restaurant_ids)],
+                    delivery_x=(i * 7) % width,
+                    delivery_y=(i * 3) % height,
+                    db=db
+                )
+            except HTTPException:
+                return False
+            return result["bot_assigned"] is not None
+
+    print(f"Creating {args.orders} orders on {args.workers} threads ({DATABASE_URL.split('@')[-1]})")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        assigned = sum(pool.map(create, range(args.orders)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.orders / elapsed:,.0f} orders/s ({elapsed:.2f}s), {assigned} assigned, {args.orders - assigned} pending")
+    ok = check_invariant(Session)
+    print("Invariant holds" if ok else "Invariant VIOLATED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Shared fixtures: every test gets a freshly seeded SQLite database, bound
+to the app's SessionLocal, with the routing engine, counters and bot
+index loaded from it - what the lifespan does at startup.
+
+Run from the backend directory:
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app.database as database  # noqa: E402
+from app.bot_index import bot_index  # noqa: E402
+from app.catalog import restaurant_catalog  # noqa: E402
+from app.counters import status_counters  # noqa: E402
+from app.models import Base, Bot, Order, OrderStatus  # noqa: E402
+from app.reservations import reserve_bot  # noqa: E402
+from app.routing import load_router  # noqa: E402
+from app.seed_data import seed_database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    database.engine = engine
+    database.SessionLocal.configure(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    session = database.SessionLocal()
+    seed_database(session)
+    load_router(session)
+    status_counters.reconcile(session)
+    bot_index.reconcile(session)
+    restaurant_catalog.invalidate()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_order(db, bot_id=None, status=OrderStatus.PENDING, pickup_node_id=10, delivery_node_id=70) -> Order:
+    """An order, with a slot reserved on bot_id when it is given"""
+    if bot_id is not None:
+        assert reserve_bot(db, bot_id)
+    order = Order(
+        customer_name="test",
+        customer_address="L00",
+        pickup_node_id=pickup_node_id,
+        delivery_node_id=delivery_node_id,
+        restaurant_id=1,
+        bot_id=bot_id,
+        status=status,
+        assigned_at=datetime.utcnow() if bot_id else None
+    )
+    db.add(order)
+    db.commit()
+    return order
+
+
+def bot_row(db, bot_id: int) -> Bot:
+    db.expire_all()
+    return db.get(Bot, bot_id)
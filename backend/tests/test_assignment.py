@@ -0,0 +1,53 @@
+from app.assignment import BotCandidate, rank_bots
+from app.routing import UNREACHABLE
+from app.tours import TourOrder
+
+
+def line(a: int, b: int) -> int:
+    return abs(a - b)
+
+
+NEW_ORDER = TourOrder(order_id=100, pickup_node_id=10, delivery_node_id=20)
+
+
+def test_cheapest_marginal_cost_first():
+    candidates = [
+        BotCandidate(1, node_id=50, orders_count=0),
+        BotCandidate(2, node_id=9, orders_count=0),
+        BotCandidate(3, node_id=30, orders_count=0),
+    ]
+    ranked = rank_bots(candidates, NEW_ORDER, line)
+    assert [a.bot_id for a in ranked] == [2, 3, 1]
+    assert ranked[0].cost == 11
+    assert [s.node_id for s in ranked[0].tour.stops] == [10, 20]
+
+
+def test_busy_bot_on_the_way_beats_idle_bot_far_away():
+    # Bot 1 already drives 0 -> 30; the new order lies on its way
+    busy = BotCandidate(1, node_id=0, orders_count=1, orders=[TourOrder(1, 5, 30)])
+    idle = BotCandidate(2, node_id=60, orders_count=0)
+    ranked = rank_bots([idle, busy], NEW_ORDER, line)
+    assert [a.bot_id for a in ranked] == [1, 2]
+    assert ranked[0].cost == 0
+
+
+def test_ties_go_to_the_earlier_delivery_then_the_lighter_bot():
+    loaded = BotCandidate(1, node_id=10, orders_count=2, orders=[TourOrder(1, 10, 10), TourOrder(2, 10, 10)])
+    empty = BotCandidate(2, node_id=10, orders_count=0)
+    ranked = rank_bots([loaded, empty], NEW_ORDER, line)
+    # Same extra distance, but the loaded bot stops for two more pickups first
+    assert [a.bot_id for a in ranked] == [2, 1]
+    assert ranked[0].eta_seconds < ranked[1].eta_seconds
+
+    # Same cost and ETA (bot 4 delivers its own order at the new one's drop-off): the lighter bot
+    twins = [BotCandidate(4, node_id=10, orders_count=1, orders=[TourOrder(3, 20, 20, picked_up=True)]),
+             BotCandidate(3, node_id=10, orders_count=0, tour_distance=10)]
+    assert [a.bot_id for a in rank_bots(twins, NEW_ORDER, line)][0] == 3
+
+
+def test_bots_that_cannot_reach_the_order_are_left_out():
+    def walled(a: int, b: int) -> int:
+        return UNREACHABLE if (a < 0) != (b < 0) else line(a, b)
+
+    candidates = [BotCandidate(1, node_id=-5, orders_count=0), BotCandidate(2, node_id=0, orders_count=0)]
+    assert [a.bot_id for a in rank_bots(candidates, NEW_ORDER, walled)] == [2]
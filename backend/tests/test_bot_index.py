@@ -0,0 +1,72 @@
+import random
+
+from app.bot_index import SCAN_BELOW, BotIndex
+from app.config import BOT_CAPACITY
+from app.models import Bot, BotStatus
+
+# Bots spread over this many cells per side, in buckets of CELL_SIZE
+SPREAD = 200
+CELL_SIZE = 8
+
+
+def brute_force(bots, x, y, k):
+    """(bot id, distance) of the k nearest bots with spare capacity, by scanning them all"""
+    found = sorted(
+        (abs(bx - x) + abs(by - y), bot_id)
+        for bot_id, (bx, by, status, orders) in bots.items()
+        if status in (BotStatus.AVAILABLE, BotStatus.BUSY) and orders < BOT_CAPACITY
+    )
+    return [(bot_id, distance) for distance, bot_id in found[:k]]
+
+
+def test_bucket_lookup_matches_a_full_scan(db):
+    rng = random.Random(7)
+    statuses = [BotStatus.AVAILABLE, BotStatus.BUSY, BotStatus.OFFLINE]
+    db.add_all([
+        Bot(
+            name=f"bot-{i}",
+            current_x=rng.randrange(SPREAD),
+            current_y=rng.randrange(SPREAD),
+            status=rng.choice(statuses),
+            current_orders_count=rng.randrange(BOT_CAPACITY + 1)
+        )
+        for i in range(2 * SCAN_BELOW)
+    ])
+    db.commit()
+    bots = {
+        bot.id: (bot.current_x, bot.current_y, bot.status, bot.current_orders_count)
+        for bot in db.query(Bot).all()
+    }
+    index = BotIndex(cell_size=CELL_SIZE)
+    index.reconcile(db)
+    assert len(index) >= SCAN_BELOW    # Looked up in buckets, not scanned
+
+    def check():
+        for _ in range(50):
+            x, y = rng.randrange(-20, SPREAD + 20), rng.randrange(-20, SPREAD + 20)
+            for k in (1, 8, 40):
+                assert index.nearest(x, y, k) == brute_force(bots, x, y, k)
+
+    check()
+
+    # Bots moving to other buckets, filling up and freeing slots
+    for bot_id in rng.sample(sorted(bots), 100):
+        x, y = rng.randrange(SPREAD), rng.randrange(SPREAD)
+        _, _, status, orders = bots[bot_id]
+        index.move(bot_id, x, y, live=True)
+        if bot_id % 3 == 0:
+            orders = rng.randrange(BOT_CAPACITY + 1)
+            status = BotStatus.BUSY if orders else BotStatus.AVAILABLE
+            index.set_load(bot_id, orders, status)
+        bots[bot_id] = (x, y, status, orders)
+    check()
+
+    # One bot from the far corner to the query point's bucket
+    bot_id = next(bot_id for bot_id, (_, _, status, orders) in bots.items()
+                  if status == BotStatus.AVAILABLE and orders < BOT_CAPACITY)
+    index.move(bot_id, SPREAD - 1, SPREAD - 1)
+    assert (bot_id, 0) not in index.nearest(0, 0, 1)
+    index.move(bot_id, 0, 0)
+    assert index.nearest(0, 0, 1) == [(bot_id, 0)]
+    bots[bot_id] = (0, 0, BotStatus.AVAILABLE, bots[bot_id][3])
+    check()
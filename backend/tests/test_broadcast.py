@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+from app.broadcast import Broadcaster
+from app.events import EventBus
+
+
+def make_broadcaster(bots: dict, epoch: str = "boot1") -> Broadcaster:
+    def load(dirty):
+        if dirty is None:
+            return {"bots": dict(bots)}
+        return {"bots": {bot_id: bots.get(bot_id) for bot_id in dirty.get("bots", ())}}
+
+    return Broadcaster(load, EventBus(), coalesce=0, epoch=epoch)
+
+
+def parse(event: bytes):
+    """(id, data) of one SSE event"""
+    fields = dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+    return fields.get("id"), json.loads(fields["data"])
+
+
+async def next_event(stream):
+    return parse(await asyncio.wait_for(stream.__anext__(), 1))
+
+
+def run_with_moved_bot(check):
+    """Run check(broadcaster, first client's events) after one delta, while that client listens"""
+    async def main():
+        bots = {1: {"id": 1, "x": 0}}
+        broadcaster = make_broadcaster(bots)
+        broadcaster.start()
+        first = broadcaster.stream()
+        try:
+            events = [await next_event(first)]
+            bots[1] = {"id": 1, "x": 1}
+            broadcaster.bus.publish("bots", [1])
+            events.append(await next_event(first))
+            await check(broadcaster, events)
+        finally:
+            await first.aclose()
+            await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_ids_carry_the_epoch():
+    async def check(broadcaster, events):
+        assert [(event_id, data["type"]) for event_id, data in events] == [("boot1-1", "snapshot"), ("boot1-2", "delta")]
+        assert events[1][1]["bots"] == [{"id": 1, "x": 1}]
+
+    run_with_moved_bot(check)
+
+
+def test_resume_replays_missed_deltas():
+    async def check(broadcaster, events):
+        resumed = broadcaster.stream(events[0][0])
+        try:
+            assert await next_event(resumed) == events[1]
+        finally:
+            await resumed.aclose()
+
+    run_with_moved_bot(check)
+
+
+def test_resume_from_another_epoch_gets_a_snapshot():
+    async def check(broadcaster, events):
+        # Same number, from before a restart or from another worker
+        for last_event_id in ["boot0-1", "1", "boot1-9", "garbage"]:
+            resumed = broadcaster.stream(last_event_id)
+            try:
+                event_id, data = await next_event(resumed)
+            finally:
+                await resumed.aclose()
+            assert (event_id, data["type"], data["bots"]) == ("boot1-2", "snapshot", [{"id": 1, "x": 1}])
+
+    run_with_moved_bot(check)
+
+
+def test_broadcasters_pick_their_own_epoch():
+    assert make_broadcaster({}, epoch=None).epoch != make_broadcaster({}, epoch=None).epoch
+
+
+def test_one_load_per_change_for_every_subscriber():
+    async def main():
+        bots = {1: {"id": 1, "x": 0}}
+        loads = []
+
+        def load(dirty):
+            loads.append(dirty)
+            if dirty is None:
+                return {"bots": dict(bots)}
+            return {"bots": {bot_id: bots.get(bot_id) for bot_id in dirty.get("bots", ())}}
+
+        broadcaster = Broadcaster(load, EventBus(), coalesce=0, epoch="boot1")
+        broadcaster.start()
+        streams = [broadcaster.stream() for _ in range(5)]
+        try:
+            snapshots = [await next_event(stream) for stream in streams]
+            assert {event_id for event_id, _ in snapshots} == {"boot1-1"}
+
+            bots[1] = {"id": 1, "x": 1}
+            broadcaster.bus.publish("bots", [1])
+            deltas = [await next_event(stream) for stream in streams]
+            assert all(delta == deltas[0] for delta in deltas)
+            # The full state once, then just the changed bot - not per client
+            assert loads == [None, {"bots": {1}}]
+        finally:
+            for stream in streams:
+                await stream.aclose()
+            await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_slow_subscriber_is_resynced_with_a_snapshot():
+    async def main():
+        bots = {1: {"id": 1, "x": 0}}
+        broadcaster = make_broadcaster(bots)
+        broadcaster.queue_size = 2
+        broadcaster.start()
+        slow = broadcaster.stream()
+        try:
+            await next_event(slow)
+            # Deltas pile up while the client does not read
+            for x in range(1, 5):
+                bots[1] = {"id": 1, "x": x}
+                broadcaster.bus.publish("bots", [1])
+                for _ in range(200):
+                    if broadcaster.last_id == x + 1:
+                        break
+                    await asyncio.sleep(0.005)
+            assert broadcaster.dropped > 0
+
+            event_id, data = await next_event(slow)
+            # Skipping to the current state beats a gap in the deltas
+            while data["type"] == "delta":
+                event_id, data = await next_event(slow)
+            assert (event_id, data["type"], data["bots"]) == (f"boot1-{broadcaster.last_id}", "snapshot", [{"id": 1, "x": 4}])
+        finally:
+            await slow.aclose()
+            await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_nothing_is_loaded_while_nobody_listens():
+    async def main():
+        loads = []
+        broadcaster = Broadcaster(lambda dirty: loads.append(dirty) or {"bots": {}}, EventBus(), coalesce=0)
+        broadcaster.start()
+        try:
+            broadcaster.bus.publish("bots", [1])
+            await asyncio.sleep(0.01)
+            assert loads == []
+            assert broadcaster.state is None
+        finally:
+            await broadcaster.stop()
+
+    asyncio.run(main())
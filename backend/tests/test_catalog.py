@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+
+import app.database as database
+from app.catalog import restaurant_catalog
+from app.main import app
+from app.models import Restaurant
+from app.routing import load_router
+
+client = TestClient(app)
+
+
+@contextmanager
+def count_queries():
+    """Statements run on the test database inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+
+
+def restaurant_names():
+    return {r["id"]: r["name"] for r in client.get("/api/restaurants").json()}
+
+
+def test_catalog_serves_restaurants_without_queries(db):
+    names = restaurant_names()
+    assert names == {r.id: r.name for r in db.query(Restaurant).filter(Restaurant.is_active == True)}
+
+    with count_queries() as statements:
+        assert restaurant_names() == names
+        restaurant_id = next(iter(names))
+        assert client.get(f"/api/restaurants/{restaurant_id}").json()["name"] == names[restaurant_id]
+    assert not [s for s in statements if "restaurants" in s]
+
+
+def test_orm_write_reloads_catalog(db):
+    restaurant_names()
+    restaurant = db.query(Restaurant).order_by(Restaurant.id).first()
+    restaurant.name = "Renamed"
+    db.commit()
+
+    assert restaurant_names()[restaurant.id] == "Renamed"
+
+
+def test_bulk_update_reloads_catalog(db):
+    restaurant_names()
+    db.execute(update(Restaurant).where(Restaurant.id == 1).values(is_active=False))
+    db.commit()
+
+    assert 1 not in restaurant_names()
+    assert client.get("/api/restaurants/1").json()["is_active"] is False
+
+
+def test_rolled_back_write_keeps_catalog(db):
+    names = restaurant_names()
+    restaurant = db.get(Restaurant, 1)
+    restaurant.name = "Never saved"
+    db.flush()
+    db.rollback()
+
+    with count_queries() as statements:
+        assert restaurant_names() == names
+    assert not statements
+    assert db.get(Restaurant, 1).name == names[1]
+
+
+def test_routing_reload_reloads_catalog(db):
+    restaurant_catalog.get(db)
+    # Edited straight in the database: only a reload picks it up
+    db.connection().exec_driver_sql("UPDATE restaurants SET name = 'Direct' WHERE id = 1")
+    db.commit()
+    assert restaurant_names()[1] != "Direct"
+
+    load_router(db)
+    assert restaurant_names()[1] == "Direct"
@@ -0,0 +1,83 @@
+import threading
+
+import app.routers.orders as orders_router
+from app.counters import StatusCounters, status_counters
+from app.models import BotStatus, Order, OrderStatus
+from app.rate_limit import SlidingWindowRateLimiter
+from app.routers.orders import ACTIVE_STATUSES, cancel_order, create_order, update_order_status
+
+from conftest import add_order
+from test_reservations import run_together
+
+
+def counted(counters: StatusCounters):
+    return (
+        {status: counters.orders(status) for status in OrderStatus},
+        {status: counters.bots(status) for status in BotStatus}
+    )
+
+
+def assert_matches_database(db):
+    """The live counters equal a fresh count of the database"""
+    fresh = StatusCounters()
+    fresh.reconcile(db)
+    assert counted(status_counters) == counted(fresh)
+
+
+def test_transitions_from_many_threads_add_up():
+    counters = StatusCounters()
+    per_thread = 2000
+
+    def work(bot_id):
+        for _ in range(per_thread):
+            counters.order_changed(None, OrderStatus.PENDING)
+            counters.order_changed(OrderStatus.PENDING, OrderStatus.ASSIGNED)
+        counters.bot_changed(bot_id, BotStatus.BUSY)
+        counters.bot_changed(bot_id, BotStatus.AVAILABLE)
+
+    threads = [threading.Thread(target=work, args=(bot_id,)) for bot_id in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counters.orders(OrderStatus.ASSIGNED) == 8 * per_thread
+    assert counters.orders(OrderStatus.PENDING) == 0
+    assert (counters.bots(BotStatus.AVAILABLE), counters.bots(BotStatus.BUSY)) == (8, 0)
+
+
+def test_concurrent_api_transitions_keep_counters_exact(db, monkeypatch):
+    monkeypatch.setattr(orders_router, "restaurant_rate_limiter", SlidingWindowRateLimiter(100, 30))
+    run_together(*[
+        lambda session, x=x: create_order("test", "", 1 + x % 2, x, 8, session)
+        for x in range(6)
+    ])
+    assert_matches_database(db)
+    assert status_counters.orders(OrderStatus.ASSIGNED) == 6
+
+    order_ids = [order_id for order_id, in db.query(Order.id).order_by(Order.id)]
+    # Each order is cancelled and delivered at the same time
+    run_together(*[
+        call
+        for order_id in order_ids
+        for call in (
+            lambda session, order_id=order_id: cancel_order(order_id, session),
+            lambda session, order_id=order_id: update_order_status(order_id, "delivered", session)
+        )
+    ])
+    assert_matches_database(db)
+    assert status_counters.orders(OrderStatus.CANCELLED, OrderStatus.DELIVERED) == 6
+    assert status_counters.orders(*ACTIVE_STATUSES) == 0
+
+
+def test_reconcile_replaces_drift(db):
+    add_order(db, bot_id=1, status=OrderStatus.ASSIGNED)
+    status_counters.order_changed(None, OrderStatus.PENDING)    # Never written
+    status_counters.bot_changed(2, BotStatus.OFFLINE)
+
+    status_counters.reconcile(db)
+
+    assert status_counters.orders(OrderStatus.PENDING) == 0
+    assert status_counters.orders(OrderStatus.ASSIGNED) == 1
+    assert status_counters.bots(BotStatus.OFFLINE) == 0
+    assert_matches_database(db)
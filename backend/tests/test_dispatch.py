@@ -0,0 +1,57 @@
+from app.config import BOT_CAPACITY
+from app.dispatch import PendingDispatcher
+from app.models import Bot, Order, OrderStatus
+from app.reservations import release_bot, reserve_bot
+
+from conftest import add_order, bot_row
+
+
+def fill_fleet(db):
+    for (bot_id,) in db.query(Bot.id).all():
+        while reserve_bot(db, bot_id):
+            pass
+    db.commit()
+
+
+def test_claims_oldest_pending_order_first(db):
+    fill_fleet(db)
+    first, second = add_order(db), add_order(db)
+    dispatcher = PendingDispatcher()
+    dispatcher.enqueue(second)
+    dispatcher.enqueue(first)
+    assert dispatcher.dispatch() == 0
+    assert len(dispatcher) == 2
+
+    release_bot(db, 1)
+    db.commit()
+    assert dispatcher.dispatch() == 1
+
+    db.expire_all()
+    assert db.get(Order, first.id).status == OrderStatus.ASSIGNED
+    assert db.get(Order, first.id).bot_id == 1
+    assert db.get(Order, second.id).status == OrderStatus.PENDING
+    assert len(dispatcher) == 1
+    assert bot_row(db, 1).current_orders_count == BOT_CAPACITY
+
+
+def test_order_cancelled_meanwhile_gives_the_slot_back(db):
+    order = add_order(db)
+    dispatcher = PendingDispatcher()
+    dispatcher.enqueue(order)
+    order.status = OrderStatus.CANCELLED
+    db.commit()
+
+    assert dispatcher.dispatch() == 0
+    assert len(dispatcher) == 0
+    assert sum(bot.current_orders_count for bot in db.query(Bot).all()) == 0
+
+
+def test_discarded_orders_are_not_claimed(db):
+    order = add_order(db)
+    dispatcher = PendingDispatcher()
+    dispatcher.enqueue(order)
+    dispatcher.discard(order.id)
+
+    assert dispatcher.dispatch() == 0
+    db.expire_all()
+    assert db.get(Order, order.id).status == OrderStatus.PENDING
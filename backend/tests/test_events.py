@@ -0,0 +1,131 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+
+import app.database as database
+from app.events import NOTIFY_BATCH, EventBus, PostgresNotifyBridge, event_bus
+from app.models import Order, OrderStatus
+from app.routers.orders import cancel_order
+
+from conftest import add_order, bot_row
+
+
+@pytest.fixture
+def received():
+    """Events the shared bus delivers during the test"""
+    events = []
+
+    def listener(collection, ids):
+        events.append((collection, ids))
+
+    event_bus.subscribe(listener)
+    yield events
+    event_bus.unsubscribe(listener)
+
+
+def test_publish_reaches_every_listener():
+    bus = EventBus()
+    events = []
+
+    def failing(collection, ids):
+        raise RuntimeError("listener bug")
+
+    bus.subscribe(failing)
+    bus.subscribe(lambda collection, ids: events.append((collection, ids)))
+    bus.publish("orders", [3, None, 3, 4])
+    # Nothing to reload: not delivered
+    bus.publish("orders", [None])
+
+    assert events == [("orders", {3, 4})]
+    bus.unsubscribe(failing)
+    bus.publish("bots", [1])
+    assert events[-1] == ("bots", {1})
+
+
+def test_cancel_publishes_after_commit(db, received):
+    order = add_order(db, bot_id=1, status=OrderStatus.ASSIGNED)
+    seen = []
+
+    def check_committed(collection, ids):
+        # A listener reloading the order sees the change
+        session = database.SessionLocal()
+        try:
+            seen.append((collection, session.get(Order, order.id).status, session.get(Order, order.id).bot_id))
+        finally:
+            session.close()
+
+    event_bus.subscribe(check_committed)
+    try:
+        cancel_order(order.id, db)
+    finally:
+        event_bus.unsubscribe(check_committed)
+
+    assert received == [("orders", {order.id}), ("bots", {1})]
+    assert seen == [("orders", OrderStatus.CANCELLED, None), ("bots", OrderStatus.CANCELLED, None)]
+    assert bot_row(db, 1).current_orders_count == 0
+
+
+def test_unknown_backend_is_refused():
+    bus = EventBus()
+    bus.start("memory")
+    assert bus._bridge is None
+    with pytest.raises(ValueError):
+        bus.start("redis")
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.payloads = []
+
+    def execute(self, statement, params):
+        assert "pg_notify" in str(statement)
+        self.payloads.append((params["channel"], json.loads(params["payload"])))
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.connection = RecordingConnection()
+
+    @contextmanager
+    def begin(self):
+        yield self.connection
+
+
+def test_bridge_sends_batched_notifications(monkeypatch):
+    engine = RecordingEngine()
+    monkeypatch.setattr(database, "engine", engine)
+    bridge = PostgresNotifyBridge(EventBus(), channel="test_channel")
+
+    bridge.send("orders", set(range(NOTIFY_BATCH + 2)))
+
+    payloads = engine.connection.payloads
+    assert [channel for channel, _ in payloads] == ["test_channel", "test_channel"]
+    assert [len(payload["ids"]) for _, payload in payloads] == [NOTIFY_BATCH, 2]
+    assert {payload["origin"] for _, payload in payloads} == {bridge.origin}
+    assert sorted(i for _, payload in payloads for i in payload["ids"]) == list(range(NOTIFY_BATCH + 2))
+
+
+def test_bridge_delivers_other_workers_events_locally():
+    bus = EventBus()
+    events = []
+    bus.subscribe(lambda collection, ids: events.append((collection, ids)))
+    bridge = PostgresNotifyBridge(bus)
+
+    bridge._receive(json.dumps({"origin": bridge.origin, "collection": "orders", "ids": [1]}))
+    bridge._receive(json.dumps({"origin": "other-worker", "collection": "bots", "ids": [2, 3]}))
+
+    # Our own notification was delivered when it was published
+    assert events == [("bots", {2, 3})]
+
+
+def test_failed_notify_still_delivers_locally(db):
+    # SQLite has no pg_notify: other workers miss it, this one does not
+    bus = EventBus()
+    events = []
+    bus.subscribe(lambda collection, ids: events.append((collection, ids)))
+    bus._bridge = PostgresNotifyBridge(bus)
+
+    bus.publish("orders", [7])
+
+    assert events == [("orders", {7})]
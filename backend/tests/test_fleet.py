@@ -0,0 +1,102 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.assignment import load_candidates
+from app.counters import status_counters
+from app.fleet import BotRun, FleetSimulator, fleet_simulator
+from app.main import app
+from app.models import BotStatus, Order, OrderStatus
+from app.reservations import release_bot
+from app.routing import get_node_id
+from app.tours import DELIVERY, TourStop
+
+from conftest import add_order, bot_row
+
+
+def deliver(fleet: FleetSimulator, order: Order):
+    """The bot arrives at the order's drop-off"""
+    fleet._now = time.time()
+    fleet.track(order.id, order.bot_id)
+    run = BotRun(order.bot_id, {order.id}, node_id=order.delivery_node_id)
+    run.stop = TourStop(order.id, order.delivery_node_id, DELIVERY)
+    fleet._arrive(run)
+
+
+def order_status(db, order_id):
+    db.expire_all()
+    return db.get(Order, order_id).status
+
+
+def test_flush_credits_written_delivery(db):
+    order = add_order(db, bot_id=1, status=OrderStatus.DELIVERING)
+    fleet = FleetSimulator()
+    deliver(fleet, order)
+    assert fleet.live_order_status(order.id) == OrderStatus.DELIVERED
+
+    fleet.flush()
+
+    assert order_status(db, order.id) == OrderStatus.DELIVERED
+    bot = bot_row(db, 1)
+    assert (bot.current_orders_count, bot.total_deliveries, bot.status) == (0, 1, BotStatus.AVAILABLE)
+    assert fleet.live_order_status(order.id) is None
+
+
+def test_flush_skips_order_cancelled_meanwhile(db):
+    cancelled = add_order(db, bot_id=1, status=OrderStatus.DELIVERING)
+    other = add_order(db, bot_id=1, status=OrderStatus.ASSIGNED)
+    fleet = FleetSimulator()
+    deliver(fleet, cancelled)
+
+    # Cancelled through the API before the flush: its slot is released there
+    cancelled.status = OrderStatus.CANCELLED
+    cancelled.bot_id = None
+    release_bot(db, 1)
+    db.commit()
+    delivered_before = status_counters.orders(OrderStatus.DELIVERED)
+
+    fleet.flush()
+
+    assert order_status(db, cancelled.id) == OrderStatus.CANCELLED
+    bot = bot_row(db, 1)
+    # Still holds the other order's slot, nothing delivered
+    assert (bot.current_orders_count, bot.total_deliveries, bot.status) == (1, 0, BotStatus.BUSY)
+    assert order_status(db, other.id) == OrderStatus.ASSIGNED
+    assert status_counters.orders(OrderStatus.DELIVERED) == delivered_before
+
+
+def test_flush_counts_each_transition_once(db):
+    order = add_order(db, bot_id=1, status=OrderStatus.ASSIGNED)
+    status_counters.reconcile(db)
+    fleet = FleetSimulator()
+    fleet._set_status(order.id, OrderStatus.PICKING_UP, OrderStatus.ASSIGNED)
+    fleet._set_status(order.id, OrderStatus.PICKED_UP, OrderStatus.PICKING_UP)
+    # Not counted before it is written
+    assert status_counters.orders(OrderStatus.ASSIGNED) == 1
+
+    fleet.flush()
+
+    assert order_status(db, order.id) == OrderStatus.PICKED_UP
+    assert status_counters.orders(OrderStatus.ASSIGNED) == 0
+    assert status_counters.orders(OrderStatus.PICKING_UP) == 0
+    assert status_counters.orders(OrderStatus.PICKED_UP) == 1
+
+
+def test_assignment_scores_bots_from_live_position(db):
+    order = add_order(db, bot_id=1, status=OrderStatus.ASSIGNED, pickup_node_id=10, delivery_node_id=70)
+    fleet_simulator.track(order.id, 1)
+    try:
+        for _ in range(3):
+            fleet_simulator.tick()
+        live = fleet_simulator.live_position(1)
+        stored = bot_row(db, 1)
+        # Positions are written only when the trajectory changes
+        assert live != (stored.current_x, stored.current_y)
+
+        _, candidates = load_candidates(db, [1])
+        assert candidates[0].node_id == get_node_id(*live)
+        bot = TestClient(app).get("/api/bots/1").json()
+        assert (bot["current_x"], bot["current_y"]) == live
+    finally:
+        fleet_simulator.untrack(order.id)
+        fleet_simulator.flush()
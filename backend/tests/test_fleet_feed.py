@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+from app.broadcast import Broadcaster
+from app.events import EventBus
+from app.fleet_feed import (
+    BOT_RECORD, BOT_REMOVED, BOT_STATUS_CODES, FRAME_DELTA, FRAME_HEADER, FRAME_SNAPSHOT,
+    FleetFeed, pack_bot, pack_frame, pack_removed
+)
+from app.models import BotStatus
+
+
+def bot(bot_id, x=0, y=0, status="available", orders_count=0):
+    return {"id": bot_id, "current_x": x, "current_y": y, "status": status, "orders_count": orders_count, "trajectory": None}
+
+
+def unpack_frame(frame: bytes):
+    """(kind, [(bot id, x, y, status code, orders)]) of a binary frame"""
+    kind, count = FRAME_HEADER.unpack_from(frame)
+    assert len(frame) == FRAME_HEADER.size + count * BOT_RECORD.size
+    return kind, [BOT_RECORD.unpack_from(frame, FRAME_HEADER.size + i * BOT_RECORD.size) for i in range(count)]
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.received = asyncio.Event()
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+        self.received.set()
+
+    async def send_text(self, data: str):
+        self.sent.append(data)
+        self.received.set()
+
+
+def make_feed(bots: dict):
+    def load(dirty):
+        if dirty is None:
+            return {"bots": dict(bots), "orders": {}}
+        return {"bots": {bot_id: bots.get(bot_id) for bot_id in dirty.get("bots", ())}}
+
+    broadcaster = Broadcaster(load, EventBus(), coalesce=0)
+    return broadcaster, FleetFeed(broadcaster, order_interval=0.01)
+
+
+def test_frames_pack_fixed_size_records():
+    frame = pack_frame(FRAME_SNAPSHOT, [
+        pack_bot(bot(1, 3, 4, "busy", 2)),
+        pack_bot(bot(70000, 999, 0, "offline", 300)),
+        pack_removed(5)
+    ])
+    assert len(frame) == 5 + 3 * 10
+    assert unpack_frame(frame) == (FRAME_SNAPSHOT, [
+        (1, 3, 4, BOT_STATUS_CODES["busy"], 2),
+        (70000, 999, 0, BOT_STATUS_CODES["offline"], 255),   # Orders count capped at a byte
+        (5, 0, 0, BOT_REMOVED, 0)
+    ])
+    assert [BOT_STATUS_CODES[status.value] for status in BotStatus] == list(range(len(BotStatus)))
+    assert unpack_frame(pack_frame(FRAME_DELTA, [])) == (FRAME_DELTA, [])
+
+
+def test_disconnect_leaves_nothing_behind():
+    async def main():
+        bots = {1: bot(1, 2, 3)}
+        broadcaster, feed = make_feed(bots)
+        broadcaster.start()
+        websocket = FakeWebSocket()
+        try:
+            client = await feed.connect(websocket)
+            await asyncio.wait_for(websocket.received.wait(), 1)
+            assert unpack_frame(websocket.sent[0]) == (FRAME_SNAPSHOT, [(1, 2, 3, BOT_STATUS_CODES["available"], 0)])
+            assert feed.clients == {client}
+            assert broadcaster.active
+
+            # A change reaches the client as a delta frame
+            websocket.received.clear()
+            bots[1] = bot(1, 4, 3)
+            broadcaster.bus.publish("bots", [1])
+            await asyncio.wait_for(websocket.received.wait(), 1)
+            frames = [message for message in websocket.sent if isinstance(message, bytes)]
+            assert unpack_frame(frames[-1]) == (FRAME_DELTA, [(1, 4, 3, BOT_STATUS_CODES["available"], 0)])
+
+            await feed.disconnect(client)
+            assert not feed.clients
+            assert not broadcaster.active
+            assert client.sender.done()
+            await asyncio.sleep(0.05)
+            assert feed._order_task is None
+        finally:
+            await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_client_gone_while_connecting_is_cleaned_up():
+    async def main():
+        # Never started: the state is not ready, connect() waits for it
+        broadcaster, feed = make_feed({})
+        connecting = asyncio.ensure_future(feed.connect(FakeWebSocket()))
+        await asyncio.sleep(0.01)
+        assert len(feed.clients) == 1
+        connecting.cancel()
+        try:
+            await connecting
+        except asyncio.CancelledError:
+            pass
+        assert not feed.clients
+        assert not broadcaster.active
+
+    asyncio.run(main())
+
+
+def test_snapshot_frame_is_followed_by_trajectories_and_orders():
+    async def main():
+        broadcaster, feed = make_feed({1: bot(1)})
+        broadcaster.start()
+        websocket = FakeWebSocket()
+        try:
+            client = await feed.connect(websocket)
+            await asyncio.wait_for(websocket.received.wait(), 1)
+            await asyncio.sleep(0.01)
+            texts = [json.loads(message) for message in websocket.sent if isinstance(message, str)]
+            assert [text["type"] for text in texts] == ["trajectories", "orders"]
+            await feed.disconnect(client)
+        finally:
+            await broadcaster.stop()
+
+    asyncio.run(main())
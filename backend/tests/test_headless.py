@@ -0,0 +1,37 @@
+from app.headless import HeadlessConfig, HeadlessSimulation, run_headless
+
+
+def test_pending_orders_wait_for_a_free_bot():
+    report = run_headless(HeadlessConfig(
+        orders=30, duration_seconds=3600, fleet_size=1, bot_capacity=1, restaurant_order_limit=100
+    ))
+    assert report.queued > 0
+    assert report.unassigned == 0
+    assert report.delivered + report.in_flight == 30
+
+
+def test_only_nearest_bots_are_scored():
+    simulation = HeadlessSimulation(HeadlessConfig(orders=1, fleet_size=4, assign_candidates=2))
+    simulation.bot_node[:] = [80, 0, 1, 9]      # (8, 8), (0, 0), (1, 0), (0, 1)
+    simulation.bot_orders[1] = simulation.config.bot_capacity
+    assert list(simulation._nearest_bots(0)) == [2, 3]
+
+
+def test_every_order_is_accounted_for():
+    report = run_headless(HeadlessConfig(orders=2000, duration_seconds=3600, fleet_size=3, seed=5))
+    assert report.rate_limited > 0
+    assert report.orders == 2000
+    assert report.orders == (
+        report.rate_limited + report.unreachable + report.delivered + report.in_flight + report.unassigned
+    )
+    assert len(report.utilization_per_bot) == 3
+
+
+def test_same_seed_same_report():
+    config = HeadlessConfig(orders=500, duration_seconds=3600, fleet_size=3, seed=11)
+    first, second = run_headless(config), run_headless(config)
+    first.wall_seconds = second.wall_seconds = 0
+    assert first == second
+    other = run_headless(HeadlessConfig(orders=500, duration_seconds=3600, fleet_size=3, seed=12))
+    other.wall_seconds = 0
+    assert other != first
@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Restaurant
+from app.routers.map import etag_matches
+
+client = TestClient(app)
+
+
+def test_etag_matches_exact_tags_only():
+    assert etag_matches('"3-abc"', '"3-abc"')
+    assert etag_matches('"1-x", W/"3-abc"', '"3-abc"')
+    assert etag_matches("*", '"3-abc"')
+    assert not etag_matches('"3-abcd"', '"3-abc"')
+    assert not etag_matches('"13-abc"', '"3-abc"')
+    assert not etag_matches("", '"3-abc"')
+
+
+def test_map_data_not_modified(db):
+    response = client.get("/api/map/data")
+    etag = response.headers["etag"]
+    assert client.get("/api/map/data", headers={"If-None-Match": f'"0-0", {etag}'}).status_code == 304
+    assert client.get("/api/map/data", headers={"If-None-Match": etag[:-2] + '"'}).status_code == 200
+
+
+def not_modified(etag: str) -> bool:
+    response = client.get("/api/map/data", headers={"If-None-Match": etag})
+    assert response.status_code in (200, 304)
+    return response.status_code == 304
+
+
+def test_map_data_etag_changes_after_restaurant_write(db):
+    response = client.get("/api/map/data")
+    etag = response.headers["etag"]
+    assert not_modified(etag)
+
+    restaurant = db.get(Restaurant, 1)
+    restaurant.name = "Renamed"
+    db.commit()
+
+    response = client.get("/api/map/data", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert {r["id"]: r["name"] for r in response.json()["restaurants"]}[1] == "Renamed"
+    assert not_modified(response.headers["etag"])
+
+
+def test_map_data_etag_changes_when_a_bot_moves(db):
+    etag = client.get("/api/map/data").headers["etag"]
+
+    assert client.put("/api/bots/1/position", params={"x": 0, "y": 0}).status_code == 200
+
+    response = client.get("/api/map/data", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    bot = next(b for b in response.json()["bots"] if b["id"] == 1)
+    assert (bot["current_x"], bot["current_y"]) == (0, 0)
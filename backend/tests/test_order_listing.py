@@ -0,0 +1,102 @@
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Order, OrderStatus
+
+from conftest import add_order
+
+client = TestClient(app)
+
+CREATED_AT = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def add_orders(db, count, status=OrderStatus.PENDING, bot_id=None):
+    """Orders all created at the same instant"""
+    orders = [add_order(db, bot_id=bot_id, status=status) for _ in range(count)]
+    for order in orders:
+        order.created_at = CREATED_AT
+    db.commit()
+    return [order.id for order in orders]
+
+
+def all_pages(path, limit, **params):
+    """Ids of every page, following X-Next-Cursor, and the page sizes"""
+    ids, sizes, cursor = [], [], None
+    while True:
+        query = dict(params, limit=limit)
+        if cursor is not None:
+            query["cursor"] = cursor
+        response = client.get(path, params=query)
+        assert response.status_code == 200
+        page = [order["id"] for order in response.json()]
+        ids += page
+        sizes.append(len(page))
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return ids, sizes
+
+
+def test_pages_with_equal_created_at_neither_skip_nor_repeat(db):
+    pending = add_orders(db, 7)
+    assigned = add_orders(db, 2, status=OrderStatus.ASSIGNED, bot_id=1)
+
+    ids, sizes = all_pages("/api/orders/", 3)
+    assert ids == sorted(pending + assigned, reverse=True)
+    assert sizes == [3, 3, 3]
+
+    ids, sizes = all_pages("/api/orders/pending", 3)
+    assert ids == sorted(pending, reverse=True)
+    assert sizes == [3, 3, 1]
+
+    ids, _ = all_pages("/api/orders/active", 1)
+    assert ids == sorted(assigned, reverse=True)
+
+    # A filter on the shared timestamp keeps every order of it
+    ids, _ = all_pages("/api/orders/", 4, created_after=CREATED_AT.isoformat(), status="pending,assigned")
+    assert ids == sorted(pending + assigned, reverse=True)
+
+
+def test_page_below_a_deleted_cursor(db):
+    ids = add_orders(db, 5)
+    # The cursor order is gone by the time the next page is asked for
+    db.query(Order).filter(Order.id == ids[2]).delete()
+    db.commit()
+
+    response = client.get("/api/orders/pending", params={"cursor": ids[2], "limit": 10})
+    assert [order["id"] for order in response.json()] == [ids[1], ids[0]]
+    assert "x-next-cursor" not in response.headers
+
+
+def export(**params):
+    response = client.get("/api/orders/export", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text == "" or response.text.endswith("\n")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_every_order_oldest_first(db, monkeypatch):
+    monkeypatch.setattr("app.routers.orders.ORDERS_EXPORT_BATCH", 2)
+    pending = add_orders(db, 5)
+    assigned = add_orders(db, 2, status=OrderStatus.ASSIGNED, bot_id=1)
+
+    rows = export()
+    assert [row["id"] for row in rows] == sorted(pending + assigned)
+    stored = {order.id: order for order in db.query(Order)}
+    for row in rows:
+        order = stored[row["id"]]
+        assert (row["status"], row["bot_id"], row["customer_name"]) == (order.status.value, order.bot_id, order.customer_name)
+        assert row["created_at"] == CREATED_AT.isoformat()
+
+    # Resuming after an id, filtered
+    assert [row["id"] for row in export(cursor=pending[2])] == pending[3:] + assigned
+    assert [row["id"] for row in export(status="assigned")] == assigned
+    assert export(cursor=assigned[-1]) == []
+
+
+def test_invalid_status_is_rejected(db):
+    assert client.get("/api/orders/", params={"status": "lost"}).status_code == 400
+    assert client.get("/api/orders/export", params={"status": "lost"}).status_code == 400
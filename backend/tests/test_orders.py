@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from app.fleet import fleet_simulator
+from app.main import app
+from app.models import BotStatus, OrderStatus
+
+from conftest import add_order, bot_row
+
+# No lifespan: the tick loop and the other background tasks stay off
+client = TestClient(app)
+
+
+def test_cancel_stops_simulation_and_releases_slot(db):
+    order = add_order(db, bot_id=1, status=OrderStatus.DELIVERING)
+    fleet_simulator.track(order.id, 1)
+
+    assert client.post(f"/api/orders/{order.id}/cancel").status_code == 200
+
+    assert not fleet_simulator.is_active(order.id)
+    bot = bot_row(db, 1)
+    assert (bot.current_orders_count, bot.status) == (0, BotStatus.AVAILABLE)
+
+
+def test_manual_delivery_stops_simulation(db):
+    order = add_order(db, bot_id=1, status=OrderStatus.PICKED_UP)
+    fleet_simulator.track(order.id, 1)
+
+    assert client.put(f"/api/orders/{order.id}/status/delivered").status_code == 200
+
+    assert not fleet_simulator.is_active(order.id)
+    bot = bot_row(db, 1)
+    assert (bot.current_orders_count, bot.total_deliveries) == (0, 1)
+
+
+def test_manual_active_status_keeps_simulation(db):
+    order = add_order(db, bot_id=1, status=OrderStatus.ASSIGNED)
+    fleet_simulator.track(order.id, 1)
+
+    assert client.put(f"/api/orders/{order.id}/status/picking_up").status_code == 200
+
+    assert fleet_simulator.is_active(order.id)
+    assert bot_row(db, 1).current_orders_count == 1
+    fleet_simulator.untrack(order.id)
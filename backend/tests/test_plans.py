@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+
+import app.routers.orders as orders_router
+from app.main import app
+from app.models import Order
+from app.plans import route_plans
+from app.rate_limit import SlidingWindowRateLimiter
+from app.routers.orders import create_order
+
+client = TestClient(app)
+
+
+def stored_estimates(db, order_ids):
+    db.expire_all()
+    return {
+        order.id: (order.estimated_time, order.route_distance)
+        for order in db.query(Order).filter(Order.id.in_(order_ids))
+    }
+
+
+def test_estimates_are_stored_at_assignment(db, monkeypatch):
+    monkeypatch.setattr(orders_router, "restaurant_rate_limiter", SlidingWindowRateLimiter(100, 30))
+    created = [create_order("test", "", 1, x, 8, db) for x in (2, 3, 4)]
+    assert all(result["bot_assigned"] for result in created)
+
+    order_ids = [result["order_id"] for result in created]
+    stored = stored_estimates(db, order_ids)
+    bot_ids = {order.bot_id for order in db.query(Order).filter(Order.id.in_(order_ids))}
+    # Every order of a re-planned bot is updated, not just the new one
+    expected = {}
+    for bot_id in bot_ids:
+        expected.update(route_plans.get(bot_id).estimates())
+    assert stored == {order_id: expected[order_id] for order_id in order_ids}
+    assert all(eta > 0 and distance > 0 for eta, distance in stored.values())
+    assert [(r["estimated_time"], r["route_distance"]) for r in created][-1] == stored[order_ids[-1]]
+
+
+def test_route_is_served_from_the_stored_plan(db, monkeypatch):
+    monkeypatch.setattr(orders_router, "restaurant_rate_limiter", SlidingWindowRateLimiter(100, 30))
+    order_id = create_order("test", "", 1, 5, 8, db)["order_id"]
+
+    def no_replan(db, bot_id):
+        raise AssertionError("planned again")
+
+    monkeypatch.setattr(orders_router, "replan_bot", no_replan)
+    response = client.get(f"/api/orders/{order_id}/route")
+    assert response.status_code == 200
+    route = response.json()
+    assert (route["estimated_time"], route["distance"]) == stored_estimates(db, [order_id])[order_id]
+
+
+def test_plan_follows_the_bot(db, monkeypatch):
+    monkeypatch.setattr(orders_router, "restaurant_rate_limiter", SlidingWindowRateLimiter(100, 30))
+    order_id = create_order("test", "", 1, 6, 8, db)["order_id"]
+    bot_id = db.get(Order, order_id).bot_id
+    plan = route_plans.get(bot_id)
+    eta, distance = plan.estimates()[order_id]
+
+    route_plans.moved(bot_id, plan.path[1])
+    assert plan.estimates()[order_id][1] == distance - 1
+    assert plan.estimates()[order_id][0] < eta
+
+    # Off the planned path: replaced by the next re-plan
+    route_plans.moved(bot_id, plan.path[0])
+    assert not plan.current
@@ -0,0 +1,59 @@
+import pytest
+
+from app.rate_limit import MemoryBackend, RateLimitBackend, SlidingWindowRateLimiter, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "rate_limit.db"))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_limit_within_window(backend):
+    limiter = SlidingWindowRateLimiter(3, 30, backend=backend, clock=Clock())
+    assert [limiter.try_acquire(1) for _ in range(4)] == [True, True, True, False]
+
+
+def test_window_expiry(backend):
+    clock = Clock()
+    limiter = SlidingWindowRateLimiter(2, 30, backend=backend, clock=clock)
+    assert limiter.try_acquire(1)
+    clock.now += 10
+    assert limiter.try_acquire(1)
+    clock.now += 19.9
+    assert not limiter.try_acquire(1)
+    # The first slot is exactly one window old: free again, the second is not yet
+    clock.now = 1030.0
+    assert limiter.try_acquire(1)
+    assert not limiter.try_acquire(1)
+    clock.now = 1040.0
+    assert limiter.try_acquire(1)
+
+
+def test_restaurants_are_limited_separately(backend):
+    limiter = SlidingWindowRateLimiter(1, 30, backend=backend, clock=Clock())
+    assert limiter.try_acquire(1)
+    assert not limiter.try_acquire(1)
+    assert limiter.try_acquire(2)
+    assert not limiter.try_acquire(2)
+
+
+def test_reset(backend):
+    limiter = SlidingWindowRateLimiter(1, 30, backend=backend, clock=Clock())
+    assert limiter.try_acquire(1)
+    backend.reset()
+    assert limiter.try_acquire(1)
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
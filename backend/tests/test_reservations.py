@@ -0,0 +1,121 @@
+import threading
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+import app.routers.orders as orders_router
+from app.config import BOT_CAPACITY
+from app.database import SessionLocal
+from app.dispatch import PendingDispatcher
+from app.models import Bot, BotStatus, Order, OrderStatus
+from app.rate_limit import SlidingWindowRateLimiter
+from app.reservations import release_bot, reserve_bot
+from app.routers.orders import cancel_order, create_order, update_order_status
+
+from conftest import add_order, bot_row
+
+
+def run_together(*calls):
+    """
+    Start every call on its own thread and session at the same moment.
+    SQLite refuses a read transaction's upgrade to a write while another
+    writer holds the lock ("database is locked") where Postgres would wait
+    on the row - that call is retried, as a client would.
+    """
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def run(i, call):
+        barrier.wait()
+        for _ in range(20):
+            db = SessionLocal()
+            try:
+                results[i] = call(db)
+                return
+            except HTTPException as e:
+                results[i] = e.status_code
+                return
+            except OperationalError:
+                db.rollback()
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_reserve_stops_at_capacity(db):
+    assert all(reserve_bot(db, 1) for _ in range(BOT_CAPACITY))
+    assert not reserve_bot(db, 1)
+    db.commit()
+    bot = bot_row(db, 1)
+    assert (bot.current_orders_count, bot.status) == (BOT_CAPACITY, BotStatus.BUSY)
+
+
+def test_release_frees_bot_with_last_order(db):
+    reserve_bot(db, 1)
+    reserve_bot(db, 1)
+    assert release_bot(db, 1) == BotStatus.BUSY
+    assert release_bot(db, 1, delivered=True) == BotStatus.AVAILABLE
+    # Never below zero
+    assert release_bot(db, 1) == BotStatus.AVAILABLE
+    db.commit()
+    bot = bot_row(db, 1)
+    assert (bot.current_orders_count, bot.total_deliveries) == (0, 1)
+
+
+def test_concurrent_reserves_never_overbook(db):
+    def reserve(session):
+        reserved = reserve_bot(session, 1)
+        session.commit()
+        return reserved
+
+    results = run_together(*[reserve] * (BOT_CAPACITY * 3))
+    assert results.count(True) == BOT_CAPACITY
+    assert bot_row(db, 1).current_orders_count == BOT_CAPACITY
+
+
+def test_create_order_is_not_claimed_by_a_sweep_while_reserving(db, monkeypatch):
+    monkeypatch.setattr(orders_router, "restaurant_rate_limiter", SlidingWindowRateLimiter(100, 30))
+    dispatcher = PendingDispatcher()
+
+    def reserve_after_sweep(session, bot_id):
+        # Another worker's dispatcher sweeps while the bot is being reserved
+        dispatcher.sweep()
+        dispatcher.dispatch()
+        return reserve_bot(session, bot_id)
+
+    monkeypatch.setattr(orders_router, "reserve_bot", reserve_after_sweep)
+    create_order("test", "", 1, 2, 2, db)
+
+    db.expire_all()
+    order = db.query(Order).one()
+    assert dispatcher.assigned == 0
+    assert db.query(Order).filter(Order.status == OrderStatus.ASSIGNED).count() == 1
+    # Only the bot the order ended up with holds a slot
+    slots = {bot.id: bot.current_orders_count for bot in db.query(Bot).all()}
+    assert slots == {bot_id: int(bot_id == order.bot_id) for bot_id in slots}
+
+
+def test_concurrent_cancel_and_deliver_release_once(db):
+    # Two orders are closed by a cancel and a delivery at once; the third stays on the bot
+    orders = [add_order(db, bot_id=1, status=OrderStatus.DELIVERING) for _ in range(3)]
+    calls = []
+    for order in orders[:2]:
+        calls.append(lambda session, order_id=order.id: cancel_order(order_id, session))
+        calls.append(lambda session, order_id=order.id: update_order_status(order_id, "delivered", session))
+
+    run_together(*calls)
+
+    # One slot given back per closed order, and a delivery credited only
+    # when the delivery (not the cancel) took the order off the bot
+    db.expire_all()
+    delivered = db.query(Order).filter(Order.status == OrderStatus.DELIVERED, Order.bot_id == 1).count()
+    bot = bot_row(db, 1)
+    assert bot.current_orders_count == 1
+    assert bot.total_deliveries == delivered
+    assert bot.status == BotStatus.BUSY
@@ -0,0 +1,105 @@
+import random
+from array import array
+
+import pytest
+
+from app.routing import UNREACHABLE, AStarRouter, HierarchicalRouter, RoutingGraph, RoutingTable, build_router
+from app.seed_data import BLOCKED_PATHS
+
+
+def random_blocked_paths(size: int, count: int, rng: random.Random):
+    blocked = set()
+    while len(blocked) < count:
+        node_id = rng.randrange(size - 1) * size + rng.randrange(size - 1)
+        blocked.add((node_id, node_id + 1 if rng.random() < 0.5 else node_id + size))
+    return list(blocked)
+
+
+def assert_valid_path(graph: RoutingGraph, path, start_id: int, end_id: int):
+    assert path[0] == start_id and path[-1] == end_id
+    for a, b in zip(path, path[1:]):
+        assert b in graph.neighbors(a)
+
+
+@pytest.fixture(scope="module")
+def large_map():
+    rng = random.Random(7)
+    size = 160
+    graph = RoutingGraph(size, size, random_blocked_paths(size, size * size // 20, rng))
+    pairs = [(rng.randrange(size * size), rng.randrange(size * size)) for _ in range(40)]
+    return graph, pairs
+
+
+@pytest.fixture(scope="module")
+def seeded_graph():
+    return RoutingGraph(9, 9, BLOCKED_PATHS)
+
+
+def test_table_matches_astar(seeded_graph):
+    table = RoutingTable(seeded_graph)
+    plain = AStarRouter(seeded_graph)
+    for start_id in range(seeded_graph.node_count):
+        for end_id in range(seeded_graph.node_count):
+            expected = plain.get_path(start_id, end_id)
+            assert table.get_distance(start_id, end_id) == (len(expected) - 1 if expected else UNREACHABLE)
+            if expected:
+                assert_valid_path(seeded_graph, table.get_path(start_id, end_id), start_id, end_id)
+
+
+def test_table_distances_from(seeded_graph):
+    table = RoutingTable(seeded_graph)
+    distances = table.get_distances_from(0, range(seeded_graph.node_count))
+    assert distances == {end_id: table.get_distance(0, end_id) for end_id in distances}
+    assert distances[0] == 0
+
+
+def test_astar_is_shortest_and_avoids_blocked_paths(seeded_graph):
+    blocked = {pair for a, b in BLOCKED_PATHS for pair in ((a, b), (b, a))}
+    for start_id in range(seeded_graph.node_count):
+        distance = array("i", [UNREACHABLE]) * seeded_graph.node_count
+        first_hop = array("i", [UNREACHABLE]) * seeded_graph.node_count
+        seeded_graph.bfs(start_id, distance, first_hop)
+        for end_id in range(seeded_graph.node_count):
+            path = seeded_graph.astar(start_id, end_id)
+            assert len(path) - 1 == distance[end_id]
+            assert not blocked & set(zip(path, path[1:]))
+
+
+def test_astar_respects_fence():
+    graph = RoutingGraph(5, 5, [])
+    # Column x=2 fenced off except its bottom cell
+    path = graph.astar(0, 4, fence=[2, 7, 12, 17])
+    assert_valid_path(graph, path, 0, 4)
+    assert 22 in path and len(path) - 1 == 12
+    assert graph.astar(0, 4, fence=[2, 7, 12, 17, 22]) == []
+
+
+def test_hierarchical_paths_match_astar(large_map):
+    graph, pairs = large_map
+    router = HierarchicalRouter(graph, cluster_size=16)
+    plain = AStarRouter(graph)
+    for start_id, end_id in pairs:
+        expected = plain.get_path(start_id, end_id)
+        path = router.get_path(start_id, end_id)
+        if not expected:
+            assert path == []
+            continue
+        assert_valid_path(graph, path, start_id, end_id)
+        assert len(path) == len(expected)
+
+
+def test_distances_from_match_path_lengths(large_map):
+    graph, pairs = large_map
+    router = AStarRouter(graph)
+    start_id = pairs[0][0]
+    end_ids = [end_id for _, end_id in pairs]
+    paths = router.get_paths_from(start_id, end_ids)
+    distances = router.get_distances_from(start_id, end_ids)
+    assert distances == {end_id: len(path) - 1 for end_id, path in paths.items()}
+    assert router.get_distances_from(start_id, [start_id]) == {start_id: 0}
+
+
+def test_auto_mode_uses_astar_beyond_the_table():
+    assert build_router(RoutingGraph(9, 9, [])).mode == "table"
+    assert build_router(RoutingGraph(300, 300, [])).mode == "astar"
+    assert build_router(RoutingGraph(300, 300, []), "hierarchical").mode == "hierarchical"
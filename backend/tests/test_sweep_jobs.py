@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+import app.sweep_jobs as sweep_jobs_module
+from app.headless import HeadlessConfig, run_headless
+from app.main import app
+from app.sweep import build_scenarios, run_sweep, summarize
+from app.sweep_jobs import DONE, FAILED, MAX_ACTIVE_JOBS, SweepJobs, sweep_jobs
+
+client = TestClient(app)
+
+
+def test_sweep_runs_in_the_background():
+    response = client.post("/api/simulation/sweep", json={
+        "fleet_sizes": [2, 3], "bot_capacities": [2], "orders": [200], "hours": 1
+    })
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("queued", "running") and job["count"] == 2
+
+    deadline = time.time() + 60
+    while job["status"] != "done" and time.time() < deadline:
+        time.sleep(0.2)
+        job = client.get(f"/api/simulation/sweep/{job['job_id']}").json()
+    sweep_jobs.shutdown()
+
+    assert job["status"] == "done"
+    assert [row["bots"] for row in job["scenarios"]] == [2, 3]
+
+
+def test_unknown_sweep():
+    assert client.get("/api/simulation/sweep/999999").status_code == 404
+
+
+def test_full_queue_answers_429(monkeypatch):
+    monkeypatch.setattr(sweep_jobs, "submit", lambda scenarios: None)
+    response = client.post("/api/simulation/sweep", json={
+        "fleet_sizes": [2], "bot_capacities": [2], "orders": [200], "hours": 1
+    })
+    assert response.status_code == 429
+
+
+def wait_until_finished(jobs: SweepJobs, job_id: int, timeout: float = 60):
+    deadline = time.time() + timeout
+    while not jobs.get(job_id).finished_as and time.time() < deadline:
+        time.sleep(0.1)
+    return jobs.get(job_id)
+
+
+def test_sweep_reports_match_single_runs():
+    base = HeadlessConfig(orders=300, duration_seconds=3600, seed=3)
+    scenarios = build_scenarios([2, 3], [1, 2], [300], base)
+    assert [(s.fleet_size, s.bot_capacity) for s in scenarios] == [(2, 1), (2, 2), (3, 1), (3, 2)]
+
+    reports = run_sweep(scenarios, workers=2)
+    # Reports come back in scenario order, as if each ran in this process
+    assert [summarize(report) for report in reports] == [summarize(run_headless(s)) for s in scenarios]
+
+
+def test_failed_scenario_fails_the_job():
+    jobs = SweepJobs(workers=1)
+    try:
+        job = jobs.submit([HeadlessConfig(orders=10, width=0)])
+        job = wait_until_finished(jobs, job.id)
+    finally:
+        jobs.shutdown()
+    assert job.status == FAILED
+    assert "Grid must be at least 9x9" in job.as_dict()["error"]
+    assert "scenarios" not in job.as_dict()
+
+
+def test_too_many_sweeps_are_refused(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(sweep_jobs_module, "run_headless", lambda scenario: release.wait(10) and run_headless(scenario))
+    jobs = SweepJobs(workers=1)
+    # Threads, so the patched run blocks until released
+    jobs._pool = ThreadPoolExecutor(max_workers=1)
+    scenarios = [HeadlessConfig(orders=50, duration_seconds=600)]
+    try:
+        queued = [jobs.submit(scenarios) for _ in range(MAX_ACTIVE_JOBS)]
+        assert all(queued)
+        assert jobs.submit(scenarios) is None
+
+        release.set()
+        for job in queued:
+            assert wait_until_finished(jobs, job.id).status == DONE
+        assert jobs.active() == 0
+        assert jobs.submit(scenarios) is not None
+    finally:
+        release.set()
+        jobs.shutdown()
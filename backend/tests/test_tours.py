@@ -0,0 +1,69 @@
+import itertools
+import random
+
+from app.routing import UNREACHABLE
+from app.tours import DELIVERY, PICKUP, TourOrder, plan_tour, tour_distance
+
+
+def line(a: int, b: int) -> int:
+    """Nodes on a line: distance is the difference of ids"""
+    return abs(a - b)
+
+
+def assert_pickups_first(tour, orders):
+    seen = set()
+    for stop in tour.stops:
+        if stop.action == PICKUP:
+            seen.add(stop.order_id)
+        else:
+            order = next(o for o in orders if o.order_id == stop.order_id)
+            assert order.picked_up or stop.order_id in seen
+    assert sorted(s.order_id for s in tour.stops if s.action == DELIVERY) == sorted(o.order_id for o in orders)
+
+
+def random_orders(rng: random.Random, count: int):
+    return [TourOrder(i, rng.randrange(100), rng.randrange(100)) for i in range(count)]
+
+
+def test_exact_tour_is_optimal_and_picks_up_first():
+    rng = random.Random(3)
+    for _ in range(20):
+        orders = random_orders(rng, 3)
+        tour = plan_tour(50, orders, line)
+        assert_pickups_first(tour, orders)
+
+        stops = [s for o in orders for s in tour.stops if s.order_id == o.order_id]
+        best = min(
+            tour_distance(50, list(sequence), line)
+            for sequence in itertools.permutations(stops)
+            if all(
+                sequence.index(next(s for s in stops if s.order_id == o.order_id and s.action == PICKUP))
+                < sequence.index(next(s for s in stops if s.order_id == o.order_id and s.action == DELIVERY))
+                for o in orders
+            )
+        )
+        assert tour.distance == best
+
+
+def test_insertion_tour_picks_up_first():
+    rng = random.Random(4)
+    orders = random_orders(rng, 6)
+    tour = plan_tour(0, orders, line)
+    assert_pickups_first(tour, orders)
+    assert len(tour.stops) == 12
+    assert tour.distance == tour_distance(0, tour.stops, line)
+
+
+def test_orders_on_board_only_get_delivered():
+    orders = [TourOrder(1, 10, 20, picked_up=True), TourOrder(2, 30, 5)]
+    tour = plan_tour(15, orders, line)
+    assert [(s.order_id, s.action) for s in tour.stops if s.order_id == 1] == [(1, DELIVERY)]
+    assert_pickups_first(tour, orders)
+
+
+def test_unreachable_stop():
+    def blocked(a: int, b: int) -> int:
+        return UNREACHABLE if 99 in (a, b) and a != b else line(a, b)
+
+    tour = plan_tour(0, [TourOrder(1, 10, 99)], blocked)
+    assert tour.distance == UNREACHABLE
@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useMemo } from 'react';
 import MapGrid from '@/components/MapGrid';
 import OrderForm from '@/components/OrderForm';
 import OrderList from '@/components/OrderList';
@@ -10,11 +10,18 @@ import {
   Order,
   Stats,
   getMapData,
+  getOrder,
   getOrders,
   getStats,
   connectToStream,
-  StreamData
+  StreamData,
+  RoutePoint,
+  TrajectoryPoint
 } from '@/lib/api';
+import { positionAt } from '@/lib/trajectory';
+
+// How often moving bots are redrawn along their trajectories
+const BOT_FRAME_MS = 200;
 
 export default function Home() {
   // State
@@ -26,6 +33,8 @@ export default function Home() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [connected, setConnected] = useState(false);
+  const [trajectories, setTrajectories] = useState<Record<number, TrajectoryPoint[]>>({});
+  const [botPositions, setBotPositions] = useState<Record<number, RoutePoint>>({});
 
   // Fetch initial data
   const fetchData = useCallback(async () => {
@@ -56,54 +65,23 @@ export default function Home() {
     }
   }, [selectedOrder]);
 
-  // Load initial data
-// Connect to SSE stream for real-time updates
-useEffect(() => {
-  let eventSource: EventSource | null = null;
-  let pollInterval: NodeJS.Timeout | null = null;
-
-  const connect = () => {
-    eventSource = connectToStream(
-      (data: StreamData) => {
-        if (data.type === 'update') {
-          setConnected(true);
-          fetchData();
-        }
-      },
-      (error) => {
-        setConnected(false);
-        setTimeout(connect, 5000);
-      }
-    );
-  };
-
-  connect();
-
-  // Also poll every 1 second for bot position updates
-  pollInterval = setInterval(() => {
-    fetchData();
-  }, 1000);
-
-  return () => {
-    if (eventSource) {
-      eventSource.close();
-    }
-    if (pollInterval) {
-      clearInterval(pollInterval);
-    }
-  };
-}, []);
-
-  // Connect to SSE stream for real-time updates
+  // Connect to SSE stream for real-time updates (the first snapshot loads the data)
   useEffect(() => {
     let eventSource: EventSource | null = null;
 
     const connect = () => {
       eventSource = connectToStream(
         (data: StreamData) => {
-          if (data.type === 'update') {
+          if (data.type === 'snapshot' || data.type === 'delta') {
             setConnected(true);
-            fetchData();
+            trackTrajectories(data);
+            // A snapshot (first connect, resync) reloads everything, a
+            // delta is merged into what is loaded
+            if (data.type === 'snapshot') {
+              fetchData();
+            } else {
+              applyDelta(data);
+            }
           }
         },
         (error) => {
@@ -122,6 +100,108 @@ useEffect(() => {
     };
   }, []);
 
+  // Bots are only sent when their trajectory changes - keep the latest ones
+  const trackTrajectories = (data: StreamData) => {
+    setTrajectories((current) => {
+      const next: Record<number, TrajectoryPoint[]> = data.type === 'snapshot' ? {} : { ...current };
+      for (const bot of data.bots || []) {
+        if (bot.trajectory) {
+          next[bot.id] = bot.trajectory;
+        } else {
+          delete next[bot.id];
+        }
+      }
+      for (const botId of data.removed_bots || []) {
+        delete next[botId];
+      }
+      return next;
+    });
+  };
+
+  // Merge a delta's orders and bots into the loaded ones
+  const applyDelta = (data: StreamData) => {
+    const changed = new Map((data.orders || []).map((order) => [order.id, order]));
+    const merge = (order: Order) => {
+      const update = changed.get(order.id);
+      return update ? { ...order, ...update } : order;
+    };
+    setOrders((current) => {
+      const known = new Set(current.map((order) => order.id));
+      const added = (data.orders || []).filter((order) => !known.has(order.id));
+      // Newest first, like the order list
+      return [...added.sort((a, b) => b.id - a.id), ...current.map(merge)];
+    });
+    setSelectedOrder((current) => (current ? merge(current) : current));
+
+    // Orders leave the stream once delivered, cancelled or deleted
+    for (const orderId of data.removed_orders || []) {
+      getOrder(orderId)
+        .then((res) => {
+          setOrders((current) => current.map((order) => (order.id === orderId ? res.data : order)));
+          setSelectedOrder((current) => (current?.id === orderId ? res.data : current));
+        })
+        .catch(() => {
+          setOrders((current) => current.filter((order) => order.id !== orderId));
+          setSelectedOrder((current) => (current?.id === orderId ? null : current));
+        });
+    }
+
+    if (data.bots || data.removed_bots) {
+      const bots = new Map((data.bots || []).map((bot) => [bot.id, bot]));
+      const removed = new Set(data.removed_bots || []);
+      setMapData((current) => current && {
+        ...current,
+        bots: current.bots
+          .filter((bot) => !removed.has(bot.id))
+          .map((bot) => {
+            const update = bots.get(bot.id);
+            return update
+              ? {
+                  ...bot,
+                  name: update.name,
+                  status: update.status,
+                  current_x: update.current_x,
+                  current_y: update.current_y,
+                  current_orders_count: update.orders_count,
+                }
+              : bot;
+          }),
+      });
+    }
+
+    getStats()
+      .then((res) => setStats(res.data))
+      .catch(() => {});
+  };
+
+  // Move bots along their trajectories locally, no position polling
+  useEffect(() => {
+    const update = () => {
+      // Trajectory times are epoch seconds - assumes a synced clock
+      const now = Date.now() / 1000;
+      const positions: Record<number, RoutePoint> = {};
+      for (const [botId, trajectory] of Object.entries(trajectories)) {
+        positions[Number(botId)] = positionAt(trajectory, now);
+      }
+      setBotPositions(positions);
+    };
+
+    update();
+    if (Object.keys(trajectories).length === 0) {
+      return;
+    }
+    const frame = setInterval(update, BOT_FRAME_MS);
+    return () => clearInterval(frame);
+  }, [trajectories]);
+
+  // Bots with the interpolated cell of the moving ones
+  const displayBots = useMemo(() => (mapData?.bots || []).map((bot) => {
+    const position = botPositions[bot.id];
+    return position
+      ? { ...bot, current_x: Math.round(position.x), current_y: Math.round(position.y) }
+      : bot;
+  }), [mapData, botPositions]);
+
   // Handle map click
   const handleNodeClick = (x: number, y: number) => {
     // Only allow selection when not viewing an order route
@@ -271,6 +351,7 @@ useEffect(() => {
               selectedPoint={selectedPoint}
               onNodeClick={handleNodeClick}
               selectedOrder={selectedOrder}
+              botPositions={botPositions}
             />
             {!selectedOrder && (
               <OrderForm
@@ -291,7 +372,7 @@ useEffect(() => {
               onSelectOrder={handleSelectOrder}
               selectedOrderId={selectedOrder?.id}
             />
-            <BotStatus bots={mapData?.bots || []} />
+            <BotStatus bots={displayBots} />
           </div>
         </div>
 
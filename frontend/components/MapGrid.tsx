@@ -1,18 +1,19 @@
 'use client';
 
 import React, { useEffect, useState } from 'react';
-import { MapData, Order, getRoute, RoutePoint } from '@/lib/api';
+import { MapData, Order, getOrderRoute, RoutePoint } from '@/lib/api';
 
 interface MapGridProps {
   mapData: MapData | null;
   selectedPoint: { x: number; y: number } | null;
   onNodeClick: (x: number, y: number) => void;
   selectedOrder?: Order | null;
+  botPositions?: Record<number, RoutePoint>;  // Interpolated positions of moving bots
 }
 
-export default function MapGrid({ mapData, selectedPoint, onNodeClick, selectedOrder }: MapGridProps) {
+export default function MapGrid({ mapData, selectedPoint, onNodeClick, selectedOrder, botPositions }: MapGridProps) {
   const [routePath, setRoutePath] = useState<RoutePoint[]>([]);
-  const [routeInfo, setRouteInfo] = useState<{ distance: number; time: number } | null>(null);
+  const [routeInfo, setRouteInfo] = useState<{ distance: number; time: number | null } | null>(null);
   const [loadingRoute, setLoadingRoute] = useState(false);
 
   // Calculate route when order is selected
@@ -27,30 +28,8 @@ export default function MapGrid({ mapData, selectedPoint, onNodeClick, selectedO
       setLoadingRoute(true);
 
       try {
-        // Get pickup node coordinates
-        const pickupNode = mapData.nodes.find(n => n.id === selectedOrder.pickup_node_id);
-        const deliveryNode = mapData.nodes.find(n => n.id === selectedOrder.delivery_node_id);
-
-        if (!pickupNode || !deliveryNode) {
-          setRoutePath([]);
-          setRouteInfo(null);
-          return;
-        }
-
-        // Get bot position or use pickup as start
-        let startX = pickupNode.x;
-        let startY = pickupNode.y;
-
-        if (selectedOrder.bot_id) {
-          const bot = mapData.bots.find(b => b.id === selectedOrder.bot_id);
-          if (bot) {
-            startX = bot.current_x;
-            startY = bot.current_y;
-          }
-        }
-
-        // Calculate route from bot/pickup to delivery
-        const response = await getRoute(startX, startY, deliveryNode.x, deliveryNode.y);
+        // Planned route from the bot (or the pickup while pending) to delivery
+        const response = await getOrderRoute(selectedOrder.id);
         setRoutePath(response.data.path);
         setRouteInfo({
           distance: response.data.distance,
@@ -109,7 +88,13 @@ export default function MapGrid({ mapData, selectedPoint, onNodeClick, selectedO
 
   // Helper: Get bot at position
   const getBot = (x: number, y: number) => {
-    return mapData.bots.find((b) => b.current_x === x && b.current_y === y);
+    return mapData.bots.find((b) => {
+      const position = botPositions?.[b.id];
+      if (position) {
+        return Math.round(position.x) === x && Math.round(position.y) === y;
+      }
+      return b.current_x === x && b.current_y === y;
+    });
   };
 
   // Helper: Get node info
@@ -192,7 +177,7 @@ export default function MapGrid({ mapData, selectedPoint, onNodeClick, selectedO
               </div>
             </div>
             <div className="text-right">
-              <p className="text-2xl font-bold text-purple-700">{routeInfo.time}s</p>
+              <p className="text-2xl font-bold text-purple-700">{routeInfo.time !== null ? `${routeInfo.time}s` : '-'}</p>
               <p className="text-sm text-purple-500">{routeInfo.distance} nodes</p>
             </div>
           </div>
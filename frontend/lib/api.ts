@@ -51,6 +51,7 @@ export interface Order {
   bot_id: number | null;
   status: string;
   estimated_time: number | null;
+  route_distance: number | null;
   created_at: string;
 }
 
@@ -82,11 +83,40 @@ export interface RouteData {
   estimated_time: number;
 }
 
+// Planned route of an order; estimated_time is null while it is pending
+export interface OrderRouteData {
+  order_id: number;
+  bot_id: number | null;
+  path: RoutePoint[];
+  distance: number;
+  estimated_time: number | null;
+}
+
+// [x, y, epoch seconds the bot is due there]
+export type TrajectoryPoint = [number, number, number];
+
+// A moving bot is sent once per trajectory: current_x / current_y is
+// where it starts, trajectory is null while the bot is not moving
+export interface StreamBot {
+  id: number;
+  name: string;
+  status: Bot['status'];
+  current_x: number;
+  current_y: number;
+  orders_count: number;
+  trajectory: TrajectoryPoint[] | null;
+}
+
+// 'snapshot' carries every active order and bot, 'delta' only the
+// new or changed ones plus the ids removed since the previous event
 export interface StreamData {
-  type: string;
+  type: 'snapshot' | 'delta' | 'error';
   timestamp: string;
-  orders: Order[];
-  bots: Bot[];
+  orders?: Order[];
+  bots?: StreamBot[];
+  removed_orders?: number[];
+  removed_bots?: number[];
+  message?: string;
 }
 
 
@@ -95,6 +125,9 @@ export interface StreamData {
 // Orders
 export const getOrders = () => api.get<Order[]>('/api/orders');
 
+export const getOrder = (orderId: number) =>
+  api.get<Order>(`/api/orders/${orderId}`);
+
 export const createOrder = (data: {
   customer_name: string;
   customer_address: string;
@@ -112,6 +145,9 @@ export const deleteOrder = (orderId: number) =>
 export const cancelOrder = (orderId: number) =>
   api.post(`/api/orders/${orderId}/cancel`);
 
+export const getOrderRoute = (orderId: number) =>
+  api.get<OrderRouteData>(`/api/orders/${orderId}/route`);
+
 // Bots
 export const getBots = () => api.get<Bot[]>('/api/bots');
 
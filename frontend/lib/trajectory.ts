@@ -0,0 +1,23 @@
+/**
+ * Bot trajectories - interpolate where a moving bot is now
+ */
+import { RoutePoint, TrajectoryPoint } from './api';
+
+// Position on the trajectory at `now` (epoch seconds), between the two
+// waypoints around it; before the first or after the last it stays there
+export const positionAt = (trajectory: TrajectoryPoint[], now: number): RoutePoint => {
+  const [firstX, firstY, firstTime] = trajectory[0];
+  if (now <= firstTime) {
+    return { x: firstX, y: firstY };
+  }
+  for (let i = 1; i < trajectory.length; i++) {
+    const [x, y, time] = trajectory[i];
+    if (now < time) {
+      const [prevX, prevY, prevTime] = trajectory[i - 1];
+      const f = (now - prevTime) / (time - prevTime);
+      return { x: prevX + (x - prevX) * f, y: prevY + (y - prevY) * f };
+    }
+  }
+  const [lastX, lastY] = trajectory[trajectory.length - 1];
+  return { x: lastX, y: lastY };
+};